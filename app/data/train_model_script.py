@@ -1,9 +1,15 @@
 import os
-import pandas as pd
-from app.models.price_predictor import train_model
+import sys
 
 # Go to project root
 base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, os.path.join(base_dir, "app"))
+
+from models.price_predictor import fit_model, training_matrix
+from models.sweep import load_best_params
+from services.candle_store import CandleStore
+from utils.dataset_cache import DatasetCache
+from utils.ingest import read_candles
 
 # ✅ CSV path
 csv_path = os.path.join(base_dir, "app", "data", "BTCUSDT_1m.csv")
@@ -11,21 +17,24 @@ csv_path = os.path.join(base_dir, "app", "data", "BTCUSDT_1m.csv")
 # ✅ Model output path
 model_path = os.path.join(base_dir, "models", "crypto_lgb.pkl")
 
-# ✅ Load CSV
-df = pd.read_csv(csv_path)
-
-# 🔧 Clean/convert Volume to numeric
-# Remove commas/spaces and convert to float; replace non-numeric with NaN, then fill
-if "Volume" in df.columns:
-    df["Volume"] = (
-        df["Volume"]
-        .astype(str)                    # ensure string for cleaning
-        .str.replace(",", "", regex=False)  # remove thousand separators if any
-        .str.strip()
-    )
-    df["Volume"] = pd.to_numeric(df["Volume"], errors="coerce").fillna(0)
-
-# ✅ Train and save model
-train_model(df, save_path=model_path)
+# ✅ Candles from the local store (months of 1m data load in seconds);
+# fall back to the CSV snapshot if the store has not been synced yet
+store = CandleStore()
+sources = store.files("BTCUSDT", "1m") or [csv_path]
+
+def load_raw():
+    df = store.load("BTCUSDT", "1m")
+    return df if not df.empty else read_candles(csv_path)
+
+# ✅ Cleaned candles + feature matrix are cached by source hash and feature
+# spec version, so retraining on unchanged data skips loading and features
+cache = DatasetCache()
+key = cache.source_key(sources)
+X, y = cache.arrays(key, ("lgb_X", "lgb_y"), lambda: training_matrix(cache.candles(key, load_raw)))
+
+# ✅ Train and save model (with sweep-tuned parameters if available)
+params = load_best_params("lgbm")
+params.pop("threshold", None)  # signal threshold, not a LightGBM parameter
+fit_model(X, y, save_path=model_path, params=params)
 
 print("✅ Model training completed and saved at:", model_path)
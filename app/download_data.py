@@ -1,9 +1,9 @@
-import pandas as pd
-from services.binance_api import get_live_data
+from services.candle_store import CandleStore
 
-# BTCUSDT ke 1000 minute candles download karo
-df = get_live_data("BTCUSDT", interval="1m", limit=1000)
+# BTCUSDT ke last 30 din ke 1m candles local store me sync karo
+# (sirf missing candles download honge)
+store = CandleStore()
+fetched = store.sync("BTCUSDT", interval="1m", days=30)
 
-# CSV me save karo
-df.to_csv("../data/BTCUSDT_1m.csv", index=False)
-print("✅ Data saved to ../data/BTCUSDT_1m.csv")
+df = store.load("BTCUSDT", "1m")
+print(f"✅ Synced {fetched} new candles, {len(df)} stored at {store.root}")
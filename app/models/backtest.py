@@ -0,0 +1,274 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from models.classifier import direction_dataset, predict_direction
+from models.features import LGB_FEATURES, lgb_features, rf_features
+from models.export import load_predictor
+from models.lstm_infer import SIGNAL_THRESHOLD, scale_windows
+from services.market_data import INTERVAL_MS
+
+MINUTES_PER_YEAR = 365 * 24 * 60
+
+
+# ------------------ Strategies ------------------ #
+def threshold_signals(values, threshold: float) -> np.ndarray:
+    """1 above +threshold, -1 below -threshold, 0 in between (and for NaN)."""
+    values = np.asarray(values, dtype=float)
+    return np.where(values > threshold, 1, np.where(values < -threshold, -1, 0)).astype(np.int8)
+
+
+class Strategy:
+    """
+    A strategy turns a candle frame (Open, High, Low, Close, Volume) into
+    one signal per candle: 1 = long, -1 = short, 0 = flat, decided at that
+    candle's close. Signals for the whole frame are produced in one batch.
+    `fit()` is called on the training slice of each walk-forward fold.
+    """
+
+    name = "strategy"
+    # candles needed before the first usable signal
+    warmup = 0
+
+    def fit(self, candles: pd.DataFrame):
+        return self
+
+    def generate_signals(self, candles: pd.DataFrame) -> np.ndarray:
+        raise NotImplementedError
+
+
+class LGBMStrategy(Strategy):
+    """
+    LightGBM next-close regressor: long when the predicted close is more
+    than `threshold` (fraction) above the last close, short when below.
+    Uses the saved model unless `retrain` is set, in which case every
+    walk-forward fold fits a fresh model with `params`.
+    """
+
+    name = "lgbm"
+    warmup = 20
+
+    def __init__(self, model_path: str = "models/crypto_lgb.pkl", model=None,
+                 threshold: float = 0.0, retrain: bool = False, params: dict = None,
+                 num_threads: int = None):
+        self.model_path = model_path
+        self.model = model
+        self.threshold = threshold
+        self.retrain = retrain
+        self.params = params or {}
+        self.num_threads = num_threads
+
+    def fit(self, candles):
+        if self.retrain:
+            import lightgbm as lgb
+            X = lgb_features(candles["Close"].to_numpy(float), candles["Volume"].to_numpy(float))
+            y = np.roll(X[:, 0], -1)
+            keep = ~np.isnan(X).any(axis=1)
+            keep[-1:] = False
+            self.model = lgb.LGBMRegressor(verbose=-1, **self.params)
+            self.model.fit(pd.DataFrame(X[keep], columns=LGB_FEATURES), y[keep])
+        return self
+
+    def generate_signals(self, candles):
+        model = self.model if self.model is not None else load_predictor(self.model_path)
+        close = candles["Close"].to_numpy(float)
+        X = lgb_features(close, candles["Volume"].to_numpy(float))
+        valid = ~np.isnan(X).any(axis=1)
+        kwargs = {"num_threads": self.num_threads} if self.num_threads else {}
+        pred = np.full(len(close), np.nan)
+        pred[valid] = model.predict(pd.DataFrame(X[valid], columns=LGB_FEATURES), **kwargs)
+        return threshold_signals(pred / close - 1, self.threshold)
+
+
+class RFStrategy(Strategy):
+    """
+    RandomForest UP/DOWN classifier: long on UP, short on DOWN, flat when
+    the winning class probability is below `confidence`.
+    """
+
+    name = "rf"
+    # enough history for the EMAs behind MACD to settle
+    warmup = 100
+
+    def __init__(self, n_estimators: int = 100, confidence: float = 0.55,
+                 model=None, random_state: int = 42, n_jobs: int = None):
+        self.n_estimators = n_estimators
+        self.confidence = confidence
+        self.model = model
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+
+    def fit(self, candles):
+        from sklearn.ensemble import RandomForestClassifier
+        X, y = direction_dataset(candles["Close"].to_numpy(float))
+        self.model = RandomForestClassifier(n_estimators=self.n_estimators,
+                                            random_state=self.random_state, n_jobs=self.n_jobs)
+        self.model.fit(X, y)
+        return self
+
+    def generate_signals(self, candles):
+        if self.model is None:
+            raise ValueError("RFStrategy needs a fitted model: call fit() or use walk_forward().")
+        X = rf_features(candles["Close"].to_numpy(float))
+        valid = ~np.isnan(X).any(axis=1)
+        signals = np.zeros(len(X), dtype=np.int8)
+        if valid.any():
+            direction, conf = predict_direction(self.model, X[valid])
+            signals[valid] = np.where(conf < self.confidence, 0, np.where(direction == 1, 1, -1))
+        return signals
+
+
+class LSTMStrategy(Strategy):
+    """
+    LSTM signal model (models.lstm) on the close: long when its output is
+    above +threshold, short below -threshold, as the Strategy page reads it.
+    Each fold fits a fresh model on windows scaled over their own prices,
+    the basis the shared model is trained on.
+    """
+
+    name = "lstm"
+
+    def __init__(self, window_size: int = 30, threshold: float = SIGNAL_THRESHOLD, epochs: int = 5,
+                 model=None):
+        self.window_size = int(window_size)
+        self.threshold = threshold
+        self.epochs = epochs
+        self.model = model
+        # the first signal needs one full window
+        self.warmup = self.window_size - 1
+
+    def fit(self, candles):
+        from models.lstm import train_shared_lstm
+        from models.lstm_infer import KerasPredictor
+
+        model, acc = train_shared_lstm({"train": candles.rename(columns={"Close": "price"})},
+                                       window_size=self.window_size, epochs=self.epochs)
+        self.model = KerasPredictor(model, self.window_size, accuracy=acc)
+        return self
+
+    def outputs(self, candles) -> np.ndarray:
+        """Model output in [-1, 1] per candle (NaN before the first full window)."""
+        if self.model is None:
+            raise ValueError("LSTMStrategy needs a fitted model: call fit() or use walk_forward().")
+        close = candles["Close"].to_numpy(float)
+        out = np.full(len(close), np.nan)
+        if len(close) >= self.window_size:
+            out[self.window_size - 1:] = self.model.predict(scale_windows(sliding_window_view(close, self.window_size)))
+        return out
+
+    def generate_signals(self, candles):
+        return threshold_signals(self.outputs(candles), self.threshold)
+
+
+# ------------------ Simulation ------------------ #
+def run_backtest(candles: pd.DataFrame, signals, fee: float = 0.001, slippage: float = 0.0005,
+                 allow_short: bool = True, initial_cash: float = 10_000.0, interval: str = "1m"):
+    """
+    Vectorized simulation of a signal series.
+
+    A signal at candle t is filled at close t and held until the next
+    signal, so the position earns close-to-close returns from t+1 on.
+    Every change in position pays `fee + slippage` per unit turned over.
+    Returns (equity Series, stats dict).
+    """
+    close = candles["Close"].to_numpy(float)
+    signals = np.asarray(signals, dtype=float)
+    if not allow_short:
+        signals = np.clip(signals, 0, 1)
+
+    returns = np.zeros(len(close))
+    returns[1:] = close[1:] / close[:-1] - 1
+    position = np.zeros(len(close))
+    position[1:] = signals[:-1]
+    turnover = np.abs(np.diff(np.concatenate([[0.0], signals])))
+    strat = position * returns - turnover * (fee + slippage)
+    equity = initial_cash * np.cumprod(1 + strat)
+
+    periods = MINUTES_PER_YEAR * 60_000 / INTERVAL_MS.get(interval, 60_000)
+    std = strat.std()
+    sharpe = float(strat.mean() / std * np.sqrt(periods)) if std > 0 else 0.0
+    peak = np.maximum.accumulate(equity) if len(equity) else equity
+    drawdown = equity / peak - 1 if len(equity) else equity
+
+    index = candles["Time"] if "Time" in candles.columns else candles.index
+    stats = {
+        "final_equity": float(equity[-1]) if len(equity) else initial_cash,
+        "total_return": float(equity[-1] / initial_cash - 1) if len(equity) else 0.0,
+        "sharpe": sharpe,
+        "max_drawdown": float(drawdown.min()) if len(drawdown) else 0.0,
+        "trades": int(np.count_nonzero(turnover)),
+        "exposure": float(np.mean(position != 0)) if len(position) else 0.0,
+    }
+    return pd.Series(equity, index=pd.Index(index), name="equity"), stats
+
+
+def backtest(candles: pd.DataFrame, strategy: Strategy, **kwargs):
+    """Signals for every candle in one batch, then run_backtest()."""
+    return run_backtest(candles, strategy.generate_signals(candles), **kwargs)
+
+
+def walk_forward(candles: pd.DataFrame, strategy: Strategy, train_size: int,
+                 test_size: int, **kwargs):
+    """
+    Fit on `train_size` candles, trade the next `test_size`, roll forward.
+    Returns (equity Series over all test windows, stats dict, per-fold stats).
+    """
+    candles = candles.reset_index(drop=True)
+    signals = np.zeros(len(candles), dtype=np.int8)
+    folds = []
+    start = train_size
+    while start < len(candles):
+        end = min(start + test_size, len(candles))
+        strategy.fit(candles.iloc[start - train_size:start])
+        # include warm-up history so indicators are ready at the fold start
+        lo = max(start - strategy.warmup, 0)
+        signals[start:end] = strategy.generate_signals(candles.iloc[lo:end])[start - lo:]
+        _, fold_stats = run_backtest(candles.iloc[start:end], signals[start:end], **kwargs)
+        folds.append({"start": start, "end": end, **fold_stats})
+        start = end
+
+    tested = candles.iloc[train_size:]
+    equity, stats = run_backtest(tested, signals[train_size:], **kwargs)
+    return equity, stats, folds
+
+
+def walk_forward_outputs(candles: pd.DataFrame, strategy: Strategy, train_size: int, test_size: int):
+    """
+    The folds of walk_forward() keeping the strategy's raw outputs()
+    instead of signals, so a threshold applied after prediction can be
+    varied without refitting. Returns (outputs, [(start, end)] per fold).
+    """
+    candles = candles.reset_index(drop=True)
+    outputs = np.full(len(candles), np.nan)
+    folds = []
+    start = train_size
+    while start < len(candles):
+        end = min(start + test_size, len(candles))
+        strategy.fit(candles.iloc[start - train_size:start])
+        lo = max(start - strategy.warmup, 0)
+        outputs[start:end] = strategy.outputs(candles.iloc[lo:end])[start - lo:]
+        folds.append((start, end))
+        start = end
+    return outputs, folds
+
+
+if __name__ == "__main__":
+    # from the repo root: PYTHONPATH=app python -m models.backtest
+    import os
+    import time
+
+    from services.candle_store import CandleStore
+    from utils.ingest import read_candles
+
+    candles = CandleStore().load("BTCUSDT", "1m")
+    if candles.empty:
+        candles = read_candles(os.path.join(os.path.dirname(__file__), "..", "data", "BTCUSDT_1m.csv"))
+
+    t = time.perf_counter()
+    _, stats = backtest(candles, LGBMStrategy())
+    print(f"lgbm  {len(candles)} candles in {time.perf_counter() - t:.2f}s", stats)
+
+    t = time.perf_counter()
+    train = max(len(candles) // 5, 200)
+    _, stats, _ = walk_forward(candles, RFStrategy(n_jobs=-1), train, train)
+    print(f"rf    {len(candles)} candles in {time.perf_counter() - t:.2f}s", stats)
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from models.features import RF_FEATURES, rf_features
+
+
+def with_rf_features(df: pd.DataFrame, price_col: str = "price") -> pd.DataFrame:
+    """`df` plus the RF_FEATURES columns, warm-up rows dropped."""
+    df = df.copy()
+    df[RF_FEATURES] = rf_features(df[price_col].to_numpy())
+    return df.dropna()
+
+
+def direction_dataset(price, X=None) -> tuple:
+    """
+    (X, y) for the direction classifier: RF_FEATURES per row (computed
+    unless given) and y = 1 if the next price is higher, else 0. Warm-up
+    rows and the last row (no next price) are dropped.
+    """
+    price = np.asarray(price, dtype=float)
+    X = rf_features(price) if X is None else np.asarray(X, dtype=float)
+    y = np.zeros(len(price), dtype=int)
+    y[:-1] = price[1:] > price[:-1]
+    keep = ~np.isnan(X).any(axis=1)
+    keep[-1:] = False
+    return X[keep], y[keep]
+
+
+def train_classifier(df: pd.DataFrame, n_estimators: int = 100, random_state: int = 42,
+                     test_size: float = 0.2, price_col: str = "price", progress=None):
+    """
+    Train the RandomForest UP/DOWN classifier on a price series, reusing
+    RF_FEATURES columns if the frame already has them. With `progress`,
+    trees are grown in ten warm-start steps and `progress(fraction, message)`
+    is called after each.
+    Returns (model, accuracy on the chronological hold-out split).
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score
+
+    X = df[RF_FEATURES].to_numpy() if set(RF_FEATURES) <= set(df.columns) else None
+    X, y = direction_dataset(df[price_col].to_numpy(), X)
+    split = int(len(X) * (1 - test_size))
+    if progress is None:
+        model = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state)
+        model.fit(X[:split], y[:split])
+    else:
+        model = RandomForestClassifier(n_estimators=0, random_state=random_state, warm_start=True)
+        step = max(n_estimators // 10, 1)
+        for n in range(step, n_estimators + step, step):
+            model.set_params(n_estimators=min(n, n_estimators))
+            model.fit(X[:split], y[:split])
+            progress(model.n_estimators / n_estimators, f"{model.n_estimators}/{n_estimators} trees")
+    acc = accuracy_score(y[split:], model.predict(X[split:])) if split < len(X) else float("nan")
+    return model, acc
+
+
+def update_classifier(model, df: pd.DataFrame, new_trees: int = 20, window: int = 2000,
+                      test_size: float = 0.2, price_col: str = "price", progress=None):
+    """
+    Rolling-forest update of a trained RandomForest: `new_trees` trees are
+    grown with warm_start on the newest `window` rows (minus the hold-out)
+    and the same number of oldest trees is dropped, so the forest follows
+    recent candles at a fraction of a full fit. The given model is left
+    untouched. Returns (model, hold-out accuracy), or None when the rows
+    do not contain every class the forest knows (warm-started trees must
+    share them).
+    """
+    import copy
+
+    from sklearn.metrics import accuracy_score
+
+    X = df[RF_FEATURES].to_numpy() if set(RF_FEATURES) <= set(df.columns) else None
+    X, y = direction_dataset(df[price_col].to_numpy(), X)
+    X, y = X[-window:], y[-window:]
+    split = int(len(X) * (1 - test_size))
+    if split == 0 or not np.array_equal(np.unique(y[:split]), model.classes_):
+        return None
+
+    forest = copy.deepcopy(model)
+    new_trees = min(new_trees, len(forest.estimators_))
+    forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + new_trees)
+    forest.fit(X[:split], y[:split])
+    forest.estimators_ = forest.estimators_[new_trees:]
+    forest.set_params(n_estimators=len(forest.estimators_))
+    if progress is not None:
+        progress(1.0, f"{new_trees}/{forest.n_estimators} trees replaced")
+    acc = accuracy_score(y[split:], forest.predict(X[split:])) if split < len(X) else float("nan")
+    return forest, acc
+
+
+def signal_from_direction(direction, probability: float, min_confidence: float):
+    """(BUY / SELL / HOLD, confidence %): HOLD when the likeliest class is below `min_confidence`."""
+    if probability < min_confidence:
+        return "HOLD", probability * 100
+    return ("BUY" if direction == 1 else "SELL"), probability * 100
+
+
+def predict_direction(model, X) -> tuple:
+    """
+    (direction, confidence) arrays from a single predict_proba call:
+    direction is the most likely class (1=UP, 0=DOWN), confidence its probability.
+    """
+    proba = model.predict_proba(X)
+    best = proba.argmax(axis=1)
+    return model.classes_[best], proba[np.arange(len(proba)), best]
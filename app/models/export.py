@@ -0,0 +1,268 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from models.registry import load_model
+
+# compiled forms live next to the native pickle: <name>.so / <name>.onnx
+LGBM_SUFFIX = ".so"      # treelite / tl2cgen shared library (float64, same output as the booster)
+RF_SUFFIX = ".onnx"      # ONNX for onnxruntime (float32, like sklearn's own trees)
+# exports whose output drifts further than this from the native model are
+# dropped (ONNX sums the forest's probabilities in float32)
+PARITY_TOLERANCE = {"LGBMRegressor": 1e-9, "RandomForestClassifier": 1e-5}
+
+
+def export_path(model_path: str, suffix: str) -> str:
+    return os.path.splitext(model_path)[0] + suffix
+
+
+def _fresh(path, model_path) -> bool:
+    """An export counts only if it is at least as new as the pickle it came from."""
+    try:
+        return os.stat(path).st_mtime_ns >= os.stat(model_path).st_mtime_ns
+    except OSError:
+        return False
+
+
+def _replace_into(path, write):
+    """write(tmp_path), then rename over `path` (a loaded .so keeps its old inode)."""
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tmp-", suffix=os.path.basename(path))
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _private_copy(path) -> str:
+    """
+    Copy of a shared library under a path no earlier load used: dlopen
+    hands back the library already loaded under a name, so a retrained
+    model re-exported to the same <name>.so would otherwise keep serving
+    the first one.
+    """
+    folder = tempfile.mkdtemp(prefix="export-")
+    copy = os.path.join(folder, os.path.basename(path))
+    shutil.copyfile(path, copy)
+    return copy
+
+
+# ------------------ Runtimes ------------------ #
+class CompiledRegressor:
+    """
+    LightGBM regressor compiled to a shared library by treelite/tl2cgen.
+    Same predict() interface as the native model; extra kwargs
+    (num_threads) are accepted and ignored.
+    """
+
+    def __init__(self, path: str, nthread: int = 1):
+        import tl2cgen
+
+        self._tl2cgen = tl2cgen
+        self.path = path
+        copy = _private_copy(path)
+        try:
+            self.predictor = tl2cgen.Predictor(copy, nthread=nthread)
+        finally:
+            # the loaded mapping outlives the file (Windows keeps it locked: then it stays)
+            shutil.rmtree(os.path.dirname(copy), ignore_errors=True)
+
+    def predict(self, X, **kwargs) -> np.ndarray:
+        X = np.ascontiguousarray(np.asarray(X, dtype=np.float64))
+        out = self.predictor.predict(self._tl2cgen.DMatrix(X, dtype="float64"))
+        return np.asarray(out, dtype=np.float64).reshape(len(X))
+
+
+class OnnxClassifier:
+    """
+    RandomForest classifier as an onnxruntime session, with the sklearn
+    predict/predict_proba/classes_ interface. One single-threaded session
+    per model: tree inference on a few rows is latency-bound.
+    """
+
+    def __init__(self, path: str):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = 1
+        options.inter_op_num_threads = 1
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.classes_ = np.asarray(json.loads(meta["classes"]))
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        proba = self.session.run(["probabilities"], {self.input_name: X})[0]
+        # drop float32 summation noise so exact ties (e.g. 0.5/0.5) resolve like sklearn
+        return np.round(proba.astype(np.float64), 6)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+# ------------------ Export ------------------ #
+def _compiler():
+    return next((cc for cc in ("gcc", "clang") if shutil.which(cc)), None)
+
+
+def export_lgbm(model, model_path: str, threads: int = None) -> str:
+    """
+    Compile a fitted LGBMRegressor to <model>.so with up to `threads`
+    compiler jobs (default: CPU count, at most 8). None without
+    treelite/tl2cgen or a C compiler.
+    """
+    try:
+        import tl2cgen
+        import treelite
+    except ImportError:
+        return None
+    toolchain = _compiler()
+    if toolchain is None:
+        return None
+    compiled = treelite.frontend.from_lightgbm(model.booster_)
+    path = export_path(model_path, LGBM_SUFFIX)
+    _replace_into(path, lambda tmp: tl2cgen.export_lib(
+        compiled, toolchain=toolchain, libpath=tmp, params={"parallel_comp": threads or min(os.cpu_count() or 1, 8)}))
+    return path
+
+
+def export_rf(model, model_path: str, threads: int = None) -> str:
+    """Convert a fitted RandomForestClassifier to <model>.onnx. None without skl2onnx."""
+    try:
+        from skl2onnx import to_onnx
+    except ImportError:
+        return None
+    sample = np.zeros((1, model.n_features_in_), dtype=np.float32)
+    onx = to_onnx(model, sample, options={id(model): {"zipmap": False}})
+    meta = onx.metadata_props.add()
+    meta.key, meta.value = "classes", json.dumps(model.classes_.tolist())
+    path = export_path(model_path, RF_SUFFIX)
+
+    def write(tmp):
+        with open(tmp, "wb") as f:
+            f.write(onx.SerializeToString())
+
+    _replace_into(path, write)
+    return path
+
+
+EXPORTERS = {"LGBMRegressor": (export_lgbm, CompiledRegressor),
+             "RandomForestClassifier": (export_rf, OnnxClassifier)}
+LOADERS = {LGBM_SUFFIX: CompiledRegressor, RF_SUFFIX: OnnxClassifier}
+
+
+def export_model(model, model_path: str, X_check=None, threads: int = None) -> str:
+    """
+    Export a trained tree model next to its pickle at `model_path`, the
+    build using at most `threads` cores (e.g. a pool worker's share). With
+    `X_check`, the export is scored against the native model and removed if
+    it does not match. Returns the export path, or None when the model
+    type or the toolchain is not supported (callers then use the pickle).
+    """
+    exporter, runtime = EXPORTERS.get(type(model).__name__, (None, None))
+    if exporter is None:
+        return None
+    try:
+        path = exporter(model, model_path, threads)
+    except Exception:
+        # export is an optimisation: a failed compile leaves the native path
+        return None
+    if path is not None and X_check is not None and len(X_check):
+        if parity(model, runtime(path), X_check) > PARITY_TOLERANCE[type(model).__name__]:
+            os.remove(path)
+            return None
+    return path
+
+
+def parity(native, fast, X) -> float:
+    """Largest absolute difference between native and exported outputs on X."""
+    X = np.asarray(X, dtype=np.float64)
+    if hasattr(native, "feature_names_in_"):
+        import pandas as pd
+        # fitted on a DataFrame: score it the same way
+        X = pd.DataFrame(X, columns=native.feature_names_in_)
+    if hasattr(native, "predict_proba"):
+        labels_differ = float((native.predict(X) != fast.predict(X)).any())
+        return max(labels_differ, float(np.abs(native.predict_proba(X) - fast.predict_proba(X)).max()))
+    return float(np.abs(native.predict(X) - fast.predict(X)).max())
+
+
+# ------------------ Loading ------------------ #
+def load_export(model_path: str):
+    """The compiled/ONNX form of the model at `model_path`, or None if there is no usable one."""
+    for suffix, runtime in LOADERS.items():
+        path = export_path(model_path, suffix)
+        if _fresh(path, model_path):
+            try:
+                return load_model(path, loader=runtime)
+            except (ImportError, OSError):
+                # runtime not installed here (or an export from another platform)
+                return None
+    return None
+
+
+def load_predictor(model_path: str):
+    """Exported model when available, otherwise the native pickle (both cached in the registry)."""
+    fast = load_export(model_path)
+    return fast if fast is not None else load_model(model_path)
+
+
+if __name__ == "__main__":
+    # from the repo root: PYTHONPATH=app python -m models.export [model.pkl]
+    import sys
+    import time
+
+    import lightgbm as lgb
+    from sklearn.ensemble import RandomForestClassifier
+
+    from models.export import export_model, load_export, parity
+
+    def bench(fn, repeat):
+        fn()
+        t = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - t) / repeat * 1e6
+
+    rng = np.random.default_rng(0)
+    n = 20_000
+    close = 50_000 + np.cumsum(rng.normal(0, 50, n))
+    X = np.c_[close, rng.uniform(0, 100, n), rng.normal(0, 1e-3, n), close + rng.normal(0, 100, n),
+              rng.uniform(0, 100, n)]
+    folder = tempfile.mkdtemp()
+    models = []
+    if len(sys.argv) > 1:
+        models.append(("given", load_model(sys.argv[1]), sys.argv[1]))
+    else:
+        models.append(("lgbm", lgb.LGBMRegressor(verbose=-1).fit(X, np.roll(close, -1)),
+                       os.path.join(folder, "lgbm.pkl")))
+    models.append(("rf", RandomForestClassifier(100, random_state=0).fit(X, (np.roll(close, -1) > close).astype(int)),
+                   os.path.join(folder, "rf.pkl")))
+
+    for label, native, path in models:
+        if not os.path.exists(path):
+            open(path, "wb").close()
+        t = time.perf_counter()
+        out = export_model(native, path, X[:2000])
+        if out is None:
+            print(f"{label}: no export (runtime/toolchain missing or parity failed)")
+            continue
+        print(f"{label}: exported {os.path.basename(out)} in {time.perf_counter() - t:.1f}s, "
+              f"max |diff| on {n} rows = {parity(native, load_export(path), X):.3g}")
+        fast = load_export(path)
+        score = "predict_proba" if hasattr(native, "predict_proba") else "predict"
+        for rows, repeat in ((1, 2000), (1000, 50)):
+            batch = X[-rows:]
+            a = bench(lambda: getattr(native, score)(batch), repeat)
+            b = bench(lambda: getattr(fast, score)(batch), repeat)
+            print(f"   {rows:5d} rows  native {a:9.1f} us   exported {b:9.1f} us   x{a / b:.1f}")
@@ -0,0 +1,192 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# scipy.signal.lfilter, resolved on first use: importing scipy.signal takes
+# over a second, which every page importing this module would pay
+_lfilter = None
+
+# Bump whenever a feature definition below changes: cached feature
+# matrices (utils.dataset_cache) are keyed by it
+FEATURE_SPEC_VERSION = 1
+
+# Feature columns used by the LightGBM price predictor
+LGB_FEATURES = ["Close", "Volume", "returns", "sma20", "rsi14"]
+# Feature columns used by the RandomForest direction classifier
+RF_FEATURES = ["SMA_10", "EMA_10", "RSI", "MACD", "Signal"]
+
+
+# ------------------ Batch mode (NumPy) ------------------ #
+def _get_lfilter():
+    global _lfilter
+    if _lfilter is None:
+        try:
+            from scipy.signal import lfilter
+        except ImportError:  # scipy is optional, fall back to a Python loop
+            lfilter = False
+        _lfilter = lfilter
+    return _lfilter
+
+
+def pct_change(x: np.ndarray) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[1:] = x[1:] / x[:-1] - 1
+    return out
+
+
+def sma(x: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    if len(x) >= window:
+        out[window - 1:] = sliding_window_view(x, window).mean(axis=1)
+    return out
+
+
+def ewm_mean(x: np.ndarray, alpha: float, min_periods: int = 0) -> np.ndarray:
+    """
+    Same as pandas `ewm(alpha=alpha, adjust=False, min_periods=...).mean()`
+    for a series without NaNs.
+    """
+    if x.size == 0:
+        return np.empty(0)
+    lfilter = _get_lfilter()
+    if lfilter:
+        out, _ = lfilter([alpha], [1, alpha - 1], x, zi=[(1 - alpha) * x[0]])
+    else:
+        out = np.empty(x.shape)
+        acc = x[0]
+        for i, v in enumerate(x):
+            acc = acc + alpha * (v - acc)
+            out[i] = acc
+    if min_periods > 1:
+        out[:min_periods - 1] = np.nan
+    return out
+
+
+def rsi_wilder(close: np.ndarray, window: int = 14) -> np.ndarray:
+    """RSI with Wilder smoothing (same values as `ta.momentum.RSIIndicator`)."""
+    # the first candle counts as a zero move, like `ta` does
+    diff = np.zeros(close.shape)
+    diff[1:] = np.diff(close)
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+    ema_up = ewm_mean(up, 1 / window, window)
+    ema_down = ewm_mean(down, 1 / window, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(ema_down == 0, 100.0, 100 - 100 / (1 + ema_up / ema_down))
+
+
+def rsi_sma(price: np.ndarray, window: int = 14) -> np.ndarray:
+    """RSI from simple rolling means of gains and losses."""
+    diff = np.zeros(price.shape)
+    diff[1:] = np.diff(price)
+    avg_gain = sma(np.where(diff > 0, diff, 0.0), window)
+    avg_loss = sma(np.where(diff < 0, -diff, 0.0), window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+def lgb_features(close, volume) -> np.ndarray:
+    """(n, 5) matrix of LGB_FEATURES; warm-up rows contain NaN."""
+    close = np.asarray(close, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    return np.column_stack([
+        close, volume, pct_change(close), sma(close, 20), rsi_wilder(close, 14)
+    ])
+
+
+def rf_features(price) -> np.ndarray:
+    """(n, 5) matrix of RF_FEATURES; warm-up rows contain NaN."""
+    price = np.asarray(price, dtype=float)
+    ema12 = ewm_mean(price, 2 / 13)
+    ema26 = ewm_mean(price, 2 / 27)
+    macd = ema12 - ema26
+    return np.column_stack([
+        sma(price, 10), ewm_mean(price, 2 / 11), rsi_sma(price, 14), macd, ewm_mean(macd, 2 / 10)
+    ])
+
+
+# ------------------ Streaming mode (O(1) per candle) ------------------ #
+class _Rolling:
+    def __init__(self, window):
+        self.window = window
+        self.values = np.zeros(window)
+        self.n = 0
+        self.total = 0.0
+
+    def update(self, x):
+        slot = self.n % self.window
+        self.total += x - self.values[slot]
+        self.values[slot] = x
+        self.n += 1
+        return self.total / self.window if self.n >= self.window else np.nan
+
+
+class _EWM:
+    def __init__(self, alpha, min_periods=0):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = None
+        self.n = 0
+
+    def update(self, x):
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        self.n += 1
+        return self.value if self.n >= self.min_periods else np.nan
+
+
+class StreamingLGBFeatures:
+    """
+    Carries SMA/RSI state forward so each new candle costs O(1).
+    `update()` returns the LGB_FEATURES row for that candle.
+    """
+
+    def __init__(self):
+        self.prev = None
+        self.sma20 = _Rolling(20)
+        self.up = _EWM(1 / 14, 14)
+        self.down = _EWM(1 / 14, 14)
+
+    def update(self, close: float, volume: float) -> np.ndarray:
+        sma20 = self.sma20.update(close)
+        diff = 0.0 if self.prev is None else close - self.prev
+        returns = close / self.prev - 1 if self.prev else np.nan
+        up = self.up.update(max(diff, 0.0))
+        down = self.down.update(max(-diff, 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100.0 if down == 0 else 100 - 100 / (1 + np.float64(up) / down)
+        self.prev = close
+        return np.array([close, volume, returns, sma20, rsi])
+
+
+class StreamingRFFeatures:
+    """Streaming counterpart of rf_features(); `update()` returns one RF_FEATURES row."""
+
+    def __init__(self):
+        self.prev = None
+        self.sma10 = _Rolling(10)
+        self.ema10 = _EWM(2 / 11)
+        self.ema12 = _EWM(2 / 13)
+        self.ema26 = _EWM(2 / 27)
+        self.signal = _EWM(2 / 10)
+        self.gain = _Rolling(14)
+        self.loss = _Rolling(14)
+
+    def update(self, price: float) -> np.ndarray:
+        diff = 0.0 if self.prev is None else price - self.prev
+        self.prev = price
+        avg_gain = self.gain.update(max(diff, 0.0))
+        avg_loss = self.loss.update(max(-diff, 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100 - 100 / (1 + np.float64(avg_gain) / avg_loss)
+        macd = self.ema12.update(price) - self.ema26.update(price)
+        return np.array([
+            self.sma10.update(price), self.ema10.update(price), rsi, macd, self.signal.update(macd)
+        ])
+
+
+def stream_lgb_features(close, volume, state=None):
+    """Run the streaming engine over arrays; returns (rows, state)."""
+    state = state or StreamingLGBFeatures()
+    rows = np.array([state.update(c, v) for c, v in zip(close, volume)])
+    return rows.reshape(-1, len(LGB_FEATURES)), state
+
@@ -0,0 +1,182 @@
+import json
+import os
+import shutil
+
+import joblib
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# TensorFlow and scikit-learn are imported where they are used: importing
+# this module (e.g. for predict_signal) must not pay for them at page load
+
+
+# ------------------ Prepare Data for LSTM ------------------ #
+def prepare_lstm_data(df, window_size=30):
+    """
+    (X, y, scaler): X holds every `window_size` run of scaled prices as a
+    strided view over one array (samples, timesteps, 1) — no per-window copies.
+    """
+    from sklearn.preprocessing import MinMaxScaler
+
+    scaler = MinMaxScaler()
+    scaled = scaler.fit_transform(df[["price"]])[:, 0]
+
+    # window i covers prices [i, i + window_size) and predicts the next one
+    X = sliding_window_view(scaled[:-1], window_size)[..., np.newaxis]
+    # If next price > current → Buy (1), else Sell (-1)
+    y = np.where(scaled[window_size:] > scaled[window_size - 1:-1], 1, -1)
+    return X, y, scaler
+
+
+def prepare_window_data(df, window_size=30):
+    """
+    (X, y) with every window min-max scaled over its own prices
+    (models.lstm_infer.scale_windows), the basis the shared model is
+    trained and served on: no per-coin scaler to store or to go stale.
+    """
+    from models.lstm_infer import scale_windows
+
+    prices = df["price"].to_numpy(dtype=float)
+    X = scale_windows(sliding_window_view(prices[:-1], window_size))[..., np.newaxis]
+    y = np.where(prices[window_size:] > prices[window_size - 1:-1], 1, -1)
+    return X, y
+
+
+def _progress_callback(tf, progress, epochs):
+    class ProgressCallback(tf.keras.callbacks.Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            progress((epoch + 1) / epochs, f"Epoch {epoch + 1}/{epochs}")
+
+    return ProgressCallback()
+
+
+# ------------------ Train LSTM Model ------------------ #
+def _fit(X, y, epochs, progress, holdout=None):
+    """
+    Fit the two-layer LSTM signal model on windows X (samples, timesteps, 1).
+    Returns (model, accuracy on the last `holdout` samples, default 20%).
+    """
+    import tensorflow as tf
+
+    # chronological 80/20 split; slicing keeps the windows as views
+    split = len(X) - (int(np.ceil(len(X) * 0.2)) if holdout is None else holdout)
+    X_train, X_test, y_train, y_test = X[:split], X[split:], y[:split], y[split:]
+
+    model = tf.keras.Sequential([
+        tf.keras.layers.LSTM(50, return_sequences=True, input_shape=(X.shape[1], 1)),
+        tf.keras.layers.Dropout(0.2),
+        tf.keras.layers.LSTM(50, return_sequences=False),
+        tf.keras.layers.Dropout(0.2),
+        tf.keras.layers.Dense(25, activation='relu'),
+        tf.keras.layers.Dense(1, activation='tanh')  # -1 to 1 (Sell to Buy)
+    ])
+
+    model.compile(optimizer='adam', loss='mse', metrics=['accuracy'])
+    callbacks = [_progress_callback(tf, progress, epochs)] if progress else []
+    model.fit(X_train, y_train, epochs=epochs, batch_size=32, verbose=0, callbacks=callbacks)
+
+    loss, acc = model.evaluate(X_test, y_test, verbose=0)
+    return model, acc
+
+
+def train_lstm(df, window_size=30, epochs=5, progress=None):
+    """
+    Fit the LSTM on one price series. `progress(fraction, message)`
+    is called after every epoch.
+    """
+    X, y, scaler = prepare_lstm_data(df, window_size)
+    model, acc = _fit(X, y, epochs, progress)
+    return model, acc, scaler
+
+
+def train_shared_lstm(frames: dict, window_size=30, epochs=5, progress=None):
+    """
+    One model for several coins: each window is scaled over its own
+    prices and the last 20% of every coin's windows is held out.
+    Returns (model, accuracy).
+    """
+    train, test = [], []
+    for df in frames.values():
+        X, y = prepare_window_data(df, window_size)
+        split = len(X) - int(np.ceil(len(X) * 0.2))
+        train.append((X[:split], y[:split]))
+        test.append((X[split:], y[split:]))
+    X = np.concatenate([X for X, _ in train + test])
+    y = np.concatenate([y for _, y in train + test])
+    return _fit(X, y, epochs, progress, holdout=sum(len(y) for _, y in test))
+
+
+def predict_signal(model, scaler, prices, window_size=30) -> float:
+    """
+    LSTM output in [-1, 1] for the last `window_size` prices, straight
+    through Keras. Serving uses models.lstm_infer instead.
+    """
+    last_data = np.asarray(prices, dtype=float)[-window_size:]
+    scaled_last_data = scaler.transform(last_data.reshape(-1, 1))
+    X_input = np.reshape(scaled_last_data, (1, window_size, 1))
+    return float(model.predict(X_input, verbose=0)[0][0])
+
+
+# ------------------ Artifacts ------------------ #
+def save_lstm(artifact: dict, path: str, quantization: str = None):
+    """
+    Save {"model", "scaler", "accuracy", "window_size"} as a directory:
+    Keras model + pickled rest, plus quantized TFLite graphs and a
+    meta.json for models.lstm_infer. Without a scaler the model is taken
+    to be trained on per-window scaling (train_shared_lstm). Renamed into place when complete
+    (replacing an older save of the same path).
+    """
+    from models.lstm_infer import META_FILE, QUANTIZATION, export_tflite, scale_params
+
+    quantization = quantization or QUANTIZATION
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    artifact["model"].save(os.path.join(tmp, "model.keras"))
+    joblib.dump({k: v for k, v in artifact.items() if k != "model"}, os.path.join(tmp, "meta.pkl"))
+    meta = {"window_size": int(artifact["window_size"]), "accuracy": float(artifact["accuracy"]),
+            "scale": scale_params(artifact.get("scaler")),
+            "scaling": "fit" if artifact.get("scaler") is not None else "window", "quantization": quantization,
+            "tflite": export_tflite(artifact["model"], tmp, int(artifact["window_size"]), quantization)}
+    with open(os.path.join(tmp, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    if os.path.exists(path):
+        # a directory cannot be renamed over a non-empty one: move the old one aside first
+        old = path + ".old"
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.replace(tmp, path)
+
+
+def load_lstm(path: str) -> dict:
+    import tensorflow as tf
+
+    artifact = joblib.load(os.path.join(path, "meta.pkl"))
+    artifact["model"] = tf.keras.models.load_model(os.path.join(path, "model.keras"))
+    return artifact
+
+
+if __name__ == "__main__":
+    # offline trainer for the shared model the Strategy page serves
+    # from the repo root: PYTHONPATH=app python -m models.lstm [days] [epochs]
+    import sys
+
+    from models.lstm_infer import SHARED_LSTM_PATH
+    from services.market_data import get_client
+
+    COINS = ["bitcoin", "ethereum"]
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 365
+    epochs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    frames = {coin: get_client().get_market_chart(coin, days) for coin in COINS}
+    model, acc = train_shared_lstm(frames, window_size=30, epochs=epochs,
+                                   progress=lambda f, msg: print(f"  {msg}"))
+    save_lstm({"model": model, "scaler": None, "accuracy": acc, "window_size": 30}, SHARED_LSTM_PATH)
+    with open(os.path.join(SHARED_LSTM_PATH, "meta.json")) as f:
+        exported = json.load(f)["tflite"]
+    print(f"✅ Shared LSTM ({', '.join(COINS)}) accuracy {acc:.2f}, saved to {SHARED_LSTM_PATH} "
+          f"({len(exported)} TFLite graphs)")
@@ -0,0 +1,332 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from models.registry import load_model
+
+# CPU inference for the LSTM signal model. The trained Keras model is
+# converted to TFLite at save time, one fixed-shape graph per batch size;
+# predictions then run on the standalone LiteRT interpreter, so neither
+# TensorFlow nor scikit-learn is imported to score a window.
+
+META_FILE = "meta.json"
+# "float16" (half-size weights) or "int8" (dynamic range: int8 weights, float activations)
+QUANTIZATION = "float16"
+# the TFLite LSTM graph only converts with a static batch dimension
+BATCH_SIZES = (1, 8)
+# exported graphs whose output drifts further than this from Keras are dropped
+PARITY_TOLERANCE = 5e-3
+# model output above +threshold is BUY, below -threshold SELL, HOLD in between
+# (the default; models/sweep.py tunes it)
+SIGNAL_THRESHOLD = 0.2
+
+SHARED_LSTM_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "models",
+                                                "lstm", "shared.lstm"))
+
+
+def _interpreter_class():
+    """LiteRT, then the older tflite-runtime wheel, then TensorFlow's own copy."""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+
+def scale_params(scaler):
+    """(min_, scale_) of a fitted single-column MinMaxScaler, or None."""
+    if scaler is None:
+        return None
+    return [float(scaler.min_[0]), float(scaler.scale_[0])]
+
+
+def scale_windows(windows) -> np.ndarray:
+    """Min-max scale every window (last axis) over its own prices; a flat window scales to 0."""
+    windows = np.asarray(windows, dtype=np.float64)
+    low = windows.min(axis=-1, keepdims=True)
+    span = windows.max(axis=-1, keepdims=True) - low
+    return (windows - low) / np.where(span > 0, span, 1.0)
+
+
+def signal_from_output(value: float, threshold: float = SIGNAL_THRESHOLD) -> str:
+    if value > threshold:
+        return "BUY"
+    if value < -threshold:
+        return "SELL"
+    return "HOLD"
+
+
+# ------------------ Predictors ------------------ #
+class SignalModel:
+    """
+    Windowing and scaling shared by the predictors. With a stored
+    (min_, scale_) every series is scaled like the training prices; a
+    model trained on several coins has none, and each window is then
+    min-max scaled over its own prices, as in training, so the signal
+    does not depend on how much history the caller passes in.
+    """
+
+    def __init__(self, window_size: int, scale=None, accuracy: float = None):
+        self.window_size = int(window_size)
+        self.scale = scale
+        self.accuracy = accuracy
+
+    def window(self, prices) -> np.ndarray:
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(prices) < self.window_size:
+            raise ValueError(f"need {self.window_size} prices, got {len(prices)}")
+        last = prices[-self.window_size:]
+        if self.scale is None:
+            return scale_windows(last).astype(np.float32)
+        min_, scale = self.scale
+        return (last * scale + min_).astype(np.float32)
+
+    def predict(self, windows: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def predict_signal(self, prices) -> float:
+        """LSTM output in [-1, 1] for the last `window_size` prices."""
+        return float(self.predict(self.window(prices)[np.newaxis])[0])
+
+    def predict_signals(self, series: dict) -> dict:
+        """{name: signal} for many price series (e.g. one per coin) in as few calls as possible."""
+        names = list(series)
+        if not names:
+            return {}
+        out = self.predict(np.stack([self.window(series[n]) for n in names]))
+        return dict(zip(names, out.tolist()))
+
+
+class LSTMPredictor(SignalModel):
+    """
+    Exported LSTM on the TFLite interpreter. One interpreter per exported
+    batch size with tensors allocated once; a call is split into chunks of
+    the largest batch and each chunk is zero-padded up to the smallest
+    graph that fits it.
+    """
+
+    def __init__(self, path: str, num_threads: int = 1):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        if not meta.get("tflite"):
+            raise ValueError(f"{path} has no TFLite export")
+        super().__init__(meta["window_size"], meta.get("scale"), meta.get("accuracy"))
+        self.path = path
+        self.quantization = meta.get("quantization")
+        Interpreter = _interpreter_class()
+        self._runners = {}
+        for batch, name in meta["tflite"].items():
+            interpreter = Interpreter(model_path=os.path.join(path, name), num_threads=num_threads)
+            interpreter.allocate_tensors()
+            self._runners[int(batch)] = (interpreter, interpreter.get_input_details()[0]["index"],
+                                         interpreter.get_output_details()[0]["index"])
+        self.batch_sizes = sorted(self._runners)
+        # an interpreter holds its tensors: one call at a time
+        self._lock = threading.Lock()
+
+    def predict(self, windows: np.ndarray) -> np.ndarray:
+        windows = np.asarray(windows, dtype=np.float32).reshape(-1, self.window_size, 1)
+        out = np.empty(len(windows), dtype=np.float64)
+        step = self.batch_sizes[-1]
+        with self._lock:
+            for start in range(0, len(windows), step):
+                chunk = windows[start:start + step]
+                n = len(chunk)
+                batch = next(b for b in self.batch_sizes if b >= n)
+                if batch > n:
+                    chunk = np.concatenate([chunk, np.zeros((batch - n, self.window_size, 1), dtype=np.float32)])
+                interpreter, inp, outp = self._runners[batch]
+                interpreter.set_tensor(inp, chunk)
+                interpreter.invoke()
+                out[start:start + n] = interpreter.get_tensor(outp)[:n, 0]
+        return out
+
+
+class KerasPredictor(SignalModel):
+    """
+    Fallback when there is no usable export: the Keras model behind a
+    tf.function traced once for (any batch, window_size, 1), instead of
+    model.predict's per-call setup.
+    """
+
+    def __init__(self, model, window_size: int, scale=None, accuracy: float = None):
+        import tensorflow as tf
+
+        super().__init__(window_size, scale, accuracy)
+        self.model = model
+        self._call = tf.function(lambda x: model(x, training=False),
+                                 input_signature=[tf.TensorSpec([None, self.window_size, 1], tf.float32)])
+
+    def predict(self, windows: np.ndarray) -> np.ndarray:
+        windows = np.asarray(windows, dtype=np.float32).reshape(-1, self.window_size, 1)
+        return self._call(windows).numpy()[:, 0].astype(np.float64)
+
+
+# ------------------ Export ------------------ #
+def _convert(tf, model, batch: int, window_size: int, quantization: str) -> bytes:
+    # the same layers behind a static (batch, window, 1) input
+    inputs = tf.keras.Input(batch_shape=(batch, window_size, 1))
+    fixed = tf.keras.Model(inputs, model(inputs))
+    converter = tf.lite.TFLiteConverter.from_keras_model(fixed)
+    if quantization in ("float16", "int8"):
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    return converter.convert()
+
+
+def export_tflite(model, folder: str, window_size: int, quantization: str = QUANTIZATION,
+                  batch_sizes=BATCH_SIZES) -> dict:
+    """
+    Write model-b<batch>.<quantization>.tflite files into `folder` and
+    return {batch: file name} for those within PARITY_TOLERANCE of the
+    Keras model. Empty when conversion fails (the Keras model is then used).
+    """
+    import tensorflow as tf
+
+    # scaled random walks as the parity sample
+    rng = np.random.default_rng(0)
+    walks = np.cumsum(rng.normal(0, 1, (max(batch_sizes), window_size)), axis=1)
+    walks = (walks - walks.min(axis=1, keepdims=True)) / np.ptp(walks, axis=1, keepdims=True)
+    sample = walks[..., np.newaxis].astype(np.float32)
+    expected = model(sample, training=False).numpy()
+
+    Interpreter = _interpreter_class()
+    exported = {}
+    for batch in batch_sizes:
+        name = f"model-b{batch}.{quantization}.tflite"
+        try:
+            blob = _convert(tf, model, batch, window_size, quantization)
+        except Exception:
+            # export is an optimisation: keep whatever converted
+            continue
+        interpreter = Interpreter(model_content=blob)
+        interpreter.allocate_tensors()
+        interpreter.set_tensor(interpreter.get_input_details()[0]["index"], sample[:batch])
+        interpreter.invoke()
+        got = interpreter.get_tensor(interpreter.get_output_details()[0]["index"])
+        if np.abs(got - expected[:batch]).max() > PARITY_TOLERANCE:
+            continue
+        with open(os.path.join(folder, name), "wb") as f:
+            f.write(blob)
+        exported[str(batch)] = name
+    if exported and "1" not in exported:
+        # every call size needs a graph that fits it
+        return {}
+    return exported
+
+
+# ------------------ Loading ------------------ #
+def _load_keras(path):
+    from models.lstm import load_lstm
+
+    artifact = load_lstm(path)
+    return KerasPredictor(artifact["model"], artifact["window_size"], scale_params(artifact.get("scaler")),
+                          artifact.get("accuracy"))
+
+
+def load_lstm_predictor(path: str) -> SignalModel:
+    """
+    Predictor for the saved LSTM artifact directory at `path`: the TFLite
+    export when there is one and an interpreter to run it, the Keras model
+    otherwise (e.g. artifacts saved before exports existed). Cached in the
+    model registry and reloaded when the artifact is replaced.
+    """
+    try:
+        return load_model(os.path.join(path, META_FILE), loader=lambda p: LSTMPredictor(os.path.dirname(p)))
+    except (ImportError, ValueError, OSError):
+        return load_model(os.path.join(path, "model.keras"), loader=lambda p: _load_keras(os.path.dirname(p)))
+
+
+def shared_lstm_predictor():
+    """
+    The offline-trained multi-coin model (python -m models.lstm), or None
+    if it was never trained or predates per-window scaling (retrain it).
+    """
+    try:
+        with open(os.path.join(SHARED_LSTM_PATH, META_FILE)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("scaling") != "window":
+        # trained on prices scaled over each coin's whole history
+        return None
+    return load_lstm_predictor(SHARED_LSTM_PATH)
+
+
+if __name__ == "__main__":
+    # from the repo root: PYTHONPATH=app python -m models.lstm_infer
+    import subprocess
+    import sys
+    import tempfile
+    import time
+
+    import pandas as pd
+
+    from models.lstm import load_lstm, predict_signal, save_lstm, train_lstm
+    from models.lstm_infer import KerasPredictor, LSTMPredictor, scale_params
+
+    def bench(fn, repeat):
+        fn()
+        t = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - t) / repeat * 1e3
+
+    def cold(code):
+        env = {**os.environ, "PYTHONPATH": os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+               "TF_CPP_MIN_LOG_LEVEL": "3"}
+        out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+        return float(out.stdout.strip().splitlines()[-1])
+
+    rng = np.random.default_rng(0)
+    coins = {f"coin{i}": 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 500))) for i in range(8)}
+    prices = coins["coin0"]
+    model, acc, scaler = train_lstm(pd.DataFrame({"price": prices}), window_size=30, epochs=2)
+    artifact = {"model": model, "scaler": scaler, "accuracy": acc, "window_size": 30}
+    folder = tempfile.mkdtemp()
+    paths = {}
+    for quantization in ("float16", "int8"):
+        paths[quantization] = os.path.join(folder, f"{quantization}.lstm")
+        save_lstm(dict(artifact), paths[quantization], quantization=quantization)
+
+    print("cold load + first prediction (fresh process)")
+    keras_cold = cold(f"import time; t = time.perf_counter()\n"
+                      f"import numpy as np\nfrom models.lstm import load_lstm, predict_signal\n"
+                      f"a = load_lstm({paths['float16']!r})\n"
+                      f"predict_signal(a['model'], a['scaler'], np.linspace(1, 2, 60), 30)\n"
+                      f"print(time.perf_counter() - t)")
+    print(f"   keras            {keras_cold:7.2f} s")
+    for quantization, path in paths.items():
+        seconds = cold(f"import time; t = time.perf_counter()\n"
+                       f"import numpy as np\nfrom models.lstm_infer import LSTMPredictor\n"
+                       f"LSTMPredictor({path!r}).predict_signal(np.linspace(1, 2, 60))\n"
+                       f"print(time.perf_counter() - t)")
+        print(f"   tflite {quantization:9s} {seconds:7.2f} s   x{keras_cold / seconds:.0f}")
+
+    keras = load_lstm(paths["float16"])["model"]
+    compiled = KerasPredictor(keras, 30, scale_params(scaler), acc)
+    lite = {q: LSTMPredictor(p) for q, p in paths.items()}
+    reference = predict_signal(keras, scaler, prices, 30)
+    print(f"one coin, per prediction (ms)   [|diff| vs model.predict]")
+    current = bench(lambda: predict_signal(keras, scaler, prices, 30), 20)
+    print(f"   keras model.predict   {current:8.3f}")
+    for label, predictor in [("keras tf.function", compiled)] + [(f"tflite {q}", p) for q, p in lite.items()]:
+        ms = bench(lambda: predictor.predict_signal(prices), 200)
+        diff = abs(predictor.predict_signal(prices) - reference)
+        print(f"   {label:20s}  {ms:8.3f}   x{current / ms:.0f}   [{diff:.1e}]")
+
+    print(f"{len(coins)} coins (ms): one call per coin vs one batched call")
+    for label, predictor in [("keras tf.function", compiled)] + [(f"tflite {q}", p) for q, p in lite.items()]:
+        looped = bench(lambda: [predictor.predict_signal(p) for p in coins.values()], 50)
+        batched = bench(lambda: predictor.predict_signals(coins), 50)
+        print(f"   {label:20s}  {looped:8.3f}  {batched:8.3f}")
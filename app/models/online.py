@@ -0,0 +1,301 @@
+import os
+import threading
+import time
+
+from models.export import export_model
+from models.features import FEATURE_SPEC_VERSION
+from models.pipeline import (DEFAULT_MODEL_PATH, DEFAULT_SYMBOLS, MIN_ROWS, MODEL_DIR, RESERVED_SUFFIX,
+                             allocate_version, manifest_entry, manifest_lock, model_path_for, pair_folder,
+                             record_version, release_version, versions_on_disk)
+from models.price_predictor import continue_model, training_matrix
+from models.registry import atomic_dump, load_model
+from services.market_data import INTERVAL_MS
+from services.signal_worker import DEFAULT_COINS, DEFAULT_DAYS
+
+# pairs kept fresh by default: the timeframes the AI Assistant page offers
+ONLINE_INTERVALS = ["1m", "5m", "15m", "1h"]
+# RandomForest histories kept fresh by default: the ones the signal worker scores
+ONLINE_COINS = [(coin, DEFAULT_DAYS) for coin in DEFAULT_COINS]
+# closed candles every update is fitted on (the sliding window)
+WINDOW = 440
+# extra candles fetched so the window's rolling features are warmed up
+WARMUP = 40
+# closed candles a pair must gain before its model is updated again
+MIN_NEW_CANDLES = 5
+# boosting rounds added per update, and the size at which the booster is refitted on the window
+ROUNDS = 10
+MAX_TREES = 300
+# published versions kept on disk per pair
+KEEP_VERSIONS = 3
+UPDATE_PERIOD = 60.0
+
+
+# ------------------ One update ------------------ #
+def _prune(symbol, interval, model_dir=MODEL_DIR, keep=KEEP_VERSIONS):
+    """
+    Remove v<n>.* (pickle and exports) of all but the newest `keep`
+    versions. The manifest's current version and versions reserved by a
+    trainer still running (e.g. a train_all run) are always kept.
+    """
+    folder = pair_folder(symbol, interval, model_dir)
+    with manifest_lock(model_dir):
+        versions = versions_on_disk(folder)
+        current = (manifest_entry(symbol, interval, model_dir) or {}).get("version")
+        reserved = {v for v, names in versions.items() if any(n.endswith(RESERVED_SUFFIX) for n in names)}
+        kept = set(sorted(versions)[-keep:]) | reserved | {current}
+        for version, names in versions.items():
+            if version not in kept:
+                for name in names:
+                    try:
+                        os.remove(os.path.join(folder, name))
+                    except OSError:
+                        pass
+
+
+def update_lgbm(symbol: str, interval: str, candles, model_dir: str = MODEL_DIR, now_ms: float = None,
+                min_new: int = MIN_NEW_CANDLES, window: int = WINDOW, rounds: int = ROUNDS,
+                max_trees: int = MAX_TREES, default: str = DEFAULT_MODEL_PATH, export: bool = True) -> dict:
+    """
+    Continue the pair's current LightGBM model on its newest closed candles.
+
+    `candles` is a sorted candle frame (Time, ..., Close, Volume); a last
+    candle that is still open is ignored. Nothing happens until `min_new`
+    candles have closed since the model's `last_candle`. A pair without a
+    version of its own starts from `default`. The updated model is saved
+    as the pair's next version (pickle, then compiled export unless
+    `export` is off) and only then made current by one manifest replace,
+    so readers switch from one complete version to the next. Returns a
+    status dict.
+    """
+    symbol = symbol.upper()
+    step = INTERVAL_MS[interval]
+    now_ms = time.time() * 1000 if now_ms is None else now_ms
+    open_ms = candles["Time"].to_numpy("datetime64[ms]").astype("int64")
+    closed = candles[open_ms + step <= now_ms]
+    if closed.empty:
+        return {"status": "no data"}
+    open_ms = open_ms[:len(closed)]
+
+    entry = manifest_entry(symbol, interval, model_dir) or {}
+    seen = entry.get("last_candle")
+    new = len(closed) if seen is None else int((open_ms > seen).sum())
+    if new < min_new:
+        return {"status": "waiting", "new": new}
+    X, y = training_matrix(closed)
+    X, y = X[-window:], y[-window:]
+    if len(X) < min(MIN_ROWS, window):
+        return {"status": "skipped", "rows": int(len(X))}
+
+    t = time.perf_counter()
+    base = load_model(model_path_for(symbol, interval, model_dir, default))
+    model = continue_model(base, X, y, rounds, max_trees)
+    # numbered from the folder under the manifest lock: a train_all run may be publishing too
+    version = allocate_version(symbol, interval, model_dir)
+    path = os.path.join(pair_folder(symbol, interval, model_dir), f"v{version}.pkl")
+    try:
+        atomic_dump(model, path)
+        if export:
+            export_model(model, path, X, threads=1)
+    except BaseException:
+        release_version(symbol, interval, version, model_dir)
+        raise
+    seconds = round(time.perf_counter() - t, 3)
+    record_version(symbol, interval, {
+        **entry,
+        "symbol": symbol, "interval": interval, "version": version, "path": path,
+        "rows": int(len(X)), "feature_spec": FEATURE_SPEC_VERSION, "mode": "online",
+        "last_candle": int(open_ms[-1]), "trees": model.booster_.num_trees(),
+        "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "seconds": seconds,
+    }, model_dir)
+    _prune(symbol, interval, model_dir)
+    return {"status": "updated", "version": version, "new": new,
+            "trees": model.booster_.num_trees(), "seconds": seconds}
+
+
+def update_rf(coin: str, days: int, chart, manager=None, params: dict = None) -> dict:
+    """
+    Bring the RandomForest that the AI Model page and the signal worker
+    read for `coin` over `days` up to date with `chart` (CoinGecko market
+    chart). A history the training manager has no artifact for yet is
+    queued there as a rolling update of the last forest for that name
+    (models.classifier.update_classifier, with a periodic full retrain),
+    so the pages find it trained. Returns a status dict.
+    """
+    from models.classifier import with_rf_features
+    from models.sweep import load_best_params
+    from services.training_jobs import get_training_manager
+
+    manager = manager or get_training_manager()
+    params = params or load_best_params("rf")
+    df = with_rf_features(chart)
+    if df.empty:
+        return {"status": "no data"}
+    _, job, _ = manager.request("rf", df, {"n_estimators": int(params["n_estimators"]), "random_state": 42},
+                                name=f"{coin}-{days}")
+    if job is None:
+        return {"status": "current"}
+    if job.status == "failed":
+        return {"status": "failed", "error": job.message}
+    return {"status": "updating", "job": job.key}
+
+
+# ------------------ Worker ------------------ #
+class OnlineUpdater:
+    """
+    Background thread that keeps the per-pair LightGBM models and the
+    per-coin RandomForests fresh.
+
+    Every `period` seconds it reads each pair's latest candles (live
+    stream, REST fallback) at background request priority and runs
+    update_lgbm on them, so a pair is updated once `min_new` candles have
+    closed since its last version. It then fetches each of `coins`
+    ((coin, days) CoinGecko histories) and runs update_rf, which queues a
+    rolling forest update on the training manager when the history has
+    moved on. Results per pair are kept in `status` ((coin, "<days>d")
+    for the forests); a failing pair does not stop the others. It runs
+    inside the app, so versions are published without the compiled export
+    (a treelite/gcc build takes seconds of CPU per version); pass
+    export=True to change that.
+    """
+
+    def __init__(self, pairs=None, period: float = UPDATE_PERIOD, model_dir: str = MODEL_DIR,
+                 bars=None, window: int = WINDOW, coins=None, charts=None, manager=None, **options):
+        self.pairs = pairs if pairs is not None else [(s, i) for s in DEFAULT_SYMBOLS for i in ONLINE_INTERVALS]
+        self.period = period
+        self.model_dir = model_dir
+        self.bars = bars
+        self.window = window
+        self.coins = list(ONLINE_COINS if coins is None else coins)
+        self.charts = charts
+        self.manager = manager
+        self.options = {"export": False, **options}     # min_new / rounds / max_trees / export for update_lgbm
+        self.status = {}            # (symbol, interval) -> last result
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- 🔹 Lifecycle ----
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="online-updates", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.period)
+
+    # ---- 🔹 Updates ----
+    def run_once(self) -> dict:
+        from services.rate_limit import BACKGROUND, request_priority
+
+        bars = self.bars
+        if bars is None:
+            from services.resample import get_bars as bars
+        with request_priority(BACKGROUND):
+            for symbol, interval in self.pairs:
+                if self._stop.is_set():
+                    break
+                try:
+                    candles = bars(symbol, interval, self.window + WARMUP + 1)
+                    result = update_lgbm(symbol, interval, candles, self.model_dir, window=self.window,
+                                         **self.options)
+                except Exception as e:
+                    result = {"status": "failed", "error": str(e)}
+                self.status[(symbol, interval)] = {**result, "at": time.time()}
+
+            charts = self.charts
+            if charts is None and self.coins:
+                from services.market_data import get_client
+                charts = get_client().get_market_chart
+            for coin, days in self.coins:
+                if self._stop.is_set():
+                    break
+                try:
+                    result = update_rf(coin, days, charts(coin, days), self.manager)
+                except Exception as e:
+                    result = {"status": "failed", "error": str(e)}
+                self.status[(coin, f"{days}d")] = {**result, "at": time.time()}
+        return dict(self.status)
+
+
+_updater = None
+_updater_lock = threading.Lock()
+
+
+def get_online_updater() -> OnlineUpdater:
+    """Process-wide updater, started on first use."""
+    global _updater
+    with _updater_lock:
+        if _updater is None:
+            _updater = OnlineUpdater().start()
+        return _updater
+
+
+if __name__ == "__main__":
+    # replay the bundled candles as a live feed: incremental updates vs window refits
+    # from the repo root: PYTHONPATH=app python -m models.online
+    import tempfile
+
+    import numpy as np
+    import pandas as pd
+
+    from models.classifier import train_classifier, update_classifier
+    from models.features import LGB_FEATURES, RF_FEATURES, lgb_features, rf_features
+    from models.online import update_lgbm
+    from models.pipeline import model_path_for
+    from models.price_predictor import fit_model
+    from utils.ingest import read_candles
+
+    candles = read_candles(os.path.join(os.path.dirname(__file__), "..", "data", "BTCUSDT_1m.csv"))
+    close = candles["Close"].to_numpy(float)
+    # row i of the features predicts close[i + 1]
+    features = pd.DataFrame(lgb_features(close, candles["Volume"].to_numpy(float)), columns=LGB_FEATURES)
+    model_dir = tempfile.mkdtemp()
+    base_path = os.path.join(model_dir, "base.pkl")
+    start, step = 500, 20
+    base = fit_model(*training_matrix(candles.iloc[:start]), base_path, {"verbose": -1, "n_jobs": 1})
+
+    errors = {"frozen": [], "online": [], "window refit": []}
+    seconds = {"online": [], "window refit": []}
+    for end in range(start, len(close) - step, step):
+        seen = candles.iloc[:end + 1]   # the last row is the candle still in progress
+        t = time.perf_counter()
+        result = update_lgbm("BTCUSDT", "1m", seen, model_dir, now_ms=seen["open_time"].iloc[-1] + 1,
+                             default=base_path, export=False)
+        if result["status"] != "updated":
+            continue
+        seconds["online"].append(time.perf_counter() - t)
+        t = time.perf_counter()
+        Xw, yw = training_matrix(seen.iloc[:-1])
+        refit = continue_model(base, Xw[-WINDOW:], yw[-WINDOW:], max_trees=0)
+        seconds["window refit"].append(time.perf_counter() - t)
+
+        online = load_model(model_path_for("BTCUSDT", "1m", model_dir, base_path))
+        rows, actual = features.iloc[end - 1:end + step - 1], close[end:end + step]
+        for label, model in (("frozen", base), ("online", online), ("window refit", refit)):
+            errors[label].append(np.abs(model.predict(rows) - actual))
+
+    print(f"LightGBM, {len(close) - start} replayed 1m candles, one update per {step}:")
+    print("   next-close MAE  " + "   ".join(f"{k} {np.mean(np.concatenate(v)):6.2f}" for k, v in errors.items()))
+    print("   per update      " + "   ".join(f"{k} {np.mean(v) * 1e3:6.0f} ms" for k, v in seconds.items()))
+    print(f"   trees after the replay: {online.booster_.num_trees()}")
+
+    prices = pd.DataFrame({"price": close})
+    prices[RF_FEATURES] = rf_features(close)
+    prices = prices.dropna()
+    model, acc = train_classifier(prices.iloc[:start])
+    t = time.perf_counter()
+    updated = update_classifier(model, prices)
+    t_update = time.perf_counter() - t
+    t = time.perf_counter()
+    _, acc_full = train_classifier(prices)
+    t_full = time.perf_counter() - t
+    print(f"RandomForest: full retrain {t_full * 1e3:.0f} ms (acc {acc_full:.2f}), "
+          f"rolling update {t_update * 1e3:.0f} ms (acc {updated[1]:.2f})")
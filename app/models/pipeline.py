@@ -0,0 +1,274 @@
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from models.features import FEATURE_SPEC_VERSION
+
+try:
+    import fcntl
+except ImportError:
+    # no flock (Windows): the manifest is then only serialised within the process
+    fcntl = None
+
+MODEL_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "models", "lgbm"))
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = "manifest.lock"
+# marks a version number handed out but not yet published
+RESERVED_SUFFIX = ".reserved"
+DEFAULT_MODEL_PATH = "models/crypto_lgb.pkl"
+
+DEFAULT_SYMBOLS = ["BTCUSDT", "ETHUSDT", "BNBUSDT"]
+DEFAULT_INTERVALS = ["1m", "5m", "15m", "1h", "4h", "1d"]
+# fewer training rows than this and the pair keeps the fallback model
+MIN_ROWS = 200
+
+
+# ------------------ Manifest ------------------ #
+def _key(symbol, interval):
+    return f"{symbol.upper()}/{interval}"
+
+
+def read_manifest(model_dir: str = MODEL_DIR) -> dict:
+    path = os.path.join(model_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _write_manifest(manifest: dict, model_dir: str):
+    path = os.path.join(model_dir, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+_manifest_cache = {}
+_manifest_lock = threading.Lock()
+# serialises read-modify-write of the manifest within the process
+_manifest_write_lock = threading.Lock()
+
+
+@contextmanager
+def manifest_lock(model_dir: str = MODEL_DIR):
+    """
+    Exclusive access to the manifest and the version folders, across
+    threads and processes (flock on manifest.lock), e.g. a CLI train_all
+    run next to the app's online updater.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    with _manifest_write_lock:
+        with open(os.path.join(model_dir, LOCK_NAME), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def manifest_entry(symbol: str, interval: str, model_dir: str = MODEL_DIR) -> dict:
+    return read_manifest(model_dir).get(_key(symbol, interval))
+
+
+def pair_folder(symbol: str, interval: str, model_dir: str = MODEL_DIR) -> str:
+    return os.path.join(model_dir, symbol.upper(), interval)
+
+
+def versions_on_disk(folder: str) -> dict:
+    """{version: [file names]} for the v<n>.* files (pickles, exports, reservations) in `folder`."""
+    versions = {}
+    for name in os.listdir(folder) if os.path.isdir(folder) else []:
+        match = re.match(r"v(\d+)\.", name)
+        if match:
+            versions.setdefault(int(match.group(1)), []).append(name)
+    return versions
+
+
+def allocate_version(symbol: str, interval: str, model_dir: str = MODEL_DIR) -> int:
+    """
+    Next free version number of the pair, reserved by a v<n>.reserved file
+    until record_version publishes it (or release_version gives it back).
+    Numbers come from the folder contents and the manifest under the
+    manifest lock, so concurrent trainers never share one.
+    """
+    folder = pair_folder(symbol, interval, model_dir)
+    with manifest_lock(model_dir):
+        os.makedirs(folder, exist_ok=True)
+        entry = read_manifest(model_dir).get(_key(symbol, interval)) or {}
+        version = max([*versions_on_disk(folder), entry.get("version", 0)]) + 1
+        open(os.path.join(folder, f"v{version}{RESERVED_SUFFIX}"), "w").close()
+    return version
+
+
+def release_version(symbol: str, interval: str, version: int, model_dir: str = MODEL_DIR):
+    try:
+        os.remove(os.path.join(pair_folder(symbol, interval, model_dir), f"v{version}{RESERVED_SUFFIX}"))
+    except OSError:
+        pass
+
+
+def record_version(symbol: str, interval: str, entry: dict, model_dir: str = MODEL_DIR):
+    """
+    Point (symbol, interval) at a newly saved model: the manifest is
+    re-read and replaced in one step under the manifest lock, so other
+    pairs' entries written meanwhile are kept.
+    """
+    with manifest_lock(model_dir):
+        manifest = read_manifest(model_dir)
+        manifest[_key(symbol, interval)] = entry
+        _write_manifest(manifest, model_dir)
+    release_version(symbol, interval, entry["version"], model_dir)
+
+
+def model_path_for(symbol: str, interval: str, model_dir: str = MODEL_DIR,
+                   default: str = DEFAULT_MODEL_PATH) -> str:
+    """
+    Current model for (symbol, interval) from the manifest, or `default`
+    when the pair has not been trained. The manifest is re-read only when
+    its mtime changes.
+    """
+    path = os.path.join(model_dir, MANIFEST_NAME)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return default
+    with _manifest_lock:
+        cached = _manifest_cache.get(model_dir)
+        if cached is None or cached[0] != mtime:
+            cached = _manifest_cache[model_dir] = (mtime, read_manifest(model_dir))
+    entry = cached[1].get(_key(symbol, interval))
+    if entry and os.path.exists(entry["path"]):
+        return entry["path"]
+    return default
+
+
+# ------------------ Worker ------------------ #
+def _train_one(symbol, interval, store_root, params, num_threads, model_dir, version, source_key):
+    """
+    Runs in a fresh worker process: load one pair's candles, build (or load
+    cached) features, fit with `num_threads` LightGBM threads, save.
+    """
+    from models.price_predictor import fit_model, training_matrix
+    from services.candle_store import CandleStore
+    from utils.dataset_cache import DatasetCache
+
+    t = time.perf_counter()
+    store = CandleStore(store_root)
+    cache = DatasetCache()
+    X, y = cache.arrays(source_key, ("lgb_X", "lgb_y"),
+                        lambda: training_matrix(cache.candles(source_key, lambda: store.load(symbol, interval))))
+    if len(X) < MIN_ROWS:
+        return {"status": "skipped", "rows": int(len(X))}
+
+    path = os.path.join(model_dir, symbol, interval, f"v{version}.pkl")
+    fit_model(X, y, save_path=path, params={**params, "n_jobs": num_threads, "verbose": -1})
+    return {"status": "trained", "path": path, "rows": int(len(X)),
+            "seconds": round(time.perf_counter() - t, 2)}
+
+
+# ------------------ Pipeline ------------------ #
+def train_all(symbols=None, intervals=None, max_workers: int = None, threads_per_worker: int = None,
+              params: dict = None, store=None, model_dir: str = MODEL_DIR, force: bool = False) -> dict:
+    """
+    Train one LightGBM model per (symbol, interval) held in the candle store.
+
+    Fits run in a process pool; every worker handles a single pair and then
+    exits (max_tasks_per_child=1), so only `max_workers` pairs are in memory
+    at once and each one's memory goes back to the OS. LightGBM threads are
+    capped so workers x threads does not exceed the CPU count. Pairs whose
+    store files, params and feature spec are unchanged since the last run are
+    skipped unless `force`. Each fit is saved as a new version
+    (`<model_dir>/<SYMBOL>/<interval>/v<n>.pkl`, numbers from
+    allocate_version) and recorded in manifest.json with record_version,
+    so it is safe next to the online updater. Returns {pair: result}.
+    """
+    from models.sweep import load_best_params
+    from services.candle_store import CandleStore
+    from utils.dataset_cache import DatasetCache
+
+    symbols = [s.upper() for s in (symbols or DEFAULT_SYMBOLS)]
+    intervals = list(intervals or DEFAULT_INTERVALS)
+    store = store or CandleStore()
+    if params is None:
+        params = load_best_params("lgbm")
+        params.pop("threshold", None)
+    cpus = os.cpu_count() or 1
+    max_workers = max_workers or min(len(symbols) * len(intervals), max(cpus // 2, 1))
+    threads = threads_per_worker or max(cpus // max_workers, 1)
+
+    os.makedirs(model_dir, exist_ok=True)
+    manifest = read_manifest(model_dir)
+    cache = DatasetCache()
+    results, jobs = {}, []
+    for symbol in symbols:
+        for interval in intervals:
+            key = _key(symbol, interval)
+            files = store.files(symbol, interval)
+            if not files:
+                results[key] = {"status": "no data"}
+                continue
+            source_key = cache.source_key(files)
+            entry = manifest.get(key)
+            fresh = (entry and entry.get("source_key") == source_key and entry.get("params") == params
+                     and entry.get("feature_spec") == FEATURE_SPEC_VERSION and os.path.exists(entry["path"]))
+            if fresh and not force:
+                results[key] = {"status": "up to date", "path": entry["path"]}
+                continue
+            jobs.append((symbol, interval, allocate_version(symbol, interval, model_dir), source_key))
+
+    if jobs:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx, max_tasks_per_child=1) as pool:
+            futures = {
+                pool.submit(_train_one, symbol, interval, store.root, params, threads,
+                            model_dir, version, source_key): (symbol, interval, version, source_key)
+                for symbol, interval, version, source_key in jobs
+            }
+            for future in as_completed(futures):
+                symbol, interval, version, source_key = futures[future]
+                key = _key(symbol, interval)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"status": "failed", "error": str(e)}
+                results[key] = result
+                if result["status"] == "trained":
+                    record_version(symbol, interval, {
+                        "symbol": symbol, "interval": interval, "version": version,
+                        "path": result["path"], "rows": result["rows"],
+                        "source_key": source_key, "params": params,
+                        "feature_spec": FEATURE_SPEC_VERSION,
+                        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                        "seconds": result["seconds"],
+                    }, model_dir)
+                else:
+                    release_version(symbol, interval, version, model_dir)
+    return results
+
+
+if __name__ == "__main__":
+    # from the repo root: PYTHONPATH=app python -m models.pipeline [days]
+    import sys
+
+    from services.candle_store import CandleStore
+
+    store = CandleStore()
+    if len(sys.argv) > 1:
+        for s in DEFAULT_SYMBOLS:
+            for i in DEFAULT_INTERVALS:
+                store.sync(s, i, days=float(sys.argv[1]))
+    t = time.perf_counter()
+    for pair, result in sorted(train_all(store=store).items()):
+        print(f"{pair:14s} {result}")
+    print(f"done in {time.perf_counter() - t:.1f}s")
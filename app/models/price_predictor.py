@@ -1,47 +1,152 @@
-import lightgbm as lgb
-import joblib
+import numpy as np
 import pandas as pd
-from ta.momentum import RSIIndicator
-import os
+
+from models.export import export_model, load_predictor
+from models.features import LGB_FEATURES, lgb_features, stream_lgb_features
+from models.registry import atomic_dump
+from utils.metrics import timer
 
 def add_features(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Add technical indicators & target column to the dataframe.
+    Build the feature columns & target column from a candle dataframe.
     """
-    df = df.copy()
-    df["returns"] = df["Close"].pct_change()
-    df["sma20"] = df["Close"].rolling(20).mean()
-    df["rsi14"] = RSIIndicator(df["Close"], 14).rsi()
-    df["target"] = df["Close"].shift(-1)
-    return df.dropna()
+    X = lgb_features(df["Close"].to_numpy(float), df["Volume"].to_numpy(float))
+    out = pd.DataFrame(X, columns=LGB_FEATURES, index=df.index)
+    out["target"] = out["Close"].shift(-1)
+    return out.dropna()
+
+def training_matrix(df: pd.DataFrame):
+    """(X, y) arrays for train_model: LGB_FEATURES rows and the next close."""
+    X = lgb_features(df["Close"].to_numpy(float), df["Volume"].to_numpy(float))
+    y = np.roll(X[:, 0], -1)
+    keep = ~np.isnan(X).any(axis=1)
+    keep[-1:] = False
+    return X[keep], y[keep]
 
-def train_model(df: pd.DataFrame, save_path: str = "models/crypto_lgb.pkl"):
+def fit_model(X: np.ndarray, y: np.ndarray, save_path: str = "models/crypto_lgb.pkl", params: dict = None):
     """
-    Train LightGBM model and save to file.
+    Fit LightGBM on a prepared matrix and save to file. `params` go to
+    LGBMRegressor (e.g. tuned values from models.sweep.load_best_params("lgbm")).
+    A compiled copy is exported next to it when treelite is installed,
+    built with as many compiler jobs as `params["n_jobs"]` allows.
     """
-    df = add_features(df)
-    features = ["Close", "Volume", "returns", "sma20", "rsi14"]
-    X, y = df[features], df["target"]
-    model = lgb.LGBMRegressor()
-    model.fit(X, y)
-    # ensure directory exists
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
-    joblib.dump(model, save_path)
+    # imported on first fit, not when a page imports this module to predict
+    import lightgbm as lgb
+
+    model = lgb.LGBMRegressor(**(params or {}))
+    model.fit(pd.DataFrame(X, columns=LGB_FEATURES), y)
+    # temp file + rename, so a running app never loads a half-written pickle
+    atomic_dump(model, save_path)
+    # compiled inference copy, checked against the booster on the last rows
+    n_jobs = (params or {}).get("n_jobs")
+    export_model(model, save_path, X[-512:], threads=n_jobs if n_jobs and n_jobs > 0 else None)
     return model
 
-def predict_next_price(df: pd.DataFrame, model_path: str = "models/crypto_lgb.pkl") -> float:
+def continue_model(model, X: np.ndarray, y: np.ndarray, rounds: int = 10, max_trees: int = 300,
+                   n_jobs: int = 1):
     """
-    Load trained model and predict the next closing price.
+    New LGBMRegressor that adds `rounds` boosting rounds to `model`, fitted
+    on recent rows only (init_model: the existing trees are kept and the
+    new ones fit their residuals). Once the booster would exceed
+    `max_trees`, it is refitted from scratch on the same rows instead, so
+    old market regimes drop out and predict cost stays bounded. Not saved.
     """
-    # prepare features for the latest row
-    df = add_features(df)
-    latest = df.iloc[-1:]
-    features = ["Close", "Volume", "returns", "sma20", "rsi14"]
+    import lightgbm as lgb
+
+    params = {**model.get_params(), "n_jobs": n_jobs, "verbose": -1}
+    frame = pd.DataFrame(X, columns=LGB_FEATURES)
+    if model.booster_.num_trees() + rounds > max_trees:
+        return lgb.LGBMRegressor(**params).fit(frame, y)
+    updated = lgb.LGBMRegressor(**{**params, "n_estimators": rounds})
+    updated.fit(frame, y, init_model=model.booster_)
+    # a later refit grows the model's full size again, not one update's worth
+    return updated.set_params(n_estimators=params["n_estimators"])
 
-    if not os.path.exists(model_path):
-        raise FileNotFoundError(f"Model not found at {model_path}. "
-                                "Train model first using train_model().")
+def train_model(df: pd.DataFrame, save_path: str = "models/crypto_lgb.pkl", params: dict = None):
+    """Train LightGBM model on a candle dataframe and save to file."""
+    X, y = training_matrix(df)
+    return fit_model(X, y, save_path, params)
 
-    model = joblib.load(model_path)
-    next_price = model.predict(latest[features])[0]
+def predict_next_price(df: pd.DataFrame, model_path: str = "models/crypto_lgb.pkl") -> float:
+    """
+    Predict the next closing price with the trained model (cached in the
+    model registry, reloaded only when the file changes). The compiled
+    export is used when there is one.
+    """
+    # prepare features for the latest candle only
+    with timer("features", "lgb_features"):
+        X = lgb_features(df["Close"].to_numpy(float), df["Volume"].to_numpy(float))
+        latest = pd.DataFrame(X[-1:], columns=LGB_FEATURES)
+
+    model = load_predictor(model_path)
+    with timer("predict", "lgbm"):
+        next_price = model.predict(latest)[0]
     return float(next_price)
+
+def signal_from_prediction(last_close: float, next_price: float):
+    """
+    (signal, confidence %) from a predicted close: BUY above the last
+    close, SELL below, HOLD when equal.
+    """
+    diff = next_price - last_close
+    if diff > 0:
+        signal = "BUY"
+    elif diff < 0:
+        signal = "SELL"
+    else:
+        signal = "HOLD"
+    return signal, abs(diff / last_close) * 100
+
+def predict_batch(windows: dict, model_path: str = "models/crypto_lgb.pkl",
+                  horizons=(1,), num_threads: int = None) -> pd.DataFrame:
+    """
+    Score many symbols at once.
+
+    `windows` maps symbol -> candle DataFrame (Close, Volume). The latest
+    feature row of every symbol goes into one matrix and the model runs one
+    vectorized predict per step. Horizons above 1 are predicted
+    recursively: each predicted close is fed back through the streaming
+    feature engine. `model_path` may also map symbol -> path (e.g. from
+    models.pipeline.model_path_for). Returns one row per symbol with
+    last_close, pred_<h> for every horizon, and signal/confidence for the
+    shortest horizon.
+    """
+    symbols = list(windows)
+    if not symbols:
+        return pd.DataFrame()
+    if isinstance(model_path, dict):
+        # {symbol: path}: one batch per distinct model
+        groups = {}
+        for s in symbols:
+            groups.setdefault(model_path[s], []).append(s)
+        parts = [predict_batch({s: windows[s] for s in group}, path, horizons, num_threads)
+                 for path, group in groups.items()]
+        return pd.concat(parts).loc[symbols]
+    horizons = sorted(set(horizons))
+    model = load_predictor(model_path)
+    kwargs = {"num_threads": num_threads} if num_threads else {}
+
+    closes = [windows[s]["Close"].to_numpy(float) for s in symbols]
+    volumes = [windows[s]["Volume"].to_numpy(float) for s in symbols]
+    with timer("features", "lgb_features batch"):
+        X = np.vstack([lgb_features(c, v)[-1] for c, v in zip(closes, volumes)])
+    with timer("predict", "lgbm batch"):
+        preds = {1: model.predict(pd.DataFrame(X, columns=LGB_FEATURES), **kwargs)}
+
+    if horizons[-1] > 1:
+        # carry each symbol's rolling/EWM state forward on predicted closes
+        states = [stream_lgb_features(c, v)[1] for c, v in zip(closes, volumes)]
+        last_volume = [v[-1] for v in volumes]
+        for step in range(2, horizons[-1] + 1):
+            X = np.vstack([
+                state.update(p, vol) for state, p, vol in zip(states, preds[step - 1], last_volume)
+            ])
+            preds[step] = model.predict(pd.DataFrame(X, columns=LGB_FEATURES), **kwargs)
+
+    out = pd.DataFrame({"last_close": [c[-1] for c in closes]}, index=pd.Index(symbols, name="symbol"))
+    for h in horizons:
+        out[f"pred_{h}"] = preds[h]
+    signals = [signal_from_prediction(lc, p) for lc, p in zip(out["last_close"], out[f"pred_{horizons[0]}"])]
+    out["signal"] = [s for s, _ in signals]
+    out["confidence"] = [c for _, c in signals]
+    return out
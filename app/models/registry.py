@@ -0,0 +1,185 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import joblib
+
+from utils.metrics import cache_event, timer
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def atomic_dump(obj, path: str):
+    """
+    joblib.dump to a temp file in the same directory, then rename over
+    `path`, so readers never see a half-written pickle.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tmp-", suffix=os.path.basename(path))
+    os.close(fd)
+    try:
+        joblib.dump(obj, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _rss_bytes():
+    """Resident set size of this process (Linux), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _measured_load(path, loader=joblib.load):
+    """loader(path) (joblib.load by default) plus (seconds, approximate bytes) it took."""
+    rss_before = _rss_bytes()
+    tracing = tracemalloc.is_tracing()
+    if rss_before is None and not tracing:
+        tracemalloc.start()
+    traced_before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+    start = time.perf_counter()
+    with timer("load", os.path.basename(path)):
+        model = loader(path)
+    seconds = time.perf_counter() - start
+    if rss_before is not None:
+        memory = max(_rss_bytes() - rss_before, 0)
+    else:
+        memory = max(tracemalloc.get_traced_memory()[0] - traced_before, 0)
+        if not tracing:
+            tracemalloc.stop()
+    return model, seconds, memory
+
+
+class ModelEntry:
+    def __init__(self, name, path, mtime, size, sha256, model, load_seconds, memory_bytes):
+        self.name = name
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.sha256 = sha256
+        self.model = model
+        self.load_seconds = load_seconds
+        self.memory_bytes = memory_bytes
+        self.loaded_at = time.time()
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "path": self.path,
+            "sha256": self.sha256[:12],
+            "file_bytes": self.size,
+            "memory_bytes": self.memory_bytes,
+            "load_seconds": round(self.load_seconds, 4),
+            "loaded_at": self.loaded_at,
+        }
+
+
+class ModelRegistry:
+    """
+    Loads each model file once per process and hands out the same object.
+
+    Entries are keyed by name (default: the absolute path). A cheap
+    mtime/size check runs on every `get()`; only when that changes is the
+    file hashed, and only a new hash triggers a reload, which replaces the
+    entry in one step so callers see either the old or the new model.
+    At most `max_entries` models are kept, least recently used go first.
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def _load_lock(self, key):
+        with self._lock:
+            return self._load_locks.setdefault(key, threading.Lock())
+
+    def get(self, path: str, name: str = None, loader=None):
+        path = os.path.abspath(path)
+        key = name or path
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Model not found at {path}. "
+                                    "Train model first using train_model().") from None
+
+        entry = self._fresh(key, path, st)
+        cache_event("models", entry is not None)
+        if entry is not None:
+            return entry.model
+
+        with self._load_lock(key):
+            entry = self._fresh(key, path, st)
+            if entry is not None:
+                return entry.model
+            old = self._entries.get(key)
+            digest = file_sha256(path)
+            if old is not None and old.path == path and old.sha256 == digest:
+                # touched but unchanged: keep the loaded model
+                old.mtime, old.size = st.st_mtime_ns, st.st_size
+                return old.model
+            model, seconds, memory = _measured_load(path, loader or joblib.load)
+            entry = ModelEntry(key, path, st.st_mtime_ns, st.st_size, digest, model, seconds, memory)
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return model
+
+    def _fresh(self, key, path, st):
+        with self._lock:
+            entry = self._entries.get(key)
+            if (entry is not None and entry.path == path
+                    and entry.mtime == st.st_mtime_ns and entry.size == st.st_size):
+                self._entries.move_to_end(key)
+                return entry
+        return None
+
+    def evict(self, name: str = None):
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+    def stats(self) -> list:
+        with self._lock:
+            return [e.info() for e in self._entries.values()]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
+
+
+def load_model(path: str, name: str = None, loader=None):
+    """
+    Model at `path` from the shared registry (loaded once, reloaded on
+    change). `loader(path)` replaces joblib.load for other formats.
+    """
+    return get_registry().get(path, name, loader)
@@ -0,0 +1,281 @@
+import hashlib
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from models.backtest import LGBMStrategy, LSTMStrategy, RFStrategy, run_backtest, threshold_signals, walk_forward, \
+    walk_forward_outputs
+from models.lstm_infer import SIGNAL_THRESHOLD
+
+DEFAULT_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "models", "sweeps"))
+BEST_PARAMS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "models", "best_params.json"))
+
+SWEEP_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+STAT_COLUMNS = {"final_equity", "total_return", "sharpe", "max_drawdown", "trades", "exposure", "folds"}
+
+# Parameters the pages and train_model() use today
+DEFAULT_PARAMS = {
+    "lgbm": {"threshold": 0.0, "n_estimators": 100, "learning_rate": 0.1, "num_leaves": 31},
+    "rf": {"n_estimators": 100, "confidence": 0.55},
+    # the Strategy page's window and ±threshold on the model output
+    "lstm": {"window_size": 30, "threshold": SIGNAL_THRESHOLD},
+}
+
+
+# ------------------ Search spaces ------------------ #
+def grid(space: dict) -> list:
+    """Every combination of the listed values: {"a": [1, 2], "b": [3]} -> 2 trials."""
+    keys = sorted(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def random_search(space: dict, n: int, seed: int = 0) -> list:
+    """
+    `n` random trials. Lists are sampled from, (low, high) tuples are
+    drawn uniformly (ints stay ints).
+    """
+    rng = random.Random(seed)
+    trials = []
+    for _ in range(n):
+        trial = {}
+        for key in sorted(space):
+            values = space[key]
+            if isinstance(values, tuple):
+                low, high = values
+                trial[key] = rng.randint(low, high) if isinstance(low, int) else rng.uniform(low, high)
+            else:
+                trial[key] = rng.choice(values)
+        trials.append(trial)
+    return trials
+
+
+def make_strategy(kind: str, params: dict):
+    """Strategy for one trial; every worker fits single-threaded."""
+    params = {**DEFAULT_PARAMS[kind], **params}
+    if kind == "lgbm":
+        threshold = params.pop("threshold")
+        return LGBMStrategy(threshold=threshold, retrain=True, params={**params, "n_jobs": 1})
+    if kind == "rf":
+        return RFStrategy(n_estimators=int(params["n_estimators"]),
+                          confidence=params["confidence"], n_jobs=1)
+    raise ValueError(f"Unknown strategy kind: {kind}")
+
+
+# ------------------ Shared candles ------------------ #
+def _fingerprint(arr: np.ndarray) -> str:
+    return hashlib.sha1(arr.tobytes()).hexdigest()[:16]
+
+
+class SharedCandles:
+    """
+    Candle columns copied once into a shared-memory block, so worker
+    processes map the same pages instead of unpickling a DataFrame per task.
+    """
+
+    def __init__(self, candles: pd.DataFrame):
+        arr = np.ascontiguousarray(candles[SWEEP_COLUMNS].to_numpy(float))
+        self.shape = arr.shape
+        self.shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(self.shape, dtype=np.float64, buffer=self.shm.buf)[:] = arr
+        self.fingerprint = _fingerprint(arr)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+_worker_shm = None
+_worker_candles = None
+
+
+def _attach(name, shape):
+    global _worker_shm, _worker_candles
+    _worker_shm = shared_memory.SharedMemory(name=name)
+    arr = np.ndarray(shape, dtype=np.float64, buffer=_worker_shm.buf)
+    arr.flags.writeable = False
+    _worker_candles = pd.DataFrame(arr, columns=SWEEP_COLUMNS, copy=False)
+
+
+def _run_trial(kind, params, train_size, test_size, backtest_kwargs):
+    strategy = make_strategy(kind, params)
+    _, stats, folds = walk_forward(_worker_candles, strategy, train_size, test_size, **backtest_kwargs)
+    return {**stats, "folds": len(folds)}
+
+
+# ------------------ Runner ------------------ #
+def _trial_key(kind, params, train_size, test_size, backtest_kwargs):
+    blob = json.dumps([kind, params, train_size, test_size, backtest_kwargs], sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+def _read_cache(cache_path: str) -> dict:
+    done = {}
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # partial line from an interrupted run
+                done[row["key"]] = row
+    return done
+
+
+def _results(done: dict, wanted: set) -> pd.DataFrame:
+    rows = [{**r["params"], **{k: v for k, v in r.items() if k not in ("key", "params")}}
+            for k, r in done.items() if k in wanted]
+    return pd.DataFrame(rows).sort_values("sharpe", ascending=False).reset_index(drop=True)
+
+
+def run_sweep(candles: pd.DataFrame, kind: str, trials: list, train_size: int, test_size: int,
+              max_workers: int = None, cache_dir: str = DEFAULT_CACHE_DIR, **backtest_kwargs) -> pd.DataFrame:
+    """
+    Walk-forward backtest of every trial in a process pool.
+
+    Results are appended to `<cache_dir>/<kind>-<data fingerprint>.jsonl`
+    as each trial finishes; re-running the same sweep skips trials already
+    in that file, so an interrupted sweep resumes where it stopped.
+    Returns all results sorted by Sharpe ratio.
+    """
+    shared = SharedCandles(candles)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_path = os.path.join(cache_dir, f"{kind}-{shared.fingerprint}.jsonl")
+        done = _read_cache(cache_path)
+
+        pending = {}
+        for params in trials:
+            key = _trial_key(kind, params, train_size, test_size, backtest_kwargs)
+            if key not in done:
+                pending[key] = params
+
+        if pending:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach,
+                                     initargs=(shared.name, shared.shape)) as pool, \
+                    open(cache_path, "a") as out:
+                futures = {
+                    pool.submit(_run_trial, kind, params, train_size, test_size, backtest_kwargs): key
+                    for key, params in pending.items()
+                }
+                for future in as_completed(futures):
+                    key = futures[future]
+                    row = {"key": key, "params": pending[key], **future.result()}
+                    out.write(json.dumps(row) + "\n")
+                    out.flush()
+                    done[key] = row
+    finally:
+        shared.close()
+
+    wanted = {_trial_key(kind, p, train_size, test_size, backtest_kwargs) for p in trials}
+    return _results(done, wanted)
+
+
+def run_lstm_sweep(candles: pd.DataFrame, window_sizes: list, thresholds: list, train_size: int,
+                   test_size: int, epochs: int = 5, cache_dir: str = DEFAULT_CACHE_DIR,
+                   **backtest_kwargs) -> pd.DataFrame:
+    """
+    Walk-forward sweep of the LSTM's window size and ±threshold.
+
+    The threshold only reads the model output, so each window size is fit
+    once per fold (walk_forward_outputs) and every threshold is scored on
+    those outputs. The fits run in this process: TensorFlow uses the cores
+    itself. Cached and resumed per trial like run_sweep().
+    """
+    fingerprint = _fingerprint(np.ascontiguousarray(candles[SWEEP_COLUMNS].to_numpy(float)))
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, f"lstm-{fingerprint}.jsonl")
+    done = _read_cache(cache_path)
+    candles = candles.reset_index(drop=True)
+    kwargs = {**backtest_kwargs, "epochs": epochs}
+    wanted = set()
+    with open(cache_path, "a") as out:
+        for window_size in window_sizes:
+            trials = {}
+            for threshold in thresholds:
+                params = {"window_size": int(window_size), "threshold": float(threshold)}
+                key = _trial_key("lstm", params, train_size, test_size, kwargs)
+                wanted.add(key)
+                if key not in done:
+                    trials[key] = params
+            if not trials:
+                continue
+            outputs, folds = walk_forward_outputs(candles, LSTMStrategy(window_size, epochs=epochs),
+                                                  train_size, test_size)
+            for key, params in trials.items():
+                signals = threshold_signals(outputs, params["threshold"])
+                _, stats = run_backtest(candles.iloc[train_size:], signals[train_size:], **backtest_kwargs)
+                row = {"key": key, "params": params, **stats, "folds": len(folds)}
+                out.write(json.dumps(row) + "\n")
+                out.flush()
+                done[key] = row
+    return _results(done, wanted)
+
+
+# ------------------ Best parameters ------------------ #
+def save_best_params(kind: str, results: pd.DataFrame, path: str = BEST_PARAMS_PATH):
+    """Store the top trial's parameters for `kind` (read back by load_best_params)."""
+    params = {}
+    for k in results.columns:
+        if k not in STAT_COLUMNS:
+            value = results[k].iloc[0]
+            params[k] = value.item() if hasattr(value, "item") else value
+    data = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+    data[kind] = params
+    tmp = path + ".tmp"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+    return params
+
+
+def load_best_params(kind: str, path: str = BEST_PARAMS_PATH) -> dict:
+    """Tuned parameters for `kind` if a sweep saved any, else the defaults."""
+    params = dict(DEFAULT_PARAMS[kind])
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                params.update(json.load(f).get(kind, {}))
+        except (OSError, json.JSONDecodeError):
+            pass
+    return params
+
+
+if __name__ == "__main__":
+    # from the repo root: PYTHONPATH=app python -m models.sweep
+    from services.candle_store import CandleStore
+    from utils.ingest import read_candles
+
+    candles = CandleStore().load("BTCUSDT", "1m")
+    if candles.empty:
+        candles = read_candles(os.path.join(os.path.dirname(__file__), "..", "data", "BTCUSDT_1m.csv"))
+    train = max(len(candles) // 4, 200)
+
+    results = run_sweep(candles, "rf", grid({"n_estimators": [50, 100, 200],
+                                             "confidence": [0.5, 0.55, 0.6]}), train, train // 2)
+    print(results.head())
+    print("best rf:", save_best_params("rf", results))
+
+    results = run_sweep(candles, "lgbm", random_search({"threshold": (0.0, 0.001),
+                                                        "num_leaves": (8, 64),
+                                                        "learning_rate": [0.03, 0.1]}, 8), train, train // 2)
+    print(results.head())
+    print("best lgbm:", save_best_params("lgbm", results))
+
+    results = run_lstm_sweep(candles, [20, 30, 60], [0.0, 0.05, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5],
+                             train, train // 2, epochs=3)
+    print(results.head())
+    print("best lstm:", save_best_params("lstm", results))
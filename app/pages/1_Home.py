@@ -1,13 +1,21 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-import requests
 from datetime import datetime
 
+from services.market_data import MarketDataError
+from services.resample import get_bars
+from utils.chart_data import DEFAULT_POINT_BUDGET, chart_feed, load_range
+from utils.metrics import timer
+
+DAY_MS = 86_400_000
+# visible history; longer ranges switch to a coarser stored timeframe
+RANGES = {"Latest": None, "1 Day": DAY_MS, "1 Week": 7 * DAY_MS, "1 Month": 30 * DAY_MS,
+          "3 Months": 90 * DAY_MS, "1 Year": 365 * DAY_MS}
+
 st.title("💹 Live Crypto Chart")
 
 # ---- 🔹 User Inputs ----
-col1, col2, col3 = st.columns(3)
+col1, col2, col3, col4 = st.columns(4)
 
 with col1:
     symbol = st.selectbox(
@@ -30,46 +38,44 @@ with col3:
         index=3
     )
 
+with col4:
+    history = st.selectbox("Range", list(RANGES), index=0)
+
 # ---- 🔹 Fetch Data ----
+# 5m..1d bars are aggregated locally from stored + live 1m candles, so
+# switching timeframe needs no download; 1m (and thin history) comes from
+# the live WebSocket ring buffers, REST otherwise
 def get_klines(symbol, interval="1h", limit=100):
-    url = f"https://api.binance.com/api/v3/klines?symbol={symbol}&interval={interval}&limit={limit}"
-    r = requests.get(url).json()
-    df = pd.DataFrame(r, columns=[
-        "Open time","Open","High","Low","Close","Volume",
-        "Close time","q","n","tbbav","tbqav","Ignore"
-    ])
-    df["Open"] = df["Open"].astype(float)
-    df["High"] = df["High"].astype(float)
-    df["Low"]  = df["Low"].astype(float)
-    df["Close"]= df["Close"].astype(float)
-    df["Time"] = pd.to_datetime(df["Open time"], unit='ms')
-    return df
+    return get_bars(symbol, interval, limit)
 
-data = get_klines(symbol, timeframe, 200)
+try:
+    if RANGES[history] is None:
+        data = get_klines(symbol, timeframe, 200)
+    else:
+        # long ranges: the finest timeframe that fits the point budget, from the local store
+        timeframe, data = load_range(symbol, timeframe, RANGES[history], DEFAULT_POINT_BUDGET)
+except MarketDataError as e:
+    # HTTP errors and rate limits (nothing cached to fall back on)
+    st.error(f"⚠️ Could not load candles: {e}")
+    st.stop()
 
-# ---- 🔹 Plot ----
-fig = go.Figure()
+# served from cache because the exchange refused the refresh (e.g. rate limited)
+freshness = data.attrs.get("freshness")
+if freshness is not None and freshness.stale:
+    st.warning(f"⚠️ Exchange unavailable ({freshness.error}); showing candles from {freshness.age:.0f}s ago.")
 
-if chart_type == "Candlestick":
-    fig.add_trace(go.Candlestick(
-        x=data["Time"],
-        open=data["Open"],
-        high=data["High"],
-        low=data["Low"],
-        close=data["Close"],
-        name=symbol
-    ))
-else:
-    fig.add_trace(go.Scatter(
-        x=data["Time"],
-        y=data["Close"],
-        mode="lines",
-        name=symbol
-    ))
+# ---- 🔹 Plot ----
+# the figure is kept across reruns; a refresh only appends the new candles,
+# and line mode is LTTB-decimated to the point budget
+with timer("render", "home chart"):
+    feed = chart_feed("home", (symbol, timeframe, history), chart_type, name=symbol)
+    fig = feed.update(data)
 
-fig.update_layout(
-    xaxis_rangeslider_visible=False,
-    height=600,
-    title=f"{symbol} - {timeframe} Chart"
-)
-st.plotly_chart(fig, use_container_width=True)
+    fig.update_layout(
+        xaxis_rangeslider_visible=False,
+        height=600,
+        title=f"{symbol} - {timeframe} Chart",
+        # keep the user's zoom while candles are appended
+        uirevision=f"{symbol}-{timeframe}-{history}"
+    )
+    st.plotly_chart(fig, use_container_width=True)
@@ -1,72 +1,84 @@
 import streamlit as st
-import plotly.graph_objects as go
-import pandas as pd
 
-from services.binance_api import get_live_data
-from models.price_predictor import predict_next_price
+from services.batch_fetch import get_klines_many
+from services.stream import get_candles
+from utils.chart_data import build_figure
+from utils.ingest import conform
+from models.online import get_online_updater
+from models.pipeline import manifest_entry, model_path_for
+from models.price_predictor import predict_batch, predict_next_price, signal_from_prediction
+from services.signal_worker import ensure_signal_worker, get_signal_store, signal_max_age
+from utils.metrics import page_run, timer
+
+SYMBOLS = ["BTCUSDT", "ETHUSDT"]
+SIGNAL_LABELS = {"BUY": "🟢 BUY", "SELL": "🔴 SELL", "HOLD": "⚪ HOLD"}
 
 
 def ai_price_prediction():
     st.title("🤖 AI Price Prediction")
 
+    # keeps every pair's model (and the coins' forests) learning from new candles in the background
+    get_online_updater()
+    # and scores the watchlist on every candle close, so Predict is a store read
+    ensure_signal_worker()
+
     # Symbol & Interval selection
-    symbol = st.selectbox("Select Symbol", ["BTCUSDT", "ETHUSDT"])
+    symbol = st.selectbox("Select Symbol", SYMBOLS)
     interval = st.selectbox("Time Frame", ["1m", "5m", "15m", "1h"])
 
     if st.button("Predict"):
         try:
-            # ✅ Fetch latest data from Binance
-            df = get_live_data(symbol, interval, limit=100)
-
-            # ✅ Clean column names
-            df.columns = df.columns.str.strip()
-
-            # ✅ Make sure Volume is numeric
-            if "Volume" in df.columns:
-                df["Volume"] = (
-                    df["Volume"].astype(str)
-                    .str.replace(",", "", regex=False)
-                    .str.strip()
-                )
-                df["Volume"] = pd.to_numeric(df["Volume"], errors="coerce").fillna(0)
-
-            # ✅ Predict next price
-            next_price = predict_next_price(df)
+            # ✅ Latest candles from the live stream (REST fallback)
+            df = get_candles(symbol, interval, limit=100)
 
-            last_close = df["Close"].iloc[-1]
-            diff = next_price - last_close
+            # ✅ Canonical candle schema (typed OHLCV, sorted unique times)
+            df = conform(df)
 
-            if diff > 0:
-                signal = "🟢 BUY"
-            elif diff < 0:
-                signal = "🔴 SELL"
+            # ✅ Signal precomputed at the last candle close, or predicted now with
+            # this pair's model (BTC 1m model if not trained yet)
+            stored = get_signal_store().latest(symbol, interval, "lgbm", max_age=signal_max_age(interval))
+            if stored is not None:
+                next_price, signal, confidence = stored["value"], stored["signal"], stored["confidence"]
             else:
-                signal = "⚪ HOLD"
-
-            confidence = abs(diff / last_close) * 100
+                next_price = predict_next_price(df, model_path_for(symbol, interval))
+                last_close = df["Close"].iloc[-1]
+                signal, confidence = signal_from_prediction(last_close, next_price)
+            signal = SIGNAL_LABELS[signal]
 
             st.metric("Predicted Next Close", f"${next_price:.2f}")
             st.metric("AI Signal", f"{signal}")
             st.metric("Confidence", f"{confidence:.2f}%")
-
-            # ✅ Plot candlestick chart
-            fig = go.Figure(data=[go.Candlestick(
-                x=df["Time"],
-                open=df["Open"],
-                high=df["High"],
-                low=df["Low"],
-                close=df["Close"]
-            )])
-            fig.update_layout(
-                xaxis_rangeslider_visible=False,
-                template="plotly_dark",
-                margin=dict(l=0, r=0, t=30, b=0)
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            entry = manifest_entry(symbol, interval)
+            if entry:
+                st.caption(f"Model v{entry['version']} · last updated "
+                           f"{entry.get('updated_at') or entry.get('trained_at')} on {entry['rows']} candles")
+
+            # ✅ Plot candlestick chart (capped at the chart point budget)
+            with timer("render", "ai_assistant chart"):
+                fig = build_figure(df, "Candlestick")
+                fig.update_layout(
+                    xaxis_rangeslider_visible=False,
+                    template="plotly_dark",
+                    margin=dict(l=0, r=0, t=30, b=0)
+                )
+                st.plotly_chart(fig, use_container_width=True)
 
         except Exception as e:
             st.error(f"⚠️ Error fetching or predicting data: {e}")
 
+    # ✅ Whole watchlist in one batch: next 1 / 5 / 15 candles
+    if st.button("Scan All Symbols"):
+        try:
+            frames = get_klines_many([(s, interval, 100) for s in SYMBOLS])
+            windows = {s: df for (s, _, _), df in frames.items()}
+            scan = predict_batch(windows, {s: model_path_for(s, interval) for s in windows},
+                                 horizons=(1, 5, 15))
+            scan["signal"] = scan["signal"].map(SIGNAL_LABELS)
+            st.dataframe(scan, use_container_width=True)
+        except Exception as e:
+            st.error(f"⚠️ Error scanning symbols: {e}")
+
 
 if __name__ == "__main__":
-    ai_price_prediction()
+    with page_run("2_AI_Assistant"):
+        ai_price_prediction()
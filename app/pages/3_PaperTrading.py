@@ -1,17 +1,31 @@
 import streamlit as st
 import pandas as pd
-import datetime
-import requests
+
+from services.batch_fetch import get_prices
+from services.ledger import BUY, SELL, get_ledger
+from services.market_data import get_client
+from services.matching import get_engine
+from utils.metrics import page_run
+
+# most recent fills shown in the history table
+TRADE_HISTORY_ROWS = 200
+
+ORDER_TYPES = {"Market": None, "Limit": "limit", "Stop": "stop", "Take Profit": "take_profit"}
 
 # --- Helper: Fetch Live Crypto Price ---
 def get_live_price(symbol="BTCUSDT"):
     try:
-        url = f"https://api.binance.com/api/v3/ticker/price?symbol={symbol}"
-        data = requests.get(url, timeout=5).json()
-        return float(data["price"])
+        return get_client().get_price(symbol)
     except Exception:
         return None
 
+def get_live_prices(symbols):
+    """One batched request for every symbol shown on this render."""
+    try:
+        return get_prices(symbols)
+    except Exception:
+        return {}
+
 def main():
     st.title("💸 Paper Trading ")
 
@@ -20,13 +34,8 @@ def main():
     Practice buy & sell orders and track your positions like a real exchange.
     """)
 
-    # --- Init Session ---
-    if "balance" not in st.session_state:
-        st.session_state.balance = 10000.0
-    if "trades" not in st.session_state:
-        st.session_state.trades = []
-    if "positions" not in st.session_state:
-        st.session_state.positions = {}
+    # --- Ledger (persisted, shared by every session) ---
+    ledger = get_ledger()
 
     # ===== Currency Option =====
     currency = st.radio("💱 Display Currency", ["USD ($)", "INR (₹)"], horizontal=True)
@@ -38,15 +47,16 @@ def main():
     symbol_sign = "₹" if currency.startswith("INR") else "$"
 
     # --- Current Balance ---
-    st.metric("💰 Available Balance", f"{symbol_sign}{cvt(st.session_state.balance):,.2f}")
+    st.metric("💰 Available Balance", f"{symbol_sign}{cvt(ledger.balance):,.2f}")
 
     # === Holdings Table ===
     st.subheader("📊 Current Holdings")
-    if st.session_state.positions:
+    positions = ledger.positions()
+    if positions:
         pos_data = []
-        for sym, p in st.session_state.positions.items():
-            last_price = get_live_price(sym) or p.get("last_price", p["avg_price"])
-            p["last_price"] = last_price
+        prices = get_live_prices(positions.keys())
+        for sym, p in positions.items():
+            last_price = prices.get(sym) or p.get("last_price", p["avg_price"])
             pos_data.append({
                 "Symbol": sym,
                 "Quantity": p["qty"],
@@ -66,80 +76,76 @@ def main():
     crypto = st.selectbox("Select Symbol", ["BTCUSDT", "ETHUSDT"])
     qty = st.number_input("Quantity", min_value=0.001, step=0.001)
 
+    order_type = st.radio("Order Type", list(ORDER_TYPES), horizontal=True)
+    kind = ORDER_TYPES[order_type]
+
     # Fetch live market price automatically
     live_price = get_live_price(crypto)
     if live_price:
         st.success(f"💹 Live Market Price: ${live_price:,.2f}")
-    else:
-        st.warning("⚠️ Could not fetch live price, using fallback price.")
-        live_price = 50000.0
+    elif kind is None:
+        st.error("⚠️ Could not fetch live price — market orders are disabled until it is back.")
+
+    trigger = None
+    if kind is not None:
+        trigger = st.number_input("Trigger Price (USD)", min_value=0.0, value=float(live_price or 0.0),
+                                  step=1.0, format="%.2f")
 
+    engine = get_engine()
     col1, col2 = st.columns(2)
+    can_trade = live_price is not None if kind is None else trigger > 0
 
-    # ----- BUY -----
-    if col1.button("✅ BUY", use_container_width=True):
-        if qty > 0:
-            cost_usd = qty * live_price
-            if cost_usd <= st.session_state.balance:
-                st.session_state.balance -= cost_usd
-                pos = st.session_state.positions.get(crypto, {"qty": 0, "avg_price": 0})
-                new_qty = pos["qty"] + qty
-                new_avg = ((pos["qty"] * pos["avg_price"]) + cost_usd) / new_qty
-                st.session_state.positions[crypto] = {
-                    "qty": new_qty,
-                    "avg_price": new_avg,
-                    "last_price": live_price
-                }
-                st.session_state.trades.append({
-                    "Time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "Symbol": crypto,
-                    "Action": "Buy",
-                    "Quantity": qty,
-                    "Price (USD)": live_price,
-                    "Total (USD)": cost_usd
-                })
-                st.success(f"✅ Bought {qty} {crypto} @ ${live_price:,.2f}")
-            else:
-                st.error("❌ Insufficient balance.")
-        else:
+    def submit(side):
+        if qty <= 0:
             st.warning("Enter a valid quantity.")
+            return
+        price = live_price if kind is None else trigger
+        if side == BUY and qty * price > ledger.balance:
+            st.error("❌ Insufficient balance.")
+            return
+        verb = "Bought" if side == BUY else "Sold"
+        if kind is None:
+            ledger.record_fill(crypto, side, qty, price)
+            st.success(f"✅ {verb} {qty} {crypto} @ ${price:,.2f}")
+        else:
+            order = engine.place(crypto, side, kind, price, qty)
+            st.success(f"📌 {order_type} order #{order.id} placed: "
+                       f"{'buy' if side == BUY else 'sell'} {qty} {crypto} @ ${price:,.2f}")
+
+    # ----- BUY -----
+    if col1.button("✅ BUY", use_container_width=True, disabled=not can_trade):
+        submit(BUY)
 
     # ----- SELL -----
-    if col2.button("❌ SELL", use_container_width=True):
-        if qty > 0:
-            cost_usd = qty * live_price
-            pos = st.session_state.positions.get(crypto, {"qty": 0, "avg_price": live_price})
-            new_qty = pos["qty"] - qty
-            new_avg = market_price_usd = live_price
-
-            st.session_state.balance += cost_usd
-            if new_qty > 0:
-                st.session_state.positions[crypto] = {
-                    "qty": new_qty,
-                    "avg_price": new_avg,
-                    "last_price": live_price
-                }
-            else:
-                st.session_state.positions.pop(crypto, None)
-
-            st.session_state.trades.append({
-                "Time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "Symbol": crypto,
-                "Action": "Sell",
-                "Quantity": qty,
-                "Price (USD)": live_price,
-                "Total (USD)": cost_usd
-            })
-            st.success(f"✅ Sold {qty} {crypto} @ ${live_price:,.2f}")
-        else:
-            st.warning("Enter a valid quantity.")
+    if col2.button("❌ SELL", use_container_width=True, disabled=not can_trade):
+        submit(SELL)
+
+    # === Open Orders ===
+    st.subheader("📌 Open Orders")
+    orders = engine.open_orders()
+    if orders:
+        st.caption("Filled automatically by the live candle stream when the price reaches them.")
+        for o in sorted(orders, key=lambda o: o["id"]):
+            c1, c2 = st.columns([5, 1])
+            c1.write(f"#{o['id']} · {o['symbol']} · {'BUY' if o['side'] == BUY else 'SELL'} "
+                     f"{o['kind'].replace('_', ' ')} · {o['qty']} @ ${o['price']:,.2f}")
+            if c2.button("Cancel", key=f"cancel-{o['id']}"):
+                engine.cancel(o["id"])
+                st.rerun()
+    else:
+        st.info("No open orders.")
 
     st.markdown("---")
 
     # === Trade History Table ===
     st.subheader("📜 Trade History")
-    if st.session_state.trades:
-        df = pd.DataFrame(st.session_state.trades).copy()
+    trades = ledger.trades(limit=TRADE_HISTORY_ROWS)
+    if not trades.empty:
+        df = trades.rename(columns={
+            "time": "Time", "symbol": "Symbol", "action": "Action", "quantity": "Quantity",
+            "price": "Price (USD)", "total": "Total (USD)",
+        })
+        df["Action"] = df["Action"].str.capitalize()
         if currency.startswith("INR"):
             df["Price (INR)"] = df["Price (USD)"] * USD_INR_RATE
             df["Total (INR)"] = df["Total (USD)"] * USD_INR_RATE
@@ -148,4 +154,5 @@ def main():
         st.info("No trades yet.")
 
 if __name__ == "__main__":
-    main()
+    with page_run("3_PaperTrading"):
+        main()
@@ -1,87 +1,91 @@
+import time
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-from pycoingecko import CoinGeckoAPI
-import tensorflow as tf
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.model_selection import train_test_split
 
-cg = CoinGeckoAPI()
+from models.lstm_infer import shared_lstm_predictor, signal_from_output
+from models.sweep import load_best_params
+from services.market_data import get_client
+from services.signal_worker import COIN_INTERVAL, ensure_signal_worker, get_signal_store, signal_max_age
+from services.training_jobs import get_training_manager
+from utils.chart_data import decimate_line
+from utils.metrics import page_run, timer
 
 # ------------------ Fetch Data ------------------ #
 def get_historical_data(symbol="bitcoin", days=180, vs_currency="usd"):
-    data = cg.get_coin_market_chart_by_id(id=symbol, vs_currency=vs_currency, days=days)
-    prices = data["prices"]
-    df = pd.DataFrame(prices, columns=["timestamp", "price"])
-    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-    return df
-
-# ------------------ Prepare Data for LSTM ------------------ #
-def prepare_lstm_data(df, window_size=30):
-    scaler = MinMaxScaler()
-    scaled_data = scaler.fit_transform(df[["price"]])
-
-    X, y = [], []
-    for i in range(window_size, len(scaled_data)):
-        X.append(scaled_data[i-window_size:i, 0])
-        # If next price > current → Buy (1), else Sell (-1)
-        y.append(1 if scaled_data[i, 0] > scaled_data[i-1, 0] else -1)
-
-    X, y = np.array(X), np.array(y)
-    X = np.reshape(X, (X.shape[0], X.shape[1], 1))  # (samples, timesteps, features)
-    return X, y, scaler
-
-# ------------------ Train LSTM Model ------------------ #
-def train_lstm(df):
-    X, y, scaler = prepare_lstm_data(df)
-
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
-
-    model = tf.keras.Sequential([
-        tf.keras.layers.LSTM(50, return_sequences=True, input_shape=(X_train.shape[1], 1)),
-        tf.keras.layers.Dropout(0.2),
-        tf.keras.layers.LSTM(50, return_sequences=False),
-        tf.keras.layers.Dropout(0.2),
-        tf.keras.layers.Dense(25, activation='relu'),
-        tf.keras.layers.Dense(1, activation='tanh')  # -1 to 1 (Sell to Buy)
-    ])
-
-    model.compile(optimizer='adam', loss='mse', metrics=['accuracy'])
-    model.fit(X_train, y_train, epochs=5, batch_size=32, verbose=1)
-
-    loss, acc = model.evaluate(X_test, y_test, verbose=0)
-    return model, acc, scaler
+    return get_client().get_market_chart(symbol, days, vs_currency)
 
 # ------------------ Streamlit UI ------------------ #
+def show_signal(signal):
+    if signal == "BUY":
+        st.success("📈 Signal: BUY")
+    elif signal == "SELL":
+        st.error("📉 Signal: SELL")
+    else:
+        st.info("⚖️ Signal: HOLD")
+
+
 def ai_lstm_strategy_app():
     st.title("🤖 LSTM AI Trading Strategy")
 
+    # precomputes the watchlist's signals on every candle close
+    ensure_signal_worker()
+
     coin = st.selectbox("Select Coin", ["bitcoin", "ethereum"])
     days = st.slider("Select Days of Historical Data", 1, 365, 180)
 
+    # the button starts the run; keep showing it on the reruns that poll training
     if st.button("🔮 Run LSTM Model"):
-        with st.spinner("Training LSTM Model... Please wait ⏳"):
-            df = get_historical_data(coin, days)
-            st.line_chart(df.set_index("timestamp")["price"])
-
-            model, accuracy, scaler = train_lstm(df)
-            st.success(f"✅ Model Trained with Accuracy: {accuracy:.2f}")
-
-            # Last window ka data le kar predict karo
-            window_size = 30
-            last_data = df["price"].values[-window_size:]
-            scaled_last_data = scaler.transform(last_data.reshape(-1, 1))
-            X_input = np.reshape(scaled_last_data, (1, window_size, 1))
-
-            prediction = model.predict(X_input)[0][0]
-
-            if prediction > 0.2:
-                st.success("📈 Signal: BUY")
-            elif prediction < -0.2:
-                st.error("📉 Signal: SELL")
-            else:
-                st.info("⚖️ Signal: HOLD")
+        st.session_state.lstm_run = (coin, days)
+    if st.session_state.get("lstm_run") != (coin, days):
+        return
+
+    df = get_historical_data(coin, days)
+    # LTTB keeps the shape of long series within the chart point budget
+    with timer("render", "strategy chart"):
+        st.line_chart(decimate_line(df, x="timestamp", y="price").set_index("timestamp")["price"])
+
+    # window size / ±threshold tuned by models/sweep.py (defaults 30 / 0.2)
+    params = load_best_params("lstm")
+
+    # offline-trained multi-coin model (python -m models.lstm) when there is one
+    shared = shared_lstm_predictor()
+    if shared is not None:
+        st.success(f"✅ Pre-trained Model Accuracy: {shared.accuracy:.2f}")
+        # signal the worker stored at the last close, computed here if there is none yet
+        stored = get_signal_store().latest(coin, f"{days}d", "lstm", max_age=signal_max_age(COIN_INTERVAL))
+        if stored is not None:
+            show_signal(stored["signal"])
+            st.caption(f"Precomputed at {pd.to_datetime(stored['computed_at'], unit='ms'):%H:%M:%S} UTC")
+        else:
+            show_signal(signal_from_output(shared.predict_signal(df["price"].values), params["threshold"]))
+        return
+
+    # otherwise a model for this data, trained in the background on a miss
+    artifact, job, stale = get_training_manager().request(
+        "lstm", df[["timestamp", "price"]], {"window_size": int(params["window_size"]), "epochs": 5},
+        name=f"{coin}-{days}"
+    )
+    if job is not None and job.status == "failed":
+        st.error(f"⚠️ {job.message}")
+    elif job is not None and not job.done:
+        st.progress(job.progress, text=f"🏋️ Training LSTM in background: {job.message}")
+
+    if artifact is None:
+        st.info("⏳ Training LSTM Model... the signal appears when it is ready.")
+    else:
+        if stale:
+            st.caption("Showing the previous model until the fresh one is ready.")
+        st.success(f"✅ Model Trained with Accuracy: {artifact['accuracy']:.2f}")
+
+        # Last window ka data le kar predict karo (quantized TFLite model on CPU)
+        show_signal(signal_from_output(artifact["model"].predict_signal(df["price"].values), params["threshold"]))
+
+    if job is not None and not job.done:
+        time.sleep(1)
+        st.rerun()
 
 # ------------------ Run App ------------------ #
 if __name__ == "__main__":
-    ai_lstm_strategy_app()
+    with page_run("5_Strategy"):
+        ai_lstm_strategy_app()
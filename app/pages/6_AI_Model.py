@@ -1,56 +1,30 @@
+import time
+
 import streamlit as st
 import pandas as pd
-from pycoingecko import CoinGeckoAPI
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
 
-cg = CoinGeckoAPI()
+from models.classifier import predict_direction, signal_from_direction, with_rf_features
+from models.features import RF_FEATURES
+from models.sweep import load_best_params
+from services.market_data import MarketDataError, get_client
+from services.signal_worker import COIN_INTERVAL, ensure_signal_worker, get_signal_store, signal_max_age
+from services.training_jobs import get_training_manager
+from utils.metrics import page_run, timer
 
 # ✅ Step 1: Fetch Data
 def get_historical_data(symbol="bitcoin", days=180, vs_currency="usd"):
-    data = cg.get_coin_market_chart_by_id(id=symbol, vs_currency=vs_currency, days=days)
-    prices = data["prices"]
-    df = pd.DataFrame(prices, columns=["timestamp", "price"])
-    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-    return df
+    return get_client().get_market_chart(symbol, days, vs_currency)
 
 # ✅ Step 2: Indicators
 def add_indicators(df):
-    df["SMA_10"] = df["price"].rolling(window=10).mean()
-    df["EMA_10"] = df["price"].ewm(span=10, adjust=False).mean()
-
-    delta = df["price"].diff()
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
-    avg_gain = gain.rolling(14).mean()
-    avg_loss = loss.rolling(14).mean()
-    rs = avg_gain / avg_loss
-    df["RSI"] = 100 - (100 / (1 + rs))
-
-    ema12 = df["price"].ewm(span=12, adjust=False).mean()
-    ema26 = df["price"].ewm(span=26, adjust=False).mean()
-    df["MACD"] = ema12 - ema26
-    df["Signal"] = df["MACD"].ewm(span=9, adjust=False).mean()
-
-    df = df.dropna()
-    return df
-
-# ✅ Step 3: Train Model
-def train_model(df):
-    df["Target"] = (df["price"].shift(-1) > df["price"]).astype(int)  # 1=UP, 0=DOWN
-    df = df.dropna()
-
-    X = df[["SMA_10", "EMA_10", "RSI", "MACD", "Signal"]]
-    y = df["Target"]
-
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
+    # SMA_10, EMA_10, RSI, MACD, Signal from the shared feature engine
+    with timer("features", "rf_features"):
+        return with_rf_features(df)
 
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
-    model.fit(X_train, y_train)
-
-    acc = accuracy_score(y_test, model.predict(X_test))
-    return model, acc, df
+# ✅ Step 3: Get Model (cached artifact, trained in the background on a miss)
+def get_model(df, symbol, days, n_estimators=100):
+    params = {"n_estimators": n_estimators, "random_state": 42}
+    return get_training_manager().request("rf", df, params, name=f"{symbol}-{days}")
 
 # ✅ Step 4: Streamlit Page
 def ai_model_page():
@@ -59,27 +33,64 @@ def ai_model_page():
     symbol = st.selectbox("Select Coin", ["bitcoin", "ethereum"])
     days = st.slider("Select Days", 1, 365, 180)
 
-    df = get_historical_data(symbol, days)
+    # precomputes the watchlist's signals on every candle close
+    ensure_signal_worker()
+    stored = get_signal_store().latest(symbol, f"{days}d", "rf", max_age=signal_max_age(COIN_INTERVAL))
+    if stored is not None:
+        st.metric("📊 Model Accuracy", f"{stored['detail']['accuracy']*100:.2f}%")
+        show_signal(stored["signal"], stored["confidence"])
+        st.caption(f"Precomputed at {pd.to_datetime(stored['computed_at'], unit='ms'):%H:%M:%S} UTC")
+        return
+
+    try:
+        df = get_historical_data(symbol, days)
+    except MarketDataError as e:
+        # HTTP errors and rate limits (nothing cached to fall back on)
+        st.error(f"⚠️ Could not load market data: {e}")
+        return
     df = add_indicators(df)
 
-    model, acc, df = train_model(df)
+    # n_estimators / confidence cutoff tuned by models/sweep.py (defaults 100 / 55%)
+    params = load_best_params("rf")
+    artifact, job, stale = get_model(df, symbol, days, int(params["n_estimators"]))
 
-    st.metric("📊 Model Accuracy", f"{acc*100:.2f}%")
+    if job is not None and job.status == "failed":
+        st.error(f"⚠️ {job.message}")
+    elif job is not None and not job.done:
+        st.progress(job.progress, text=f"🏋️ Training in background: {job.message}")
+
+    if artifact is None:
+        st.info("⏳ First model for this coin & period is training, the suggestion appears when it is ready.")
+    else:
+        if stale:
+            st.caption("Showing the previous model until the fresh one is ready.")
+        show_suggestion(artifact, df, params)
+
+    # poll the background job until it finishes
+    if job is not None and not job.done:
+        time.sleep(1)
+        st.rerun()
 
-    latest_features = df[["SMA_10", "EMA_10", "RSI", "MACD", "Signal"]].iloc[-1:].values
-    proba = model.predict_proba(latest_features)[0]
-    prediction = model.predict(latest_features)[0]
+def show_suggestion(artifact, df, params):
+    model, acc = artifact["model"], artifact["accuracy"]
+    st.metric("📊 Model Accuracy", f"{acc*100:.2f}%")
 
-    confidence = max(proba) * 100
+    # one predict_proba pass gives both the class and its probability
+    latest_features = df[RF_FEATURES].iloc[-1:].values
+    with timer("predict", "rf"):
+        direction, probability = predict_direction(model, latest_features)
+    show_signal(*signal_from_direction(direction[0], probability[0], params["confidence"]))
 
+def show_signal(signal, confidence):
     # ✅ Decision Logic
-    if confidence < 55:
+    if signal == "HOLD":
         st.warning("😐 AI Suggestion: **HOLD (Low Confidence)**")
-    elif prediction == 1:
+    elif signal == "BUY":
         st.success(f"✅ AI Suggestion: **BUY (Price may go UP)** | Confidence: {confidence:.2f}%")
     else:
         st.error(f"❌ AI Suggestion: **SELL (Price may go DOWN)** | Confidence: {confidence:.2f}%")
 
 # Run
 if __name__ == "__main__":
-    ai_model_page()
+    with page_run("6_AI_Model"):
+        ai_model_page()
@@ -0,0 +1,70 @@
+import streamlit as st
+import pandas as pd
+
+from utils.metrics import (STAGES, get_metrics, get_metrics_store, hit_rates, page_run, percentiles,
+                           prometheus_text)
+
+# pages wrapped in page_run(), i.e. the ones a capture can be requested for
+PROFILED_PAGES = ["2_AI_Assistant", "3_PaperTrading", "4_Portfolio", "5_Strategy", "6_AI_Model"]
+WINDOWS = {"Last 15 minutes": 900, "Last hour": 3600, "Last 24 hours": 86_400, "Everything kept": None}
+
+
+def profiling_page():
+    st.title("⏱️ Profiling")
+    store = get_metrics_store()
+    # this process's buffered samples first, so the table includes the latest clicks
+    get_metrics().flush()
+
+    window = st.selectbox("Window", list(WINDOWS), index=1)
+    samples = store.samples(WINDOWS[window])
+    counters = store.counters()
+
+    # ---- 🔹 Stage latency ----
+    st.subheader("Latency per stage")
+    if samples.empty:
+        st.info("No timings recorded yet: open the other pages (or start the signal worker) and come back.")
+    else:
+        by_stage = percentiles(samples)
+        st.dataframe(by_stage.round(3), hide_index=True, width="stretch")
+        st.bar_chart(by_stage.set_index("stage")[["p50_ms", "p95_ms", "p99_ms"]], stack=False)
+        with st.expander("Per operation"):
+            stage = st.selectbox("Stage", [s for s in STAGES if s in set(samples["stage"])]
+                                 + sorted(set(samples["stage"]) - set(STAGES)))
+            by_op = percentiles(samples[samples["stage"] == stage], by=("op",))
+            st.dataframe(by_op.sort_values("total_ms", ascending=False).round(3), hide_index=True,
+                         width="stretch")
+
+    # ---- 🔹 Caches ----
+    st.subheader("Cache hit rates")
+    rates = hit_rates(counters)
+    if rates:
+        st.dataframe(pd.DataFrame(rates, columns=["cache", "hits", "misses", "hit_rate"])
+                     .style.format({"hit_rate": "{:.1%}"}), hide_index=True, width="stretch")
+    else:
+        st.caption("No cache lookups recorded yet.")
+
+    col1, col2 = st.columns(2)
+    col1.download_button("⬇️ Prometheus text", prometheus_text(samples, counters),
+                         file_name="metrics.prom", mime="text/plain")
+    if col2.button("🗑️ Reset timings & counters"):
+        store.reset()
+        st.rerun()
+
+    # ---- 🔹 Profiles ----
+    st.subheader("Request profiles")
+    page = st.selectbox("Page", PROFILED_PAGES)
+    if st.button("🎯 Profile the next run of this page"):
+        store.request_profile(page)
+    pending = store.pending_profiles()
+    if pending:
+        st.caption(f"Waiting for the next run of: {', '.join(pending)}")
+    for profile in store.profiles():
+        captured = pd.to_datetime(profile["captured"], unit="s")
+        with st.expander(f"{profile['page']} · {captured:%Y-%m-%d %H:%M:%S} UTC · "
+                         f"{profile['seconds'] * 1000:.0f} ms · {profile['tool']}"):
+            st.code(profile["report"], language="text")
+
+
+if __name__ == "__main__":
+    with page_run("7_Profiling"):
+        profiling_page()
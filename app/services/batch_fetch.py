@@ -0,0 +1,125 @@
+import asyncio
+import threading
+
+from services.market_data import MarketDataError, RateLimitError, get_client
+
+
+class BatchFetcher:
+    """
+    asyncio fan-out over the shared market-data client.
+
+    Symbols are de-duplicated and sent to the multi-symbol endpoints in
+    one request; anything that needs several requests (klines, or a
+    fallback after a bad symbol) runs concurrently, at most `max_concurrency`
+    in flight across every call on this fetcher (get_batch_fetcher() shares
+    one per process). Request weight is accounted by the process-wide
+    rate-limit scheduler. The blocking HTTP calls run on the default
+    executor so they keep using the client's pooled session and cache.
+    """
+
+    def __init__(self, client=None, max_concurrency: int = 8):
+        self.client = client or get_client()
+        self.max_concurrency = max_concurrency
+        # a thread semaphore: each sync helper call runs its own event loop
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def _guarded(self, fn, *args):
+        with self._slots:
+            return fn(*args)
+
+    async def _call(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._guarded, fn, *args)
+
+    async def fetch_prices(self, symbols) -> dict:
+        """{symbol: price} from Binance, one request for the whole set."""
+        symbols = sorted({s.upper() for s in symbols if s})
+        if not symbols:
+            return {}
+        try:
+            return await self._call(self.client.get_prices, symbols)
+        except RateLimitError:
+            # per-symbol retries would only add weight
+            raise
+        except MarketDataError:
+            # one unknown symbol fails the whole batch: price them one by one
+            results = await asyncio.gather(*[
+                self._call(self.client.get_price, s)
+                for s in symbols
+            ], return_exceptions=True)
+            return {s: p for s, p in zip(symbols, results) if not isinstance(p, BaseException)}
+
+    async def fetch_coingecko_prices(self, coin_ids, vs_currency="usd") -> dict:
+        """{coin_id: price} from CoinGecko with comma-joined ids."""
+        coin_ids = sorted({c for c in coin_ids if c})
+        if not coin_ids:
+            return {}
+        return await self._call(self.client.get_simple_prices, coin_ids, vs_currency)
+
+    async def fetch_klines(self, requests) -> dict:
+        """
+        {(symbol, interval, limit): DataFrame} for many kline requests at once.
+        Failed requests are left out of the result.
+        """
+        keys = sorted(set(requests))
+        if not keys:
+            return {}
+        results = await asyncio.gather(*[
+            self._call(self.client.get_klines, *key)
+            for key in keys
+        ], return_exceptions=True)
+        return {k: df for k, df in zip(keys, results) if not isinstance(df, BaseException)}
+
+
+def _run(coro):
+    """Run a coroutine from sync code, even if this thread already has a loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    box = {}
+
+    def target():
+        try:
+            box["result"] = asyncio.run(coro)
+        except BaseException as e:
+            box["error"] = e
+
+    t = threading.Thread(target=target)
+    t.start()
+    t.join()
+    if "error" in box:
+        raise box["error"]
+    return box["result"]
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_batch_fetcher() -> BatchFetcher:
+    """
+    Process-wide fetcher on the shared client, so concurrent renders share
+    one concurrency cap (and the client's one rate budget).
+    """
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None or _fetcher.client is not get_client():
+            # rebuilt when the shared client is swapped (set_client)
+            _fetcher = BatchFetcher()
+        return _fetcher
+
+
+def get_prices(symbols, fetcher=None) -> dict:
+    """Sync helper for pages: one Binance price map per render."""
+    return _run((fetcher or get_batch_fetcher()).fetch_prices(symbols))
+
+
+def get_coingecko_prices(coin_ids, vs_currency="usd", fetcher=None) -> dict:
+    """Sync helper for pages: one CoinGecko price map per render."""
+    return _run((fetcher or get_batch_fetcher()).fetch_coingecko_prices(coin_ids, vs_currency))
+
+
+def get_klines_many(requests, fetcher=None) -> dict:
+    """Sync helper: klines for many (symbol, interval, limit) tuples."""
+    return _run((fetcher or get_batch_fetcher()).fetch_klines(requests))
@@ -0,0 +1,207 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from services.market_data import INTERVAL_MS, get_client
+from services.rate_limit import BACKGROUND, request_priority
+from utils.ingest import CANDLE_COLUMNS, CANDLE_SCHEMA
+
+DEFAULT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "store"))
+
+# partitions are written with the canonical candle schema (utils.ingest)
+STORE_COLUMNS = CANDLE_COLUMNS
+DAY_MS = 24 * 60 * 60_000
+PAGE_LIMIT = 1000
+
+
+class CandleStore:
+    """
+    Local candle store: one Parquet file per (symbol, interval, UTC day).
+
+    Only closed candles are stored. `sync()` downloads just the ranges that
+    are missing locally, paging with startTime/endTime, and de-duplicates by
+    open time, so repeated runs only fetch the newest candles.
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT, client=None):
+        self.root = root
+        self.client = client
+
+    # ---- 🔹 Paths ----
+    def _dir(self, symbol, interval):
+        return os.path.join(self.root, symbol.upper(), interval)
+
+    def _day_path(self, symbol, interval, day_ms):
+        day = pd.Timestamp(day_ms, unit="ms").strftime("%Y-%m-%d")
+        return os.path.join(self._dir(symbol, interval), f"{day}.parquet")
+
+    def _partitions(self, symbol, interval, start=None, end=None):
+        """Sorted partition files overlapping [start, end] (ms)."""
+        folder = self._dir(symbol, interval)
+        if not os.path.isdir(folder):
+            return []
+        files = sorted(f for f in os.listdir(folder) if f.endswith(".parquet"))
+        out = []
+        for f in files:
+            day_ms = int(pd.Timestamp(f[:-len(".parquet")]).value // 1_000_000)
+            if start is not None and day_ms + DAY_MS <= start:
+                continue
+            if end is not None and day_ms > end:
+                continue
+            out.append(os.path.join(folder, f))
+        return out
+
+    def files(self, symbol, interval, start=None, end=None) -> list:
+        """Partition files holding the candles of (symbol, interval), oldest first."""
+        return self._partitions(symbol, interval, start, end)
+
+    # ---- 🔹 Write ----
+    def write(self, symbol, interval, df: pd.DataFrame):
+        """
+        Merge candles (STORE_COLUMNS) into the day partitions they belong to.
+        """
+        if df.empty:
+            return
+        df = df[STORE_COLUMNS]
+        days = df["open_time"].to_numpy() // DAY_MS * DAY_MS
+        os.makedirs(self._dir(symbol, interval), exist_ok=True)
+        for day_ms in np.unique(days):
+            part = df[days == day_ms]
+            path = self._day_path(symbol, interval, int(day_ms))
+            if os.path.exists(path):
+                part = pd.concat([pd.read_parquet(path), part], ignore_index=True)
+            part = (part.drop_duplicates("open_time", keep="last")
+                        .sort_values("open_time")
+                        .reset_index(drop=True))
+            tmp = path + ".tmp"
+            pq.write_table(pa.Table.from_pandas(part, schema=CANDLE_SCHEMA, preserve_index=False), tmp)
+            os.replace(tmp, path)
+
+    # ---- 🔹 Read ----
+    def load(self, symbol, interval, start=None, end=None) -> pd.DataFrame:
+        """
+        Stored candles between `start` and `end` (ms, inclusive) with a Time column.
+        """
+        files = self._partitions(symbol, interval, start, end)
+        if not files:
+            df = pd.DataFrame({c: pd.Series(dtype="int64" if c == "open_time" else "float64")
+                               for c in STORE_COLUMNS})
+        else:
+            table = pa.concat_tables(pq.read_table(f, memory_map=True) for f in files)
+            df = table.to_pandas()
+            if start is not None:
+                df = df[df["open_time"] >= start]
+            if end is not None:
+                df = df[df["open_time"] <= end]
+            df = df.reset_index(drop=True)
+        df["Time"] = pd.to_datetime(df["open_time"], unit="ms")
+        return df
+
+    def open_times(self, symbol, interval, start=None, end=None) -> np.ndarray:
+        files = self._partitions(symbol, interval, start, end)
+        if not files:
+            return np.empty(0, dtype="int64")
+        times = np.concatenate([
+            pq.read_table(f, columns=["open_time"]).column(0).to_numpy() for f in files
+        ])
+        if start is not None:
+            times = times[times >= start]
+        if end is not None:
+            times = times[times <= end]
+        return times
+
+    def missing_ranges(self, symbol, interval, start, end):
+        """
+        [(first_missing_open, last_missing_open), ...] inside [start, end].
+        """
+        step = INTERVAL_MS[interval]
+        start = start // step * step
+        end = end // step * step
+        if end < start:
+            return []
+        times = self.open_times(symbol, interval, start, end)
+        if times.size == 0:
+            return [(start, end)]
+        ranges = []
+        if times[0] > start:
+            ranges.append((start, int(times[0]) - step))
+        gaps = np.flatnonzero(np.diff(times) > step)
+        for i in gaps:
+            ranges.append((int(times[i]) + step, int(times[i + 1]) - step))
+        if times[-1] < end:
+            ranges.append((int(times[-1]) + step, end))
+        return ranges
+
+    # ---- 🔹 Sync ----
+    def _rows_to_frame(self, rows):
+        arr = np.asarray([r[:6] for r in rows], dtype=object)
+        return pd.DataFrame({
+            "open_time": arr[:, 0].astype("int64"),
+            "Open": arr[:, 1].astype(float),
+            "High": arr[:, 2].astype(float),
+            "Low": arr[:, 3].astype(float),
+            "Close": arr[:, 4].astype(float),
+            "Volume": arr[:, 5].astype(float),
+        })
+
+    def _fetch_forward(self, symbol, interval, start, end):
+        client = self.client or get_client()
+        step = INTERVAL_MS[interval]
+        cursor, fetched = start, 0
+        while cursor <= end:
+            rows = client.get_kline_rows(symbol, interval, PAGE_LIMIT,
+                                         start_time=cursor, end_time=end + step - 1)
+            if not rows:
+                break
+            self.write(symbol, interval, self._rows_to_frame(rows))
+            fetched += len(rows)
+            cursor = int(rows[-1][0]) + step
+        return fetched
+
+    def _fetch_backward(self, symbol, interval, start, end):
+        client = self.client or get_client()
+        step = INTERVAL_MS[interval]
+        cursor, fetched = end, 0
+        while cursor >= start:
+            # endTime only: Binance returns the newest page ending at cursor
+            rows = client.get_kline_rows(symbol, interval, PAGE_LIMIT,
+                                         end_time=cursor + step - 1)
+            if not rows:
+                break
+            oldest = int(rows[0][0])
+            rows = [r for r in rows if int(r[0]) >= start]
+            if rows:
+                self.write(symbol, interval, self._rows_to_frame(rows))
+                fetched += len(rows)
+            if oldest <= start:
+                break
+            cursor = oldest - step
+        return fetched
+
+    def sync(self, symbol="BTCUSDT", interval="1m", start=None, end=None, days=None) -> int:
+        """
+        Download every closed candle missing in [start, end] (ms). `days`
+        is a shortcut for start = now - days. Returns the number of candles fetched.
+        Requests run at background priority, behind the UI's.
+        """
+        step = INTERVAL_MS[interval]
+        now_ms = int(time.time() * 1000)
+        last_closed = now_ms // step * step - step
+        end = last_closed if end is None else min(end, last_closed)
+        if start is None:
+            start = int(end - (days or 1) * DAY_MS)
+        first = self.open_times(symbol, interval)[:1]
+
+        fetched = 0
+        with request_priority(BACKGROUND):
+            for lo, hi in self.missing_ranges(symbol, interval, start, end):
+                if first.size and hi < first[0]:
+                    # extending history into the past
+                    fetched += self._fetch_backward(symbol, interval, lo, hi)
+                else:
+                    fetched += self._fetch_forward(symbol, interval, lo, hi)
+        return fetched
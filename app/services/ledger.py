@@ -0,0 +1,229 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from services.pnl import trade_table
+
+DEFAULT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "paper_trading.db"))
+INITIAL_BALANCE = 10000.0
+EPS = 1e-12
+
+BUY, SELL = 1, -1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fills (
+    seq    INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts     INTEGER NOT NULL,          -- ns since epoch
+    symbol TEXT    NOT NULL,
+    side   INTEGER NOT NULL,          -- 1 = buy, -1 = sell
+    qty    REAL    NOT NULL,
+    price  REAL    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    seq     INTEGER PRIMARY KEY,      -- last fill included in the snapshot
+    created INTEGER NOT NULL,
+    state   TEXT    NOT NULL
+);
+"""
+
+
+def apply_fill(state: dict, symbol: str, side: int, qty: float, price: float) -> float:
+    """
+    Update cash and the symbol's position for one fill, in place.
+    Average-cost accounting with shorts: adding to a position re-averages
+    the entry price, reducing it realizes P&L against that average, and
+    crossing zero opens the remainder at the fill price.
+    Returns the realized P&L of this fill.
+    """
+    signed = side * qty
+    state["balance"] -= signed * price
+    pos = state["positions"].setdefault(symbol, {"qty": 0.0, "avg_price": 0.0, "realized_pl": 0.0})
+    q0, avg = pos["qty"], pos["avg_price"]
+    realized = 0.0
+
+    if abs(q0) < EPS or q0 * signed > 0:
+        new_qty = q0 + signed
+        pos["avg_price"] = (abs(q0) * avg + qty * price) / abs(new_qty)
+    else:
+        closed = min(qty, abs(q0))
+        realized = (price - avg) * closed * (1 if q0 > 0 else -1)
+        new_qty = q0 + signed
+        if abs(new_qty) < EPS:
+            new_qty, pos["avg_price"] = 0.0, 0.0
+        elif new_qty * q0 < 0:
+            pos["avg_price"] = price
+
+    pos["qty"] = new_qty
+    pos["realized_pl"] += realized
+    pos["last_price"] = price
+    return realized
+
+
+class Ledger:
+    """
+    Append-only paper-trading ledger in SQLite (WAL mode).
+
+    Every fill is appended to `fills`; balance and positions are kept as an
+    in-memory snapshot updated per fill, so reads cost O(#symbols). Every
+    `checkpoint_every` fills the snapshot is saved, and opening the ledger
+    replays only the fills after the last checkpoint. Other processes
+    writing to the same file are picked up by replaying the tail on read.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, initial_balance: float = INITIAL_BALANCE,
+                 checkpoint_every: int = 100):
+        self.path = path
+        self.initial_balance = initial_balance
+        self.checkpoint_every = checkpoint_every
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._load()
+
+    # ---- 🔹 State ----
+    def _empty_state(self):
+        return {"balance": self.initial_balance, "positions": {}}
+
+    def _load(self):
+        row = self._conn.execute(
+            "SELECT seq, state FROM snapshots ORDER BY seq DESC LIMIT 1").fetchone()
+        if row is None:
+            self.seq, self.state = 0, self._empty_state()
+        else:
+            self.seq, self.state = row[0], json.loads(row[1])
+        self._since_checkpoint = 0
+        self._replay_tail()
+
+    def _replay_tail(self):
+        rows = self._conn.execute(
+            "SELECT seq, symbol, side, qty, price FROM fills WHERE seq > ? ORDER BY seq",
+            (self.seq,)).fetchall()
+        for seq, symbol, side, qty, price in rows:
+            apply_fill(self.state, symbol, side, qty, price)
+            self.seq = seq
+        self._since_checkpoint += len(rows)
+
+    def refresh(self):
+        """Apply fills written by other processes since the last read."""
+        with self._lock:
+            self._replay_tail()
+
+    @property
+    def balance(self) -> float:
+        self.refresh()
+        return self.state["balance"]
+
+    def positions(self, include_flat: bool = False) -> dict:
+        """{symbol: {qty, avg_price, realized_pl, last_price}} (copies)."""
+        self.refresh()
+        with self._lock:
+            return {s: dict(p) for s, p in self.state["positions"].items()
+                    if include_flat or abs(p["qty"]) > EPS}
+
+    # ---- 🔹 Writes ----
+    def record_fill(self, symbol: str, side: int, qty: float, price: float, ts: int = None) -> dict:
+        """Append one fill and update the snapshot. Returns the fill with its realized P&L."""
+        return self.record_fills([(symbol, side, qty, price, ts)])[0]
+
+    def record_fills(self, fills) -> list:
+        """
+        Append (symbol, side, qty, price, ts) fills in one transaction and
+        apply them in order. Returns the fills with their realized P&L.
+        """
+        rows = []
+        for symbol, side, qty, price, ts in fills:
+            if side not in (BUY, SELL):
+                raise ValueError(f"side must be 1 (buy) or -1 (sell), got {side}")
+            if qty <= 0 or price <= 0:
+                raise ValueError("qty and price must be positive")
+            rows.append((ts or time.time_ns(), symbol.upper(), int(side), float(qty), float(price)))
+        if not rows:
+            return []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._replay_tail()
+                seqs = [self._conn.execute(
+                    "INSERT INTO fills (ts, symbol, side, qty, price) VALUES (?, ?, ?, ?, ?)", row).lastrowid
+                    for row in rows]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            out = []
+            for seq, (ts, symbol, side, qty, price) in zip(seqs, rows):
+                realized = apply_fill(self.state, symbol, side, qty, price)
+                out.append({"seq": seq, "ts": ts, "symbol": symbol, "side": side,
+                            "qty": qty, "price": price, "realized_pl": realized})
+            self.seq = seqs[-1]
+            self._since_checkpoint += len(rows)
+            if self._since_checkpoint >= self.checkpoint_every:
+                self.checkpoint()
+        return out
+
+    def checkpoint(self):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (seq, created, state) VALUES (?, ?, ?)",
+                (self.seq, time.time_ns(), json.dumps(self.state)))
+            self._since_checkpoint = 0
+
+    def reset(self, balance: float = None):
+        """Drop every fill and snapshot and start again with `balance`."""
+        with self._lock:
+            self._conn.execute("DELETE FROM fills")
+            self._conn.execute("DELETE FROM snapshots")
+            self.initial_balance = self.initial_balance if balance is None else balance
+            self.seq, self.state = 0, self._empty_state()
+            self._since_checkpoint = 0
+
+    # ---- 🔹 History ----
+    def fills(self, limit: int = None) -> pd.DataFrame:
+        """Fill log (oldest first) as a typed trade table (see services.pnl)."""
+        sql = "SELECT ts, symbol, side, qty, price FROM fills ORDER BY seq"
+        if limit is not None:
+            sql = (f"SELECT ts, symbol, side, qty, price FROM (SELECT * FROM fills "
+                   f"ORDER BY seq DESC LIMIT {int(limit)}) ORDER BY seq")
+        rows = self._conn.execute(sql).fetchall()
+        ts, symbol, side, qty, price = zip(*rows) if rows else ([],) * 5
+        return trade_table(symbol, side, qty, price, ts=ts)
+
+    def trades(self, limit: int = None) -> pd.DataFrame:
+        """
+        Fill history (oldest first) for display, with columns time, symbol,
+        action, quantity, price, total.
+        """
+        df = self.fills(limit)
+        return pd.DataFrame({
+            "time": pd.to_datetime(df["ts"], unit="ns").dt.strftime("%Y-%m-%d %H:%M:%S"),
+            "symbol": df["symbol"].astype(str),
+            "action": df["side"].map({BUY: "buy", SELL: "sell"}),
+            "quantity": df["qty"],
+            "price": df["price"],
+            "total": df["qty"] * df["price"],
+        })
+
+    def close(self):
+        with self._lock:
+            self.checkpoint()
+            self._conn.close()
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger() -> Ledger:
+    """Process-wide ledger shared by every session and page."""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = Ledger()
+        return _ledger
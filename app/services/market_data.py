@@ -0,0 +1,326 @@
+import json
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from urllib.parse import urlsplit
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.rate_limit import RateLimited, RequestScheduler, get_scheduler
+from utils.metrics import cache_event, timer
+
+BINANCE_URL = "https://api.binance.com"
+COINGECKO_URL = "https://api.coingecko.com/api/v3"
+
+# Candle length per Binance interval, in milliseconds
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 3 * 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "30m": 30 * 60_000,
+    "1h": 60 * 60_000,
+    "2h": 2 * 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "6h": 6 * 60 * 60_000,
+    "8h": 8 * 60 * 60_000,
+    "12h": 12 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+}
+
+KLINE_COLUMNS = [
+    "Open Time", "Open", "High", "Low", "Close", "Volume",
+    "Close Time", "Quote Asset Volume", "Number of Trades",
+    "Taker Buy Base", "Taker Buy Quote", "Ignore"
+]
+
+
+# how current a returned value is: stale values were served from cache
+# because the refresh failed (age in seconds, error text)
+Freshness = namedtuple("Freshness", ["stale", "age", "error"])
+FRESH = Freshness(False, 0.0, None)
+
+
+class MarketDataError(RuntimeError):
+    """Raised when an exchange request fails or returns an error payload."""
+
+
+class RateLimitError(MarketDataError):
+    """The host is rate limiting us (HTTP 429/418 or no free request weight)."""
+
+    def __init__(self, message, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RequestsTransport:
+    """
+    Default HTTP transport: one pooled keep-alive requests.Session.
+    Any object with a `get(url, params)` method returning a response-like
+    object (`status_code`, `headers`, `json()`) can be used instead, e.g. a
+    fake exchange in tests.
+    """
+
+    def __init__(self, pool_size: int = 10, timeout: float = 10.0):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url, params=None):
+        return self.session.get(url, params=params, timeout=self.timeout)
+
+
+def klines_to_frame(rows) -> pd.DataFrame:
+    """
+    Convert raw Binance kline rows into a typed OHLCV DataFrame.
+    """
+    with timer("parse", "klines_to_frame"):
+        df = pd.DataFrame(rows, columns=KLINE_COLUMNS)
+        df[["Open", "High", "Low", "Close", "Volume"]] = (
+            df[["Open", "High", "Low", "Close", "Volume"]].astype(float)
+        )
+        df["Time"] = pd.to_datetime(df["Open Time"], unit="ms")
+        return df[["Time", "Open", "High", "Low", "Close", "Volume"]]
+
+
+class MarketDataClient:
+    """
+    Shared market-data client for Binance and CoinGecko.
+
+    - one pooled transport for every request
+    - responses cached per key until the current candle closes (capped by `max_ttl`)
+    - concurrent callers asking for the same key share one in-flight request
+    - every request goes through the rate-limit scheduler (weights, priority, backoff)
+    - when a refresh fails, the last value up to `max_stale` seconds old is
+      served instead, flagged through Freshness
+    """
+
+    def __init__(self, transport=None, binance_url: str = BINANCE_URL,
+                 coingecko_url: str = COINGECKO_URL, max_ttl: float = 15.0,
+                 price_ttl: float = 2.0, coingecko_ttl: float = 60.0,
+                 scheduler: RequestScheduler = None, max_stale: float = 900.0):
+        self.transport = transport or RequestsTransport()
+        self.scheduler = scheduler or get_scheduler()
+        self.max_stale = max_stale
+        self.binance_url = binance_url.rstrip("/")
+        self.coingecko_url = coingecko_url.rstrip("/")
+        self.max_ttl = max_ttl
+        self.price_ttl = price_ttl
+        self.coingecko_ttl = coingecko_ttl
+        self._cache = {}      # key -> (expires_at, value, fetched_at)
+        self._inflight = {}   # key -> Future
+        self._lock = threading.Lock()
+
+    # ---- 🔹 Internals ----
+    def _request(self, url, params=None):
+        endpoint = urlsplit(url).path
+        try:
+            with timer("fetch", endpoint):
+                resp = self.scheduler.send(self.transport.get, url, params)
+        except RateLimited as e:
+            raise RateLimitError(f"GET {url} not sent: {e}", e.retry_after) from e
+        except requests.RequestException as e:
+            raise MarketDataError(f"GET {url} failed: {e}") from e
+        if resp.status_code in (429, 418):
+            retry_after = resp.headers.get("Retry-After")
+            raise RateLimitError(f"GET {url} rate limited with HTTP {resp.status_code}",
+                                 float(retry_after) if retry_after else None)
+        if resp.status_code != 200:
+            raise MarketDataError(f"GET {url} failed with HTTP {resp.status_code}")
+        with timer("parse", f"json {endpoint}"):
+            return resp.json()
+
+    def _cached_with_freshness(self, key, ttl: float, fetch):
+        """
+        (value, Freshness) for `key`: the cached value while it is fresh,
+        otherwise `fetch()` run once for all concurrent callers and cached
+        for `ttl` seconds. If the fetch fails and a value younger than
+        `max_stale` is held, that value is returned flagged stale.
+        """
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None and hit[0] > time.time():
+                cache_event("market_data", True)
+                return hit[1], FRESH
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        # joining a fetch already in flight costs no request: counted as a hit
+        cache_event("market_data", not owner)
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = fetch(), FRESH
+        except Exception as e:
+            age = time.time() - hit[2] if hit is not None else None
+            if age is None or age > self.max_stale:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                future.set_exception(e)
+                raise
+            result = hit[1], Freshness(True, age, str(e))
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            if not result[1].stale:
+                now = time.time()
+                self._cache[key] = (now + ttl, result[0], now)
+            self._inflight.pop(key, None)
+        future.set_result(result)
+        return result
+
+    def _cached(self, key, ttl: float, fetch):
+        return self._cached_with_freshness(key, ttl, fetch)[0]
+
+    def _candle_ttl(self, interval: str) -> float:
+        """Seconds until the current candle of `interval` closes, capped by max_ttl."""
+        step = INTERVAL_MS.get(interval)
+        if step is None:
+            return self.max_ttl
+        now_ms = time.time() * 1000
+        next_close = (now_ms // step + 1) * step
+        return min((next_close - now_ms) / 1000, self.max_ttl)
+
+    def rate_limit_status(self) -> dict:
+        return self.scheduler.status()
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    # ---- 🔹 Binance ----
+    def get_kline_rows(self, symbol="BTCUSDT", interval="1m", limit=100,
+                       start_time=None, end_time=None) -> list:
+        """
+        Raw kline rows. Range requests (start/end given) are not cached.
+        """
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        if start_time is not None:
+            params["startTime"] = int(start_time)
+        if end_time is not None:
+            params["endTime"] = int(end_time)
+        url = f"{self.binance_url}/api/v3/klines"
+
+        if start_time is not None or end_time is not None:
+            return self._request(url, params)
+        key = ("klines", symbol, interval, limit)
+        return self._cached(key, self._candle_ttl(interval), lambda: self._request(url, params))
+
+    def get_klines(self, symbol="BTCUSDT", interval="1m", limit=100) -> pd.DataFrame:
+        """
+        Latest `limit` candles as a DataFrame with Time, Open, High, Low, Close, Volume.
+        df.attrs["freshness"] says whether they were served stale.
+        """
+        key = ("klines_df", symbol, interval, limit)
+        df, freshness = self._cached_with_freshness(
+            key, self._candle_ttl(interval),
+            # straight from the exchange: a stale rows-cache hit would pass as fresh here
+            lambda: klines_to_frame(self._request(f"{self.binance_url}/api/v3/klines",
+                                                  {"symbol": symbol, "interval": interval, "limit": limit}))
+        )
+        # callers are free to mutate their copy
+        df = df.copy()
+        df.attrs["freshness"] = freshness
+        return df
+
+    def get_price(self, symbol="BTCUSDT") -> float:
+        url = f"{self.binance_url}/api/v3/ticker/price"
+        data = self._cached(
+            ("price", symbol), self.price_ttl,
+            lambda: self._request(url, {"symbol": symbol})
+        )
+        return float(data["price"])
+
+    def get_prices(self, symbols, with_freshness: bool = False):
+        """
+        {symbol: price} for many symbols in one `ticker/price?symbols=[...]` call,
+        or (prices, Freshness) with `with_freshness`.
+        """
+        symbols = sorted({s.upper() for s in symbols})
+        if not symbols:
+            return ({}, FRESH) if with_freshness else {}
+        url = f"{self.binance_url}/api/v3/ticker/price"
+        params = {"symbols": json.dumps(symbols, separators=(",", ":"))}
+        data, freshness = self._cached_with_freshness(("prices", tuple(symbols)), self.price_ttl,
+                                                      lambda: self._request(url, params))
+        prices = {d["symbol"]: float(d["price"]) for d in data}
+        return (prices, freshness) if with_freshness else prices
+
+    # ---- 🔹 CoinGecko ----
+    def get_simple_price(self, coin_id: str, vs_currency="usd") -> float:
+        url = f"{self.coingecko_url}/simple/price"
+        data = self._cached(
+            ("cg_price", coin_id, vs_currency), self.coingecko_ttl,
+            lambda: self._request(url, {"ids": coin_id, "vs_currencies": vs_currency})
+        )
+        return float(data[coin_id][vs_currency])
+
+    def get_simple_prices(self, coin_ids, vs_currency="usd", with_freshness: bool = False):
+        """
+        {coin_id: price} for many coins in one comma-joined `simple/price` call,
+        or (prices, Freshness) with `with_freshness`.
+        """
+        coin_ids = sorted(set(coin_ids))
+        if not coin_ids:
+            return ({}, FRESH) if with_freshness else {}
+        url = f"{self.coingecko_url}/simple/price"
+        params = {"ids": ",".join(coin_ids), "vs_currencies": vs_currency}
+        data, freshness = self._cached_with_freshness(("cg_prices", tuple(coin_ids), vs_currency),
+                                                      self.coingecko_ttl, lambda: self._request(url, params))
+        prices = {cid: float(v[vs_currency]) for cid, v in data.items() if vs_currency in v}
+        return (prices, freshness) if with_freshness else prices
+
+    def get_market_chart(self, coin_id="bitcoin", days=180, vs_currency="usd") -> pd.DataFrame:
+        """
+        CoinGecko price history as a DataFrame with timestamp, price
+        (df.attrs["freshness"] as in get_klines).
+        """
+        url = f"{self.coingecko_url}/coins/{coin_id}/market_chart"
+
+        def fetch():
+            data = self._request(url, {"vs_currency": vs_currency, "days": days})
+            with timer("parse", "market_chart"):
+                df = pd.DataFrame(data["prices"], columns=["timestamp", "price"])
+                df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+            return df
+
+        df, freshness = self._cached_with_freshness(("cg_chart", coin_id, days, vs_currency),
+                                                    self.coingecko_ttl, fetch)
+        df = df.copy()
+        df.attrs["freshness"] = freshness
+        return df
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> MarketDataClient:
+    """
+    Process-wide shared client, so every page and script reuses one
+    connection pool and one cache.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = MarketDataClient()
+        return _client
+
+
+def set_client(client: MarketDataClient):
+    """Swap the shared client, e.g. for one backed by a fake exchange transport."""
+    global _client
+    with _client_lock:
+        _client = client
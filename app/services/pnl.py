@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+# Columnar trade table, one row per fill, in fill order
+TRADE_DTYPES = {
+    "ts": "int64",          # ns since epoch
+    "symbol": "category",
+    "side": "int8",         # 1 = buy, -1 = sell
+    "qty": "float64",
+    "price": "float64",
+}
+
+
+def trade_table(symbol, side, qty, price, ts=None) -> pd.DataFrame:
+    """Typed trade table from column arrays (ts defaults to 0)."""
+    side = np.asarray(side)
+    if ts is None:
+        ts = np.zeros(len(side), dtype=np.int64)
+    df = pd.DataFrame({"ts": ts, "symbol": symbol, "side": side, "qty": qty, "price": price})
+    df["symbol"] = df["symbol"].astype(str).str.upper()
+    return df.astype(TRADE_DTYPES)
+
+
+# ------------------ Aggregates ------------------ #
+def mark_to_market(pos: pd.DataFrame, prices: dict) -> pd.DataFrame:
+    """
+    Add live_price, investment, market_value, unrealized_pl and total_pl to a
+    per-symbol frame (index = symbol, columns qty/avg_price/realized_pl).
+    Symbols without a price get NaN.
+    """
+    out = pos.copy()
+    out["live_price"] = pos.index.map(lambda s: prices.get(s, np.nan)).to_numpy(np.float64)
+    out["investment"] = pos["qty"].abs() * pos["avg_price"]
+    out["market_value"] = out["live_price"] * pos["qty"]
+    out["unrealized_pl"] = (out["live_price"] - pos["avg_price"]) * pos["qty"]
+    out["total_pl"] = out["unrealized_pl"] + pos["realized_pl"]
+    return out
+
+
+def trade_pnl(trades: pd.DataFrame, prices: dict) -> pd.DataFrame:
+    """
+    Live P&L of each fill taken on its own: buys gain when the price rose
+    since the fill, sells when it fell.
+    """
+    symbol = trades["symbol"]
+    live = symbol.map(prices).astype(np.float64) if len(symbol) else symbol.astype(np.float64)
+    signed = trades["side"].to_numpy(np.float64) * trades["qty"].to_numpy()
+    return pd.DataFrame({
+        "symbol": symbol.astype(str),
+        "side": trades["side"],
+        "qty": trades["qty"],
+        "price": trades["price"],
+        "live_price": live.to_numpy(),
+        "pl": (live.to_numpy() - trades["price"].to_numpy()) * signed,
+    }, index=trades.index)
+
+
+if __name__ == "__main__":
+    # render time of the Portfolio page against the size of the fill log
+    # from the repo root: PYTHONPATH=app python -m services.pnl [fills]
+    import os
+    import sys
+    import tempfile
+    import time
+
+    from streamlit.testing.v1 import AppTest
+
+    from services import ledger as ledger_module
+    from services.ledger import Ledger
+    from services.market_data import MarketDataClient, set_client
+
+    class PricedTransport:
+        """CoinGecko simple-price answers without the network: every coin at $100."""
+        def get(self, url, params=None):
+            class Response:
+                status_code, headers = 200, {}
+
+                def json(self):
+                    return {cid: {"usd": 100.0} for cid in (params or {}).get("ids", "").split(",") if cid}
+            return Response()
+
+    set_client(MarketDataClient(PricedTransport()))
+    page = os.path.join(os.path.dirname(__file__), "..", "pages", "4_Portfolio.py")
+    rng = np.random.default_rng(0)
+    symbols = np.array(["BTCUSDT", "ETHUSDT", "BTC", "ETH", "DOGE"])
+    for n in (100, int(sys.argv[1]) if len(sys.argv) > 1 else 100_000):
+        ledger = Ledger(os.path.join(tempfile.mkdtemp(), "ledger.db"))
+        ledger.record_fills(zip(rng.choice(symbols, n).tolist(), rng.choice([1, -1], n).tolist(),
+                                (rng.integers(1, 50, n) / 10).tolist(), rng.uniform(50, 150, n).tolist(),
+                                range(1, n + 1)))
+        ledger_module._ledger = ledger
+        at = AppTest.from_file(page, default_timeout=60)
+        at.run()    # warm: imports and the first price fetch
+        t = time.perf_counter()
+        at.run()
+        seconds = time.perf_counter() - t
+        errors = [e.value for e in at.exception]
+        print(f"{n:7d} fills: Portfolio render {seconds * 1000:7.1f} ms"
+              f"{'  exceptions: ' + str(errors) if errors else ''}")
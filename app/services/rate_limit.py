@@ -0,0 +1,269 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# request priorities: lower goes first
+UI = 0
+BACKGROUND = 10
+
+# weight a host allows per window, and what each endpoint costs
+HOST_LIMITS = {
+    "api.binance.com": 6000,      # X-MBX-USED-WEIGHT-1M budget
+    "api.coingecko.com": 30,      # free tier: calls per minute
+}
+DEFAULT_LIMIT = 1200
+ENDPOINT_WEIGHTS = {
+    "/api/v3/klines": 2,
+    "/api/v3/ticker/price": 2,    # 4 with ?symbols=[...]
+    "/api/v3/exchangeInfo": 20,
+}
+WEIGHT_HEADER = "x-mbx-used-weight-1m"
+# share of a host's budget background work may use; the rest is kept for the UI
+BACKGROUND_SHARE = 0.8
+RATE_LIMIT_STATUS = (429, 418)
+
+
+class RateLimited(Exception):
+    """No request slot within the caller's wait budget (host banned or out of weight)."""
+
+    def __init__(self, message, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# ---- 🔹 Priority context ----
+_local = threading.local()
+
+
+def current_priority() -> int:
+    return getattr(_local, "priority", UI)
+
+
+@contextmanager
+def request_priority(priority: int):
+    """Run requests made by this thread at `priority`, e.g. BACKGROUND for backfills."""
+    previous = current_priority()
+    _local.priority = priority
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def endpoint_weight(path: str, params=None) -> int:
+    if path == "/api/v3/ticker/price" and params and "symbols" in params:
+        return 4
+    return ENDPOINT_WEIGHTS.get(path, 1)
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0, rng=random) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt))."""
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _header(headers, name):
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+# ------------------ Limiter ------------------ #
+class WeightLimiter:
+    """
+    Request weight for one host over fixed windows (Binance counts weight
+    per calendar minute).
+
+    acquire() reserves weight before a request is sent and queues callers
+    by priority, so UI requests overtake waiting background ones; background
+    work may only use BACKGROUND_SHARE of the window. observe() syncs the
+    count with the host's used-weight header and blocks the host after a
+    429/418 until Retry-After has passed.
+    """
+
+    def __init__(self, limit: int = DEFAULT_LIMIT, window: float = 60.0,
+                 background_share: float = BACKGROUND_SHARE, clock=time.time):
+        self.limit = limit
+        self.window = window
+        self.background_share = background_share
+        self.clock = clock
+        self.used = 0
+        self.window_start = 0.0
+        self.blocked_until = 0.0
+        self.stats = {}       # endpoint -> {"requests", "weight", "limited"}
+        self._queue = []      # (priority, seq) of waiting callers
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _roll(self, now):
+        start = now // self.window * self.window
+        if start != self.window_start:
+            self.window_start, self.used = start, 0
+
+    def _delay(self, weight, priority, now) -> float:
+        """Seconds until `weight` fits at `priority` (0 = now)."""
+        self._roll(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        cap = self.limit if priority <= UI else self.limit * self.background_share
+        if self.used + weight > cap:
+            return self.window_start + self.window - now
+        return 0.0
+
+    def acquire(self, weight: int = 1, priority: int = None, timeout: float = None) -> bool:
+        """
+        Reserve `weight`, waiting behind higher-priority callers. Returns
+        False when that would take longer than `timeout` seconds.
+        """
+        priority = current_priority() if priority is None else priority
+        deadline = None if timeout is None else time.monotonic() + timeout
+        entry = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            try:
+                while True:
+                    wait = self._delay(weight, priority, self.clock()) if self._queue[0] == entry else None
+                    if wait == 0:
+                        heapq.heappop(self._queue)
+                        self.used += weight
+                        return True
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and (remaining <= 0 or (wait is not None and wait > remaining)):
+                        return False
+                    waits = [w for w in (wait, remaining) if w is not None]
+                    self._cond.wait(min(waits) if waits else None)
+            finally:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+    def observe(self, endpoint: str, weight: int, status: int, headers=None, retry_after: float = None):
+        """Account a response: header weight, per-endpoint stats, and bans on 429/418."""
+        now = self.clock()
+        with self._cond:
+            self._roll(now)
+            used = _header(headers, WEIGHT_HEADER)
+            if used is not None:
+                # the header also counts other clients on this IP
+                self.used = max(self.used, int(used))
+            s = self.stats.setdefault(endpoint, {"requests": 0, "weight": 0, "limited": 0})
+            s["requests"] += 1
+            s["weight"] += weight
+            if status in RATE_LIMIT_STATUS:
+                s["limited"] += 1
+                self.blocked_until = max(self.blocked_until, now + (retry_after or 0))
+            self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            now = self.clock()
+            self._roll(now)
+            return {"limit": self.limit, "used": self.used, "blocked_for": max(self.blocked_until - now, 0.0),
+                    "waiting": len(self._queue), "endpoints": {k: dict(v) for k, v in self.stats.items()}}
+
+
+# ------------------ Scheduler ------------------ #
+class RequestScheduler:
+    """
+    Sends GETs through per-host WeightLimiters with retries.
+
+    429/418 block the host for Retry-After (jittered backoff when the header
+    is missing); 5xx and connection errors are retried with jittered
+    exponential backoff. UI requests give up after `ui_timeout` seconds of
+    waiting so pages can fall back to cached data; background requests
+    wait as long as needed.
+    """
+
+    def __init__(self, limits: dict = None, max_retries: int = 4, base_delay: float = 0.5,
+                 max_delay: float = 30.0, ui_timeout: float = 5.0, clock=time.time,
+                 sleep=time.sleep, rng=random):
+        self.limits = {**HOST_LIMITS, **(limits or {})}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.ui_timeout = ui_timeout
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, host: str) -> WeightLimiter:
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = WeightLimiter(self.limits.get(host, DEFAULT_LIMIT),
+                                                               clock=self.clock)
+            return limiter
+
+    def _backoff(self, attempt):
+        return backoff_delay(attempt, self.base_delay, self.max_delay, self.rng)
+
+    def send(self, get, url: str, params=None, priority: int = None):
+        """
+        `get(url, params)` under the host's limits. Returns the response
+        (possibly a final 429/418/5xx after retries); raises RateLimited when
+        no slot is free within the wait budget.
+        """
+        parts = urlparse(url)
+        limiter = self.limiter(parts.netloc)
+        weight = endpoint_weight(parts.path, params)
+        priority = current_priority() if priority is None else priority
+        timeout = self.ui_timeout if priority <= UI else None
+
+        for attempt in range(self.max_retries + 1):
+            if not limiter.acquire(weight, priority, timeout):
+                blocked = limiter.snapshot()["blocked_for"]
+                raise RateLimited(f"{parts.netloc} is rate limited", retry_after=blocked or None)
+            try:
+                resp = get(url, params)
+            except OSError:
+                # requests' connection errors are OSErrors
+                if attempt == self.max_retries:
+                    raise
+                self.sleep(self._backoff(attempt))
+                continue
+
+            status = resp.status_code
+            retry_after = None
+            if status in RATE_LIMIT_STATUS:
+                header = _header(resp.headers, "retry-after")
+                retry_after = float(header) if header else self._backoff(attempt)
+            limiter.observe(parts.path, weight, status, resp.headers, retry_after)
+            if attempt == self.max_retries:
+                return resp
+            if status in RATE_LIMIT_STATUS:
+                # the limiter holds the next acquire until the ban ends
+                continue
+            if status >= 500:
+                self.sleep(self._backoff(attempt))
+                continue
+            return resp
+        return resp
+
+    def status(self) -> dict:
+        """{host: limiter snapshot} for status displays."""
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {host: limiter.snapshot() for host, limiter in limiters.items()}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """
+    Process-wide scheduler, so every client (and every fetcher on top of
+    one) draws from a single weight budget per host.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
@@ -0,0 +1,321 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from services.candle_store import CandleStore
+from services.market_data import INTERVAL_MS
+from services.stream import CANDLE_FIELDS, CandleRing, get_candles, get_stream
+
+BASE_INTERVAL = "1m"
+DERIVED_INTERVALS = ["5m", "15m", "1h", "4h", "1d"]
+# volumes are summed as integers in these units (Binance quotes 8 decimals),
+# so derived volumes equal the exchange's decimal sums exactly
+VOLUME_SCALE = 10 ** 8
+
+
+def _volume_units(v):
+    return np.rint(np.asarray(v, dtype=np.float64) * VOLUME_SCALE).astype(np.int64)
+
+
+# ------------------ Batch ------------------ #
+def resample(rows: np.ndarray, interval: str) -> np.ndarray:
+    """
+    Aggregate 1m candles (n, 6: open_time, Open, High, Low, Close, Volume),
+    sorted by open_time, into `interval` bars aligned to the epoch like the
+    exchange's (UTC midnight for 1d). One np.reduceat per column, O(n).
+    The last bar is partial if its bucket is not over yet.
+    """
+    rows = np.asarray(rows, dtype=np.float64)
+    if len(rows) == 0:
+        return np.empty((0, len(CANDLE_FIELDS)))
+    step = INTERVAL_MS[interval]
+    bucket = rows[:, 0].astype(np.int64) // step * step
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(rows)] - 1
+    out = np.empty((len(starts), len(CANDLE_FIELDS)))
+    out[:, 0] = bucket[starts]
+    out[:, 1] = rows[starts, 1]
+    out[:, 2] = np.maximum.reduceat(rows[:, 2], starts)
+    out[:, 3] = np.minimum.reduceat(rows[:, 3], starts)
+    out[:, 4] = rows[ends, 4]
+    out[:, 5] = np.add.reduceat(_volume_units(rows[:, 5]), starts) / VOLUME_SCALE
+    return out
+
+
+def complete_buckets(rows: np.ndarray, interval: str) -> np.ndarray:
+    """
+    Boolean mask over resample(rows, interval): True where the bar's bucket
+    holds every one of its 1m candles. Bars built over a gap in the 1m
+    data (missing minutes) are False.
+    """
+    rows = np.asarray(rows, dtype=np.float64)
+    if len(rows) == 0:
+        return np.zeros(0, dtype=bool)
+    step = INTERVAL_MS[interval]
+    _, counts = np.unique(rows[:, 0].astype(np.int64) // step, return_counts=True)
+    return counts == step // INTERVAL_MS[BASE_INTERVAL]
+
+
+def gaps(rows: np.ndarray) -> list:
+    """[(first_missing_open, last_missing_open), ...] between consecutive sorted 1m rows."""
+    step = INTERVAL_MS[BASE_INTERVAL]
+    times = np.asarray(rows, dtype=np.float64).reshape(-1, len(CANDLE_FIELDS))[:, 0].astype(np.int64)
+    return [(int(times[i]) + step, int(times[i + 1]) - step) for i in np.flatnonzero(np.diff(times) > step)]
+
+
+# ------------------ Incremental ------------------ #
+class Resampler:
+    """
+    Derived-timeframe bars for one symbol, kept current from 1m updates.
+
+    Each interval keeps the aggregate of the finished minutes of its
+    current bar plus the latest (possibly in-progress) minute, so a 1m
+    update is O(1) per interval. Bars go into a CandleRing, the in-progress
+    bar being overwritten in place until its bucket ends.
+    """
+
+    def __init__(self, intervals=None, size: int = 500):
+        self.intervals = list(intervals or DERIVED_INTERVALS)
+        self.size = size
+        self.rings = {i: CandleRing(size) for i in self.intervals}
+        self._state = {i: None for i in self.intervals}
+        self._lock = threading.Lock()
+
+    def seed(self, rows: np.ndarray):
+        """
+        Bulk-load sorted 1m history: closed bars in batch, the open bar
+        replayed. Buckets with missing minutes are left out; an incomplete
+        open bucket is skipped until the next one starts.
+        """
+        rows = np.asarray(rows, dtype=np.float64)
+        if len(rows) == 0:
+            return self
+        with self._lock:
+            for interval in self.intervals:
+                step = INTERVAL_MS[interval]
+                current = int(rows[-1, 0]) // step * step
+                first_open = np.searchsorted(rows[:, 0], current)
+                oldest = np.searchsorted(rows[:, 0], current - self.size * step)
+                closed = rows[oldest:first_open]
+                self.rings[interval].extend(map(tuple, resample(closed, interval)[complete_buckets(closed, interval)]))
+                current_rows = rows[first_open:]
+                if current_rows[0, 0] != current or gaps(current_rows):
+                    self._state[interval] = {"bucket": current, "minute": None, "incomplete": True}
+                    continue
+                for row in current_rows:
+                    self._update(interval, row)
+        return self
+
+    def update(self, row):
+        """Apply one 1m candle (new or an update of the in-progress minute)."""
+        with self._lock:
+            for interval in self.intervals:
+                self._update(interval, row)
+
+    def _update(self, interval, row):
+        t, o, h, l, c, v = (float(x) for x in row[:6])
+        step = INTERVAL_MS[interval]
+        bucket = int(t) // step * step
+        st = self._state[interval]
+        if st is not None and (bucket < st["bucket"] or (bucket == st["bucket"] and st.get("incomplete"))):
+            return
+        if st is None or bucket > st["bucket"]:
+            st = self._state[interval] = {"bucket": bucket, "open": o, "high": -np.inf, "low": np.inf,
+                                          "volume": 0, "minute": None}
+        elif st["minute"] is not None and t > st["minute"][0]:
+            # previous minute finished: fold it into the bar
+            _, _, mh, ml, _, mv = st["minute"]
+            st["high"] = max(st["high"], mh)
+            st["low"] = min(st["low"], ml)
+            st["volume"] += int(_volume_units(mv))
+        elif st["minute"] is not None and t < st["minute"][0]:
+            return
+        st["minute"] = (t, o, h, l, c, v)
+        self.rings[interval].update((
+            float(bucket), st["open"], max(st["high"], h), min(st["low"], l), c,
+            (st["volume"] + int(_volume_units(v))) / VOLUME_SCALE,
+        ))
+
+    def bars(self, interval) -> np.ndarray:
+        return self.rings[interval].view()
+
+    def frame(self, interval, limit=None) -> pd.DataFrame:
+        # a copy: the ring's live view changes under frames handed to pages and models
+        arr = self.rings[interval].snapshot(limit)
+        df = pd.DataFrame(arr[:, 1:], columns=CANDLE_FIELDS[1:], copy=False)
+        df.insert(0, "Time", pd.to_datetime(arr[:, 0].astype("int64"), unit="ms"))
+        return df
+
+
+class ResampleHub:
+    """
+    One Resampler per symbol, seeded from the candle store plus the live 1m
+    ring and then fed by the stream's 1m listener. Minutes missing between
+    the two (or inside the stored range) are synced into the store first;
+    whatever cannot be fetched leaves its buckets out rather than building
+    bars from part of their minutes.
+    """
+
+    def __init__(self, stream=None, store=None, seed_days: float = 35, size: int = 500):
+        self.stream = stream
+        self.store = store
+        self.seed_days = seed_days
+        self.size = size
+        self._resamplers = {}
+        self._lock = threading.Lock()
+        if stream is not None:
+            stream.add_listener(self._on_kline)
+
+    def _on_kline(self, symbol, interval, row):
+        if interval == BASE_INTERVAL:
+            r = self._resamplers.get(symbol.upper())
+            if r is not None:
+                r.update(row)
+
+    def _stored(self, symbol, start) -> np.ndarray:
+        df = self.store.load(symbol, BASE_INTERVAL, start=start)
+        return df[CANDLE_FIELDS].to_numpy(np.float64)
+
+    def _history(self, symbol) -> np.ndarray:
+        empty = np.empty((0, len(CANDLE_FIELDS)))
+        live = empty
+        if self.stream is not None:
+            ring = self.stream.rings.get((symbol, BASE_INTERVAL))
+            live = ring.snapshot() if ring is not None else empty
+        stored = empty
+        if self.store is not None:
+            end = self.store.open_times(symbol, BASE_INTERVAL)[-1:]
+            if end.size:
+                start = int(end[0]) - int(self.seed_days * 86_400_000)
+                stored = self._stored(symbol, start)
+                # the stored range must run into the live ring without holes
+                until = int(live[0, 0]) - INTERVAL_MS[BASE_INTERVAL] if len(live) else int(end[0])
+                if len(stored) and (gaps(stored) or until > int(end[0])):
+                    try:
+                        # from the first stored minute: filling holes, not extending history back
+                        self.store.sync(symbol, BASE_INTERVAL, start=int(stored[0, 0]), end=until)
+                        stored = self._stored(symbol, start)
+                    except Exception:
+                        # offline: the buckets over the gap are dropped in seed()
+                        pass
+        if len(stored) and len(live):
+            live = live[live[:, 0] > stored[-1, 0]]
+        return np.vstack([stored, live])
+
+    def get(self, symbol) -> Resampler:
+        symbol = symbol.upper()
+        with self._lock:
+            r = self._resamplers.get(symbol)
+            if r is None:
+                r = Resampler(size=self.size).seed(self._history(symbol))
+                self._resamplers[symbol] = r
+            return r
+
+    def frame(self, symbol, interval, limit=None) -> pd.DataFrame:
+        return self.get(symbol).frame(interval, limit)
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_resample_hub() -> ResampleHub:
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = ResampleHub(get_stream(), CandleStore())
+        return _hub
+
+
+def get_bars(symbol, interval, limit=100) -> pd.DataFrame:
+    """
+    Bars for `interval` derived locally from 1m data when enough history is
+    held, otherwise the live stream / REST candles.
+    """
+    if interval in DERIVED_INTERVALS:
+        df = get_resample_hub().frame(symbol, interval, limit)
+        if len(df) >= limit:
+            return df
+    return get_candles(symbol, interval, limit)
+
+
+# ------------------ Verification ------------------ #
+def verify(minute_rows: np.ndarray, exchange_rows: np.ndarray, interval: str) -> dict:
+    """
+    Compare resampled 1m data with exchange `interval` bars on every closed
+    bar both cover. Returns counts and the open times of mismatches.
+    """
+    minute_rows = np.asarray(minute_rows, dtype=np.float64)
+    exchange_rows = np.asarray(exchange_rows, dtype=np.float64)[:, :6]
+    ours = resample(minute_rows, interval)[complete_buckets(minute_rows, interval)]
+    step = INTERVAL_MS[interval]
+    common, i, j = np.intersect1d(ours[:, 0], exchange_rows[:, 0], return_indices=True)
+    equal = (ours[i] == exchange_rows[j]).all(axis=1)
+    return {"interval": interval, "step_ms": step, "compared": int(len(common)),
+            "identical": int(equal.sum()), "mismatches": common[~equal].astype(np.int64).tolist()}
+
+
+def fetch_rows(client, symbol, interval, start, end) -> np.ndarray:
+    """Exchange klines with open time in [start, end) as (n, 6) rows, paged 1000 at a time."""
+    rows, cursor = [], start
+    while cursor < end:
+        page = client.get_kline_rows(symbol, interval, 1000, start_time=cursor, end_time=end - 1)
+        if not page:
+            break
+        rows += page
+        cursor = int(page[-1][0]) + INTERVAL_MS[interval]
+    return np.array([[float(x) for x in r[:6]] for r in rows]).reshape(-1, len(CANDLE_FIELDS))
+
+
+def record_exchange_bars(client, folder, symbol, start, end) -> dict:
+    """
+    Save the exchange's DERIVED_INTERVALS klines over [start, end) as
+    <folder>/<symbol>_<interval>.csv (the fixtures tests/test_resample.py
+    compares resample() with). Returns {interval: rows written}.
+    """
+    os.makedirs(folder, exist_ok=True)
+    written = {}
+    for interval in DERIVED_INTERVALS:
+        step = INTERVAL_MS[interval]
+        rows = fetch_rows(client, symbol, interval, start // step * step, end)
+        df = pd.DataFrame(rows, columns=CANDLE_FIELDS).astype({"open_time": "int64"})
+        df.to_csv(os.path.join(folder, f"{symbol}_{interval}.csv"), index=False)
+        written[interval] = len(df)
+    return written
+
+
+if __name__ == "__main__":
+    # from the repo root: PYTHONPATH=app python -m services.resample [symbol] [days]
+    # or, to record the exchange bars over app/data/BTCUSDT_1m.csv for the tests:
+    #   PYTHONPATH=app python -m services.resample --record tests/fixtures/exchange
+    import sys
+    import time
+
+    from services.market_data import get_client
+
+    client = get_client()
+    if sys.argv[1:2] == ["--record"]:
+        recorded = pd.read_csv(os.path.join(os.path.dirname(__file__), "..", "data", "BTCUSDT_1m.csv"))
+        times = pd.to_datetime(recorded["Open_time"]).to_numpy().astype("datetime64[ms]").astype("int64")
+        print(record_exchange_bars(client, sys.argv[2], "BTCUSDT", int(times[0]),
+                                   int(times[-1]) + INTERVAL_MS[BASE_INTERVAL]))
+        sys.exit()
+
+    symbol = sys.argv[1] if len(sys.argv) > 1 else "BTCUSDT"
+    days = float(sys.argv[2]) if len(sys.argv) > 2 else 2
+    end = int(time.time() * 1000) // 86_400_000 * 86_400_000
+    start = end - int(days * 86_400_000)
+
+    minutes = fetch_rows(client, symbol, BASE_INTERVAL, start, end)
+    for interval in DERIVED_INTERVALS:
+        print(verify(minutes, fetch_rows(client, symbol, interval, start, end), interval))
+
+    # incremental == batch, bar for bar
+    r = Resampler(size=len(minutes))
+    for row in minutes:
+        r.update(row)
+    for interval in DERIVED_INTERVALS:
+        same = np.array_equal(r.bars(interval), resample(minutes, interval))
+        print(f"incremental {interval}: {'identical' if same else 'DIFFERENT'}")
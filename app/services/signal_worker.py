@@ -0,0 +1,467 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from services.market_data import INTERVAL_MS
+from utils.metrics import get_metrics
+
+DEFAULT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "signals.db"))
+
+# Binance pairs scored with their LightGBM model on every candle close
+DEFAULT_SYMBOLS = ["BTCUSDT", "ETHUSDT"]
+DEFAULT_INTERVALS = ["1m", "5m", "15m", "1h"]
+# CoinGecko histories scored with the RF and LSTM models, as the pages fetch them
+DEFAULT_COINS = ["bitcoin", "ethereum"]
+DEFAULT_DAYS = 180
+COIN_INTERVAL = "1h"
+# candles fed to the feature engine per pair
+LOOKBACK = 100
+# seconds after a candle closes before scoring it (the exchange's final kline arrives late)
+CLOSE_GRACE = 3.0
+# rows older than this are dropped from the history
+KEEP_SECONDS = 7 * 86_400
+# a worker that has not reported for this long counts as gone
+HEARTBEAT_TIMEOUT = 120.0
+
+STAGES = ["fetch", "features", "load", "predict", "store"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    symbol      TEXT    NOT NULL,     -- Binance pair or CoinGecko coin id
+    interval    TEXT    NOT NULL,     -- candle interval, or "<days>d" for coin histories
+    model       TEXT    NOT NULL,     -- lgbm / rf / lstm
+    candle_time INTEGER NOT NULL,     -- ms, open time of the last closed candle scored
+    computed_at INTEGER NOT NULL,     -- ms since epoch
+    signal      TEXT    NOT NULL,     -- BUY / SELL / HOLD
+    confidence  REAL,
+    value       REAL,                 -- predicted close, UP probability or LSTM output
+    last_price  REAL,
+    detail      TEXT,                 -- JSON: model version, accuracy, stage timings (ms)
+    PRIMARY KEY (symbol, interval, model, candle_time)
+);
+CREATE TABLE IF NOT EXISTS latest (
+    symbol      TEXT NOT NULL,
+    interval    TEXT NOT NULL,
+    model       TEXT NOT NULL,
+    candle_time INTEGER NOT NULL,
+    computed_at INTEGER NOT NULL,
+    signal      TEXT NOT NULL,
+    confidence  REAL,
+    value       REAL,
+    last_price  REAL,
+    detail      TEXT,
+    PRIMARY KEY (symbol, interval, model)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS workers (
+    name    TEXT PRIMARY KEY,
+    pid     INTEGER NOT NULL,
+    updated INTEGER NOT NULL,         -- ms since epoch
+    info    TEXT
+);
+"""
+
+COLUMNS = ["symbol", "interval", "model", "candle_time", "computed_at", "signal",
+           "confidence", "value", "last_price", "detail"]
+
+
+class SignalStore:
+    """
+    Precomputed signals in SQLite (WAL mode), shared across processes.
+
+    `signals` keeps the history, `latest` one row per (symbol, interval,
+    model), so a page read is a single primary-key lookup. `workers` holds
+    each worker's heartbeat.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    # ---- 🔹 Writes ----
+    def write(self, rows):
+        """Append signal rows (dicts with COLUMNS; detail as a dict) to the history and latest tables."""
+        values = [tuple(json.dumps(r.get("detail") or {}) if c == "detail" else r.get(c) for c in COLUMNS)
+                  for r in rows]
+        if not values:
+            return
+        marks = ", ".join("?" * len(COLUMNS))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(f"INSERT OR REPLACE INTO signals VALUES ({marks})", values)
+            self._conn.executemany(f"INSERT OR REPLACE INTO latest VALUES ({marks})", values)
+            self._conn.execute("COMMIT")
+
+    def prune(self, keep_seconds: float = KEEP_SECONDS):
+        with self._lock:
+            self._conn.execute("DELETE FROM signals WHERE computed_at < ?",
+                               (int((time.time() - keep_seconds) * 1000),))
+
+    def heartbeat(self, name: str, info: dict = None):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO workers VALUES (?, ?, ?, ?)",
+                               (name, os.getpid(), int(time.time() * 1000), json.dumps(info or {})))
+
+    # ---- 🔹 Reads ----
+    def _row(self, row) -> dict:
+        out = dict(zip(COLUMNS, row))
+        out["detail"] = json.loads(out["detail"]) if out["detail"] else {}
+        return out
+
+    def latest(self, symbol: str, interval: str, model: str, max_age: float = None) -> dict:
+        """Newest signal for the key, or None (also when older than `max_age` seconds)."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM latest WHERE symbol = ? AND interval = ? AND model = ?",
+                                     (symbol, interval, model)).fetchone()
+        if row is None:
+            return None
+        row = self._row(row)
+        if max_age is not None and time.time() * 1000 - row["computed_at"] > max_age * 1000:
+            return None
+        return row
+
+    def latest_all(self) -> pd.DataFrame:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM latest ORDER BY model, symbol, interval").fetchall()
+        return pd.DataFrame([self._row(r) for r in rows], columns=COLUMNS)
+
+    def history(self, symbol: str, interval: str, model: str, limit: int = 500) -> pd.DataFrame:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM signals WHERE symbol = ? AND interval = ? AND model = ? "
+                "ORDER BY candle_time DESC LIMIT ?", (symbol, interval, model, int(limit))).fetchall()
+        return pd.DataFrame([self._row(r) for r in reversed(rows)], columns=COLUMNS)
+
+    def worker_status(self) -> dict:
+        """{name: {pid, age (s), info}} for every worker that has reported."""
+        with self._lock:
+            rows = self._conn.execute("SELECT name, pid, updated, info FROM workers").fetchall()
+        now = time.time() * 1000
+        return {name: {"pid": pid, "age": (now - updated) / 1000, "info": json.loads(info or "{}")}
+                for name, pid, updated, info in rows}
+
+    def worker_alive(self, timeout: float = HEARTBEAT_TIMEOUT) -> bool:
+        return any(w["age"] <= timeout for w in self.worker_status().values())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_signal_store() -> SignalStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SignalStore()
+        return _store
+
+
+def signal_max_age(interval: str) -> float:
+    """How old (seconds) a stored signal may be and still describe the latest closed candle."""
+    return INTERVAL_MS[interval] / 1000 + CLOSE_GRACE + 60
+
+
+# ------------------ Worker ------------------ #
+@contextmanager
+def _stage(timings: dict, name: str):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t
+        timings[name] = timings.get(name, 0.0) + seconds * 1000
+        get_metrics().observe(name, "signal_worker", seconds)
+
+
+class SignalWorker:
+    """
+    Background worker that scores the whole watchlist whenever a candle
+    closes and writes the signals to a SignalStore for the pages.
+
+    - every (symbol, interval) pair: LightGBM next close from the pair's
+      current model (models.pipeline manifest), all symbols of an interval
+      in one batch
+    - every CoinGecko coin history (the one the RF and LSTM pages load):
+      RF direction through the training manager's artifact, and the shared
+      LSTM for all coins in one batched call, on every COIN_INTERVAL close
+    Each batch records per-stage timings (fetch, features, load, predict,
+    store) in ms; `timings()` summarises them and every row carries its own.
+    """
+
+    def __init__(self, symbols=None, intervals=None, coins=None, days: int = DEFAULT_DAYS,
+                 store: SignalStore = None, bars=None, grace: float = CLOSE_GRACE, name: str = None):
+        self.symbols = [s.upper() for s in (symbols or DEFAULT_SYMBOLS)]
+        self.intervals = list(intervals or DEFAULT_INTERVALS)
+        self.coins = list(DEFAULT_COINS if coins is None else coins)
+        self.days = days
+        self.store = store or get_signal_store()
+        self.bars = bars
+        self.grace = grace
+        self.name = name or f"signals-{os.getpid()}"
+        self.runs = 0
+        self.errors = {}            # feed -> last error text
+        self._timings = {stage: deque(maxlen=512) for stage in STAGES}
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- 🔹 Lifecycle ----
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="signal-worker", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+
+    def next_close(self, now_ms: float):
+        """(ms of the next candle close across all feeds, intervals closing then)."""
+        intervals = set(self.intervals) | ({COIN_INTERVAL} if self.coins else set())
+        due = min(int(now_ms // INTERVAL_MS[i] + 1) * INTERVAL_MS[i] for i in intervals)
+        return due, sorted(i for i in intervals if due % INTERVAL_MS[i] == 0)
+
+    def _run(self):
+        # everything once at start, then whatever closed at each boundary
+        closing = None
+        while not self._stop.is_set():
+            self.run_once(closing)
+            due, closing = self.next_close(time.time() * 1000)
+            if self._stop.wait(max(due / 1000 - time.time(), 0) + self.grace):
+                break
+
+    # ---- 🔹 Scoring ----
+    def run_once(self, intervals=None) -> list:
+        """Score the feeds whose candles closed (all of them by default) and store the rows."""
+        from services.rate_limit import BACKGROUND, request_priority
+
+        intervals = self.intervals + [COIN_INTERVAL] if intervals is None else list(intervals)
+        now_ms = time.time() * 1000
+        rows = []
+        with request_priority(BACKGROUND):
+            for interval in self.intervals:
+                if interval in intervals:
+                    rows += self._guard(f"lgbm/{interval}", self._score_pairs, interval, now_ms)
+            if self.coins and COIN_INTERVAL in intervals:
+                rows += self._guard("coins", self._score_coins)
+        timings = {}
+        with _stage(timings, "store"):
+            self.store.write(rows)
+        self._timings["store"].append(timings["store"])
+        self.runs += 1
+        self.store.heartbeat(self.name, {"runs": self.runs, "rows": len(rows), "errors": self.errors})
+        if self.runs % 100 == 1:
+            self.store.prune()
+        return rows
+
+    def _guard(self, feed, fn, *args):
+        try:
+            rows = fn(*args)
+        except Exception as e:
+            # one failing feed (e.g. exchange offline) must not stop the rest
+            self.errors[feed] = str(e)
+            return []
+        self.errors.pop(feed, None)
+        return rows
+
+    def _record(self, timings: dict):
+        for stage, ms in timings.items():
+            self._timings[stage].append(ms)
+
+    def _score_pairs(self, interval: str, now_ms: float) -> list:
+        from models.export import load_predictor
+        from models.features import LGB_FEATURES, lgb_features
+        from models.pipeline import manifest_entry, model_path_for
+        from models.price_predictor import signal_from_prediction
+
+        bars = self.bars
+        if bars is None:
+            from services.resample import get_bars as bars
+        step = INTERVAL_MS[interval]
+        timings = {}
+        with _stage(timings, "fetch"):
+            closed = {}
+            for symbol in self.symbols:
+                df = bars(symbol, interval, LOOKBACK + 1)
+                open_ms = df["Time"].to_numpy("datetime64[ms]").astype("int64")
+                # the candle still in progress is not scored
+                keep = open_ms + step <= now_ms
+                if keep.any():
+                    closed[symbol] = (df[keep], int(open_ms[keep][-1]))
+        with _stage(timings, "features"):
+            X = {s: lgb_features(df["Close"].to_numpy(float), df["Volume"].to_numpy(float))[-1]
+                 for s, (df, _) in closed.items()}
+            X = {s: row for s, row in X.items() if not np.isnan(row).any()}
+        with _stage(timings, "load"):
+            paths = {s: model_path_for(s, interval) for s in X}
+            models = {path: load_predictor(path) for path in set(paths.values())}
+        with _stage(timings, "predict"):
+            predicted = {}
+            for path, model in models.items():
+                group = [s for s in X if paths[s] == path]
+                out = model.predict(pd.DataFrame(np.vstack([X[s] for s in group]), columns=LGB_FEATURES))
+                predicted.update(zip(group, np.asarray(out, dtype=float)))
+        self._record(timings)
+
+        rows = []
+        computed_at = int(time.time() * 1000)
+        for symbol, next_price in predicted.items():
+            df, candle_time = closed[symbol]
+            last_close = float(df["Close"].iloc[-1])
+            signal, confidence = signal_from_prediction(last_close, next_price)
+            entry = manifest_entry(symbol, interval) or {}
+            rows.append({"symbol": symbol, "interval": interval, "model": "lgbm", "candle_time": candle_time,
+                         "computed_at": computed_at, "signal": signal, "confidence": confidence,
+                         "value": float(next_price), "last_price": last_close,
+                         "detail": {"model_version": entry.get("version"), "timings": timings}})
+        return rows
+
+    def _score_coins(self) -> list:
+        from models.classifier import predict_direction, signal_from_direction, with_rf_features
+        from models.features import RF_FEATURES
+        from models.lstm_infer import shared_lstm_predictor, signal_from_output
+        from models.sweep import load_best_params
+        from services.market_data import get_client
+        from services.training_jobs import get_training_manager
+
+        interval = f"{self.days}d"
+        fetch = {}
+        with _stage(fetch, "fetch"):
+            charts = {coin: get_client().get_market_chart(coin, self.days) for coin in self.coins}
+        self._record(fetch)
+        computed_at = int(time.time() * 1000)
+        rows = []
+
+        # RF: the artifact the AI Model page trains for the same data (trained/updated in the background on a miss)
+        params = load_best_params("rf")
+        timings = dict(fetch)
+        with _stage(timings, "features"):
+            frames = {coin: with_rf_features(chart) for coin, chart in charts.items()}
+        with _stage(timings, "load"):
+            artifacts = {coin: get_training_manager().request(
+                "rf", df, {"n_estimators": int(params["n_estimators"]), "random_state": 42},
+                name=f"{coin}-{self.days}")[0] for coin, df in frames.items()}
+        with _stage(timings, "predict"):
+            scored = {}
+            for coin, artifact in artifacts.items():
+                if artifact is not None and len(frames[coin]):
+                    direction, probability = predict_direction(artifact["model"],
+                                                               frames[coin][RF_FEATURES].iloc[-1:].values)
+                    scored[coin] = (direction[0], float(probability[0]), artifact["accuracy"])
+        self._record({k: v for k, v in timings.items() if k != "fetch"})
+        for coin, (direction, probability, accuracy) in scored.items():
+            signal, confidence = signal_from_direction(direction, probability, params["confidence"])
+            df = frames[coin]
+            rows.append({"symbol": coin, "interval": interval, "model": "rf",
+                         "candle_time": int(df["timestamp"].iloc[-1].value // 1_000_000),
+                         "computed_at": computed_at, "signal": signal, "confidence": confidence,
+                         "value": probability if direction == 1 else 1 - probability,
+                         "last_price": float(df["price"].iloc[-1]),
+                         "detail": {"accuracy": accuracy, "timings": timings}})
+
+        # LSTM: the offline-trained shared model, all coins in one batch
+        threshold = load_best_params("lstm")["threshold"]
+        timings = dict(fetch)
+        with _stage(timings, "load"):
+            shared = shared_lstm_predictor()
+        if shared is not None:
+            with _stage(timings, "predict"):
+                outputs = shared.predict_signals({coin: chart["price"].to_numpy() for coin, chart in charts.items()
+                                                  if len(chart) >= shared.window_size})
+            self._record({k: v for k, v in timings.items() if k != "fetch"})
+            for coin, value in outputs.items():
+                chart = charts[coin]
+                rows.append({"symbol": coin, "interval": interval, "model": "lstm",
+                             "candle_time": int(chart["timestamp"].iloc[-1].value // 1_000_000),
+                             "computed_at": computed_at, "signal": signal_from_output(value, threshold),
+                             "confidence": abs(value) * 100, "value": value,
+                             "last_price": float(chart["price"].iloc[-1]),
+                             "detail": {"accuracy": shared.accuracy, "timings": timings}})
+        return rows
+
+    # ---- 🔹 Stats ----
+    def timings(self) -> dict:
+        """{stage: {count, last_ms, mean_ms, max_ms}} over the recent batches."""
+        out = {}
+        for stage, values in self._timings.items():
+            if values:
+                v = np.fromiter(values, float)
+                out[stage] = {"count": len(v), "last_ms": round(float(v[-1]), 3),
+                              "mean_ms": round(float(v.mean()), 3), "max_ms": round(float(v.max()), 3)}
+        return out
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_signal_worker() -> SignalWorker:
+    """In-process worker, started on first use."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = SignalWorker().start()
+        return _worker
+
+
+def ensure_signal_worker(store: SignalStore = None):
+    """
+    Start the in-process worker unless one (this process or a standalone
+    `python -m services.signal_worker`) has reported recently.
+    """
+    store = store or get_signal_store()
+    if _worker is None and not store.worker_alive():
+        get_signal_worker()
+
+
+if __name__ == "__main__":
+    # standalone worker, from the repo root: PYTHONPATH=app python -m services.signal_worker [--once]
+    import sys
+
+    from services.signal_worker import SignalWorker, get_signal_store
+
+    worker = SignalWorker()
+    if "--once" in sys.argv:
+        rows = worker.run_once()
+        for row in rows:
+            print(f"{row['symbol']:9s} {row['interval']:5s} {row['model']:5s} {row['signal']:4s} "
+                  f"{row['confidence']:7.3f}%  value {row['value']:.4f}")
+        for feed, error in worker.errors.items():
+            print(f"{feed}: {error}")
+        print(json.dumps(worker.timings(), indent=2))
+        store = get_signal_store()
+        key = (rows[0]["symbol"], rows[0]["interval"], rows[0]["model"]) if rows else ("BTCUSDT", "1m", "lgbm")
+        t = time.perf_counter()
+        for _ in range(10_000):
+            store.latest(*key)
+        print(f"page read (latest): {(time.perf_counter() - t) / 10_000 * 1e6:.1f} us")
+    else:
+        worker.start()
+        seen = 0
+        try:
+            while True:
+                time.sleep(1)
+                if worker.runs != seen:
+                    seen = worker.runs
+                    stats = ", ".join(f"{k} {v['last_ms']:.1f}" for k, v in worker.timings().items())
+                    print(f"[{time.strftime('%H:%M:%S')}] run {seen}: {stats} ms"
+                          + (f"  errors: {worker.errors}" if worker.errors else ""))
+        except KeyboardInterrupt:
+            worker.stop()
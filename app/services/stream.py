@@ -0,0 +1,286 @@
+import json
+import random
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.market_data import INTERVAL_MS, get_client
+from services.rate_limit import BACKGROUND, request_priority
+
+WS_URL = "wss://stream.binance.com:9443/stream"
+DEFAULT_SYMBOLS = ["BTCUSDT", "ETHUSDT", "BNBUSDT"]
+DEFAULT_INTERVALS = ["1m", "5m", "15m", "1h", "4h", "1d"]
+
+# column order of every ring buffer row
+CANDLE_FIELDS = ["open_time", "Open", "High", "Low", "Close", "Volume"]
+
+
+class CandleRing:
+    """
+    Fixed-size buffer of the last `size` candles for one (symbol, interval).
+
+    Every row is written twice, at i and i + size, so the latest window is
+    always one contiguous slice and `view()` never has to copy. A view is
+    live: an in-progress update rewrites its last row, and once the ring
+    is full every append overwrites rows of views already handed out.
+    Anything kept beyond the current statement should use `snapshot()`.
+    """
+
+    def __init__(self, size: int = 500):
+        self.size = size
+        self._buf = np.full((2 * size, len(CANDLE_FIELDS)), np.nan)
+        self._next = 0       # slot the next new candle goes to
+        self._count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def last_open_time(self):
+        if self._count == 0:
+            return None
+        return int(self._buf[(self._next - 1) % self.size, 0])
+
+    def __len__(self):
+        return min(self._count, self.size)
+
+    def _write(self, slot, row):
+        self._buf[slot] = row
+        self._buf[slot + self.size] = row
+
+    def update(self, row):
+        """
+        Append a candle, or overwrite the last one if it has the same open
+        time (in-progress candle). Older candles are ignored.
+        """
+        with self._lock:
+            last = self.last_open_time
+            if last is not None and row[0] < last:
+                return
+            if last is not None and row[0] == last:
+                self._write((self._next - 1) % self.size, row)
+                return
+            self._write(self._next, row)
+            self._next = (self._next + 1) % self.size
+            self._count += 1
+
+    def extend(self, rows):
+        for row in rows:
+            self.update(row)
+
+    def view(self) -> np.ndarray:
+        """Read-only (n, 6) live view of the stored candles, oldest first."""
+        n = len(self)
+        end = self._next + self.size
+        out = self._buf[end - n:end]
+        out.flags.writeable = False
+        return out
+
+    def snapshot(self, limit: int = None) -> np.ndarray:
+        """Copy of the last `limit` (default all) candles, taken under the ring lock."""
+        with self._lock:
+            n = len(self) if limit is None else min(limit, len(self))
+            end = self._next + self.size
+            return self._buf[end - n:end].copy()
+
+
+def _kline_row(k) -> tuple:
+    return (float(k["t"]), float(k["o"]), float(k["h"]), float(k["l"]),
+            float(k["c"]), float(k["v"]))
+
+
+def _default_connect(url):
+    import websocket  # websocket-client
+    return websocket.create_connection(url, timeout=30)
+
+
+class StreamManager:
+    """
+    Background Binance WebSocket feed for kline and ticker streams.
+
+    Candles land in one CandleRing per (symbol, interval) and the last
+    ticker price per symbol is kept in memory. The reader thread reconnects
+    with jittered exponential backoff and backfills any missed candles over
+    REST, both after a reconnect and when a kline arrives after a gap.
+    `connect(url)` may be swapped for a local stand-in exposing recv()/close().
+    Listeners added with `add_listener(fn)` get `fn(symbol, interval, row)`
+    for every kline update, live or backfilled, in arrival order;
+    `add_listener(fn, backfill=False)` gets live updates only.
+    """
+
+    def __init__(self, symbols=None, intervals=None, size: int = 500,
+                 url: str = WS_URL, connect=None, client=None, max_backoff: float = 60.0):
+        self.symbols = [s.upper() for s in (symbols or DEFAULT_SYMBOLS)]
+        self.intervals = list(intervals or DEFAULT_INTERVALS)
+        self.size = size
+        self.url = url
+        self.connect = connect or _default_connect
+        self.client = client
+        self.max_backoff = max_backoff
+        self.rings = {(s, i): CandleRing(size) for s in self.symbols for i in self.intervals}
+        self.prices = {}           # symbol -> (price, event_time_ms)
+        self.connected = False
+        self.reconnects = 0
+        self._listeners = []       # (fn, receives backfilled rows)
+        self._stop = threading.Event()
+        self._thread = None
+        self._conn = None
+
+    # ---- 🔹 Lifecycle ----
+    def stream_url(self) -> str:
+        streams = []
+        for s in self.symbols:
+            streams += [f"{s.lower()}@kline_{i}" for i in self.intervals]
+            streams.append(f"{s.lower()}@ticker")
+        return f"{self.url}?streams={'/'.join(streams)}"
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="binance-stream", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        conn = self._conn
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                self._conn = self.connect(self.stream_url())
+                self.connected = True
+                backoff = 1.0
+                self.backfill()
+                while not self._stop.is_set():
+                    msg = self._conn.recv()
+                    if not msg:
+                        raise ConnectionError("stream closed")
+                    self.handle(json.loads(msg))
+            except Exception:
+                if self._stop.is_set():
+                    break
+                self.connected = False
+                self.reconnects += 1
+                self._stop.wait(backoff * (1 + random.random()))
+                backoff = min(backoff * 2, self.max_backoff)
+            finally:
+                self.connected = False
+                if self._conn is not None:
+                    try:
+                        self._conn.close()
+                    except Exception:
+                        pass
+                    self._conn = None
+
+    # ---- 🔹 Messages ----
+    def add_listener(self, fn, backfill: bool = True):
+        if all(f != fn for f, _ in self._listeners):
+            self._listeners.append((fn, backfill))
+
+    def remove_listener(self, fn):
+        self._listeners = [(f, b) for f, b in self._listeners if f != fn]
+
+    def _notify(self, symbol, interval, rows, backfill: bool = False):
+        for fn, wants_backfill in list(self._listeners):
+            if backfill and not wants_backfill:
+                continue
+            for row in rows:
+                try:
+                    fn(symbol, interval, row)
+                except Exception:
+                    # a failing listener must not take the feed down
+                    break
+
+    def handle(self, msg: dict):
+        data = msg.get("data", msg)
+        event = data.get("e")
+        if event == "kline":
+            k = data["k"]
+            ring = self.rings.get((data["s"], k["i"]))
+            if ring is None:
+                return
+            row = _kline_row(k)
+            last = ring.last_open_time
+            if last is not None and row[0] > last + INTERVAL_MS[k["i"]]:
+                self._backfill_ring(data["s"], k["i"], ring)
+            ring.update(row)
+            self._notify(data["s"], k["i"], [row])
+        elif event == "24hrTicker":
+            self.prices[data["s"]] = (float(data["c"]), int(data["E"]))
+
+    def _backfill_ring(self, symbol, interval, ring):
+        client = self.client or get_client()
+        last = ring.last_open_time
+        missed = None if last is None else (time.time() * 1000 - last) // INTERVAL_MS[interval]
+        if missed is None or missed >= self.size:
+            rows = client.get_kline_rows(symbol, interval, self.size)
+        else:
+            rows = client.get_kline_rows(symbol, interval, 1000, start_time=last)
+        rows = [tuple(float(x) for x in r[:6]) for r in rows]
+        ring.extend(rows)
+        self._notify(symbol, interval, rows, backfill=True)
+
+    def backfill(self):
+        """Fill every ring up to now over REST (initial seed and after reconnects)."""
+        with request_priority(BACKGROUND):
+            for (symbol, interval), ring in self.rings.items():
+                try:
+                    self._backfill_ring(symbol, interval, ring)
+                except Exception:
+                    continue
+
+    # ---- 🔹 Read API ----
+    def candles(self, symbol, interval) -> np.ndarray:
+        """Zero-copy live (n, 6) view: open_time, Open, High, Low, Close, Volume (see CandleRing)."""
+        ring = self.rings.get((symbol.upper(), interval))
+        return ring.view() if ring is not None else np.empty((0, len(CANDLE_FIELDS)))
+
+    def frame(self, symbol, interval, limit=None) -> pd.DataFrame:
+        """
+        Candles as a DataFrame (Time, Open, High, Low, Close, Volume) for
+        charts and models. The frame owns its data: later updates do not
+        change it.
+        """
+        ring = self.rings.get((symbol.upper(), interval))
+        arr = ring.snapshot(limit) if ring is not None else np.empty((0, len(CANDLE_FIELDS)))
+        # the snapshot is private to this frame, so no second copy
+        df = pd.DataFrame(arr[:, 1:], columns=CANDLE_FIELDS[1:], copy=False)
+        df.insert(0, "Time", pd.to_datetime(arr[:, 0].astype("int64"), unit="ms"))
+        return df
+
+    def price(self, symbol):
+        hit = self.prices.get(symbol.upper())
+        return hit[0] if hit else None
+
+
+_stream = None
+_stream_lock = threading.Lock()
+
+
+def get_stream(symbols=None, intervals=None) -> StreamManager:
+    """Process-wide stream manager, started on first use."""
+    global _stream
+    with _stream_lock:
+        if _stream is None:
+            _stream = StreamManager(symbols, intervals).start()
+        return _stream
+
+
+def get_candles(symbol, interval, limit=100) -> pd.DataFrame:
+    """
+    Latest candles from the live stream when it already holds enough of
+    them, otherwise from REST through the shared client.
+    """
+    stream = get_stream()
+    if (symbol.upper(), interval) in stream.rings and len(stream.rings[(symbol.upper(), interval)]) >= limit:
+        return stream.frame(symbol, interval, limit)
+    return get_client().get_klines(symbol, interval, limit)
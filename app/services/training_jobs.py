@@ -0,0 +1,299 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from models.registry import atomic_dump, load_model
+from utils.metrics import cache_event
+
+ARTIFACT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "models", "cache"))
+# incremental updates in a row before the next refresh is a full retrain
+FULL_RETRAIN_EVERY = 20
+# histories whose last timestamp falls in the same window of this many
+# seconds count as the same training data (CoinGecko refreshes every minute)
+TRAIN_CADENCE = 3600
+# artifacts kept in memory, finished jobs remembered, model names kept on disk
+MAX_LOADED = 8
+MAX_JOBS = 64
+MAX_NAMES = 64
+
+
+# ------------------ Trainers ------------------ #
+def _train_rf(df, params, progress):
+    from models.classifier import train_classifier
+    model, acc = train_classifier(df, n_estimators=int(params.get("n_estimators", 100)),
+                                  random_state=params.get("random_state", 42), progress=progress)
+    return {"model": model, "accuracy": acc}
+
+
+def _update_rf(previous_path, df, params, progress):
+    """Rolling update of the last forest trained for this name; None means train from scratch."""
+    from models.classifier import update_classifier
+    if not os.path.exists(previous_path):
+        # superseded and pruned while this job was queued
+        return None
+    previous = load_model(previous_path)
+    if (previous.get("updates", 0) >= FULL_RETRAIN_EVERY
+            or previous["model"].n_estimators != int(params.get("n_estimators", 100))):
+        return None
+    updated = update_classifier(previous["model"], df, progress=progress)
+    if updated is None:
+        return None
+    model, acc = updated
+    return {"model": model, "accuracy": acc, "updates": previous.get("updates", 0) + 1}
+
+
+def _save_rf(artifact, path):
+    from models.export import export_model
+    atomic_dump(artifact, path)
+    # ONNX copy of the forest for inference, used when onnxruntime is installed
+    export_model(artifact["model"], path)
+
+
+def _load_rf(path):
+    from models.export import load_export
+    artifact = load_model(path)
+    fast = load_export(path)
+    return artifact if fast is None else {**artifact, "model": fast}
+
+
+def _train_lstm(df, params, progress):
+    from models.lstm import train_lstm
+    window_size = int(params.get("window_size", 30))
+    model, acc, scaler = train_lstm(df, window_size=window_size,
+                                    epochs=int(params.get("epochs", 5)), progress=progress)
+    return {"model": model, "accuracy": acc, "scaler": scaler, "window_size": window_size}
+
+
+def _save_lstm(artifact, path):
+    from models.lstm import save_lstm
+    # also writes the quantized TFLite graphs the predictor runs on
+    save_lstm(artifact, path)
+
+
+def _load_lstm(path):
+    from models.lstm_infer import load_lstm_predictor
+    predictor = load_lstm_predictor(path)
+    return {"model": predictor, "accuracy": predictor.accuracy, "window_size": predictor.window_size}
+
+
+# kind -> how to train, save and load its artifact ("update": incremental
+# refresh of the previous artifact for the same name, when the kind has one)
+TRAINERS = {
+    "rf": {"train": _train_rf, "update": _update_rf, "save": _save_rf, "load": _load_rf, "suffix": ".pkl"},
+    "lstm": {"train": _train_lstm, "save": _save_lstm, "load": _load_lstm, "suffix": ".lstm"},
+}
+
+
+def data_fingerprint(df: pd.DataFrame, cadence: float = TRAIN_CADENCE) -> str:
+    """
+    Identity of a training frame. With a timestamp column it is the
+    columns, the span in days and the last timestamp floored to `cadence`
+    seconds, so every refresh of the same history within one cadence maps
+    to one model. Without one it is a hash of the contents.
+    """
+    h = hashlib.sha1()
+    for col in df.columns:
+        h.update(str(col).encode())
+    if "timestamp" in df.columns and len(df):
+        ts = pd.to_datetime(df["timestamp"])
+        span = round((ts.iloc[-1] - ts.iloc[0]).total_seconds() / 86_400)
+        last = int(ts.iloc[-1].timestamp() // cadence)
+        h.update(f"{span}:{last}".encode())
+    else:
+        for col in df.columns:
+            h.update(np.ascontiguousarray(df[col].to_numpy()).tobytes())
+    return h.hexdigest()[:16]
+
+
+def _remove_artifact(path):
+    """Delete an artifact with its exports (<key>.onnx, ...) and LSTM folders."""
+    for p in glob.glob(glob.escape(os.path.splitext(path)[0]) + ".*"):
+        try:
+            if os.path.isdir(p):
+                shutil.rmtree(p)
+            else:
+                os.remove(p)
+        except OSError:
+            pass
+
+
+class TrainingJob:
+    def __init__(self, key, kind, name):
+        self.key = key
+        self.kind = kind
+        self.name = name
+        self.status = "queued"    # queued -> running -> done | failed
+        self.progress = 0.0
+        self.message = "Waiting for a worker"
+        self.error = None
+        self.submitted = time.time()
+        self.finished = None
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def update(self, fraction, message=""):
+        self.progress = float(min(max(fraction, 0.0), 1.0))
+        self.message = message
+
+
+class TrainingJobManager:
+    """
+    Cached model artifacts with background training on a miss.
+
+    An artifact is keyed by (kind, name, hyper-parameters, fingerprint of
+    the training data, see data_fingerprint): the fingerprint does not see
+    prices, so the name (e.g. "bitcoin-30") is what tells coins apart. Only the newest artifact per
+    `name` is kept on disk (superseded ones are deleted when a newer one is
+    saved, names beyond MAX_NAMES least recently trained first), and the
+    in-memory artifact and job tables are bounded too.
+    `request()` never trains in the caller's thread: on a
+    miss it queues one job per key and returns the newest artifact trained
+    earlier for the same `name` (flagged stale), or None if there is none
+    yet, together with the job so the UI can show its progress. Kinds
+    with an "update" step refresh that previous artifact with the new data
+    instead of training from scratch; after FULL_RETRAIN_EVERY updates
+    in a row the next refresh is a full fit again.
+    """
+
+    def __init__(self, artifact_dir: str = ARTIFACT_DIR, max_workers: int = 1):
+        self.artifact_dir = artifact_dir
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="train")
+        self._jobs = OrderedDict()
+        self._loaded = OrderedDict()      # path -> artifact, least recently used first
+        self._lock = threading.Lock()
+        self._latest_path = os.path.join(artifact_dir, "latest.json")
+        self._latest = {}                 # "kind:name" -> path, least recently trained first
+        if os.path.exists(self._latest_path):
+            try:
+                with open(self._latest_path) as f:
+                    self._latest = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self._latest = {}
+        self._prune_unreferenced()
+
+    def _prune_unreferenced(self):
+        """Delete artifacts no name points to any more (left by earlier runs)."""
+        keep = {os.path.splitext(p)[0] for p in self._latest.values()}
+        for kind, trainer in TRAINERS.items():
+            for path in glob.glob(os.path.join(self.artifact_dir, f"{kind}-*{trainer['suffix']}")):
+                if os.path.splitext(path)[0] not in keep:
+                    _remove_artifact(path)
+
+    def artifact_key(self, kind, data: pd.DataFrame, params: dict, name: str) -> str:
+        blob = json.dumps([kind, name, params, data_fingerprint(data)], sort_keys=True, default=str)
+        return hashlib.sha1(blob.encode()).hexdigest()[:20]
+
+    def _path(self, kind, key):
+        return os.path.join(self.artifact_dir, f"{kind}-{key}{TRAINERS[kind]['suffix']}")
+
+    def _load(self, kind, path):
+        with self._lock:
+            if path in self._loaded:
+                self._loaded.move_to_end(path)
+                return self._loaded[path]
+        artifact = TRAINERS[kind]["load"](path)
+        with self._lock:
+            self._loaded[path] = artifact
+            while len(self._loaded) > MAX_LOADED:
+                self._loaded.popitem(last=False)
+        return artifact
+
+    def _trim_jobs(self):
+        """Forget the oldest finished jobs beyond MAX_JOBS (queued/running ones stay). Call under the lock."""
+        for key in [k for k, j in self._jobs.items() if j.done][:max(len(self._jobs) - MAX_JOBS, 0)]:
+            del self._jobs[key]
+
+    def request(self, kind: str, data: pd.DataFrame, params: dict, name: str):
+        """
+        Returns (artifact or None, job or None, stale). `job` is set while a
+        model for this exact data/params is being trained.
+        """
+        key = self.artifact_key(kind, data, params, name)
+        path = self._path(kind, key)
+        cache_event("training_artifacts", os.path.exists(path))
+        if os.path.exists(path):
+            return self._load(kind, path), None, False
+
+        with self._lock:
+            previous = self._latest.get(f"{kind}:{name}")
+            job = self._jobs.get(key)
+            if job is None or job.status == "failed":
+                # a failed update retries as a full fit
+                base = previous if job is None and previous and os.path.exists(previous) else None
+                job = TrainingJob(key, kind, name)
+                self._jobs[key] = job
+                self._trim_jobs()
+                self._pool.submit(self._run, job, data.copy(), dict(params), path, base)
+
+        if previous and os.path.exists(previous):
+            try:
+                return self._load(kind, previous), job, True
+            except OSError:
+                # superseded by a newer artifact and deleted meanwhile
+                pass
+        return None, job, True
+
+    def _run(self, job, data, params, path, base=None):
+        job.status = "running"
+        job.update(0.0, "Training started")
+        try:
+            trainer = TRAINERS[job.kind]
+            artifact = None
+            if base is not None and "update" in trainer:
+                job.update(0.0, "Updating the previous model with new data")
+                artifact = trainer["update"](base, data, params, job.update)
+            if artifact is None:
+                artifact = trainer["train"](data, params, job.update)
+            os.makedirs(self.artifact_dir, exist_ok=True)
+            trainer["save"](artifact, path)
+            with self._lock:
+                name = f"{job.kind}:{job.name}"
+                superseded = [self._latest.pop(name, None)]
+                self._latest[name] = path
+                while len(self._latest) > MAX_NAMES:
+                    superseded.append(self._latest.pop(next(iter(self._latest))))
+                current = set(self._latest.values())
+                superseded = [p for p in superseded if p and p not in current]
+                for p in superseded:
+                    self._loaded.pop(p, None)
+                atomic = self._latest_path + ".tmp"
+                with open(atomic, "w") as f:
+                    json.dump(self._latest, f, indent=2)
+                os.replace(atomic, self._latest_path)
+            for p in superseded:
+                _remove_artifact(p)
+            job.status = "done"
+            job.update(1.0, "Model ready")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            job.message = f"Training failed: {e}"
+        finally:
+            job.finished = time.time()
+
+    def jobs(self) -> list:
+        with self._lock:
+            return list(self._jobs.values())
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_training_manager() -> TrainingJobManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = TrainingJobManager()
+        return _manager
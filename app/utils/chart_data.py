@@ -0,0 +1,244 @@
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from services.market_data import INTERVAL_MS
+
+CHART_INTERVALS = ["1m", "5m", "15m", "1h", "4h", "1d"]
+# most points one trace sends to the browser
+DEFAULT_POINT_BUDGET = 1500
+# appended raw candles may overshoot the budget by this much before a rebuild
+APPEND_HEADROOM = 1.25
+OHLC_AGG = {"Time": "first", "Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+
+# ------------------ Timeframe ------------------ #
+def pick_interval(span_ms: int, budget: int = DEFAULT_POINT_BUDGET, minimum: str = "1m") -> str:
+    """Finest interval, not finer than `minimum`, that shows `span_ms` in at most `budget` bars."""
+    candidates = CHART_INTERVALS[CHART_INTERVALS.index(minimum):]
+    for interval in candidates:
+        if span_ms / INTERVAL_MS[interval] <= budget:
+            return interval
+    return candidates[-1]
+
+
+def load_range(symbol: str, interval: str, span_ms: int, budget: int = DEFAULT_POINT_BUDGET, store=None):
+    """
+    Candles covering the last `span_ms` for a chart, at the finest timeframe
+    that fits the budget. Stored bars of that timeframe are used as-is,
+    stored 1m candles are resampled otherwise, and the stretch after the
+    newest stored bar comes from the live bars. Returns (interval, frame).
+    """
+    from services.candle_store import CandleStore
+    from services.resample import BASE_INTERVAL, DERIVED_INTERVALS, get_bars, resample
+    from services.stream import CANDLE_FIELDS
+
+    interval = pick_interval(span_ms, budget, interval)
+    step = INTERVAL_MS[interval]
+    store = store or CandleStore()
+    start = (int(time.time() * 1000) - span_ms) // step * step
+
+    stored = store.load(symbol, interval, start=start)
+    if stored.empty and interval in DERIVED_INTERVALS:
+        minutes = store.load(symbol, BASE_INTERVAL, start=start)
+        bars = resample(minutes[CANDLE_FIELDS].to_numpy(np.float64), interval)
+        stored = pd.DataFrame(bars[:, 1:], columns=CANDLE_FIELDS[1:])
+        stored.insert(0, "Time", pd.to_datetime(bars[:, 0].astype("int64"), unit="ms"))
+    stored = stored.drop(columns="open_time", errors="ignore")
+
+    # live bars for the gap up to now (REST caps a page at 1000)
+    if stored.empty:
+        missing = span_ms // step + 1
+    else:
+        missing = (time.time() * 1000 - stored["Time"].iloc[-1].value // 1_000_000) // step + 1
+    live = get_bars(symbol, interval, int(min(max(missing, 2), 1000)))
+    df = pd.concat([stored, live[live["Time"] >= pd.Timestamp(start, unit="ms")]], ignore_index=True)
+    df = df.drop_duplicates("Time", keep="last").sort_values("Time", ignore_index=True)
+    return interval, df
+
+
+# ------------------ Decimation ------------------ #
+def lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of `n` points that keep the
+    visual shape of the line. First and last points are always kept.
+    """
+    size = len(y)
+    if n >= size or n < 3:
+        return np.arange(size)
+    x = np.asarray(x, dtype=np.float64) - float(x[0])
+    y = np.asarray(y, dtype=np.float64)
+    # n - 2 buckets between the fixed first and last point
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)
+    counts = np.diff(np.r_[edges[:-1], size - 1])
+    mean_x = np.add.reduceat(x[:-1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:-1], edges[:-1]) / counts
+
+    keep = np.empty(n, dtype=np.int64)
+    keep[0], keep[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # third corner: average of the next bucket (the last point for the final bucket)
+        cx, cy = (mean_x[i + 1], mean_y[i + 1]) if i + 1 < n - 2 else (x[-1], y[-1])
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def minmax(y: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the min and max of each of ~n/2 equal buckets, in order (spikes survive)."""
+    size = len(y)
+    if n >= size or n < 4:
+        return np.arange(size)
+    # two points per bucket plus the fixed endpoints stay within n
+    bucket = np.arange(size) * ((n - 2) // 2) // size
+    order = np.lexsort((y, bucket))
+    firsts = np.flatnonzero(np.r_[True, bucket[order][1:] != bucket[order][:-1]])
+    lasts = np.r_[firsts[1:], size] - 1
+    return np.unique(np.r_[0, order[firsts], order[lasts], size - 1])
+
+
+def decimate_line(df: pd.DataFrame, budget: int = DEFAULT_POINT_BUDGET, method: str = "lttb",
+                  x: str = "Time", y: str = "Close") -> pd.DataFrame:
+    """Rows of `df` to draw as a line within `budget` points ("lttb" or "minmax")."""
+    if len(df) <= budget:
+        return df
+    values = df[y].to_numpy(np.float64)
+    if method == "minmax":
+        keep = minmax(values, budget)
+    else:
+        xs = df[x].to_numpy()
+        keep = lttb(xs.astype("int64") if np.issubdtype(xs.dtype, np.datetime64) else xs, values, budget)
+    return df.iloc[keep]
+
+
+def decimate_ohlc(df: pd.DataFrame, budget: int = DEFAULT_POINT_BUDGET) -> pd.DataFrame:
+    """Merge runs of consecutive candles so at most `budget` remain; OHLC stays exact per run."""
+    if len(df) <= budget:
+        return df
+    group = np.arange(len(df)) // -(-len(df) // budget)
+    agg = {c: f for c, f in OHLC_AGG.items() if c in df.columns}
+    return df.groupby(group).agg(agg).reset_index(drop=True)
+
+
+# ------------------ Figures ------------------ #
+def _trace(kind, df, name):
+    if kind == "Candlestick":
+        return go.Candlestick(x=df["Time"], open=df["Open"], high=df["High"], low=df["Low"],
+                              close=df["Close"], name=name)
+    return go.Scatter(x=df["Time"], y=df["Close"], mode="lines", name=name)
+
+
+def build_figure(df: pd.DataFrame, kind: str = "Candlestick", budget: int = DEFAULT_POINT_BUDGET,
+                 method: str = "lttb", name: str = None) -> go.Figure:
+    """Candlestick or line figure of `df` with at most `budget` points."""
+    reduced = decimate_ohlc(df, budget) if kind == "Candlestick" else decimate_line(df, budget, method)
+    return go.Figure(data=[_trace(kind, reduced, name)])
+
+
+class ChartFeed:
+    """
+    Figure for one chart slot that is kept between reruns (in session_state).
+
+    update() appends only the candles from the last drawn bar onwards (that
+    bar may still have been in progress) instead of rebuilding and
+    re-decimating the whole history. The series is rebuilt when it no longer
+    lines up with what is drawn or appends have outgrown the point budget.
+    """
+
+    def __init__(self, kind: str = "Candlestick", budget: int = DEFAULT_POINT_BUDGET,
+                 method: str = "lttb", name: str = None):
+        self.kind = kind
+        self.budget = budget
+        self.method = method
+        self.name = name
+        self.fig = None
+        self.drawn = None      # DataFrame of the points in the trace
+        self.appended = 0      # rows sent by the last update
+
+    def _rebuild(self, df):
+        self.fig = build_figure(df, self.kind, self.budget, self.method, self.name)
+        trace = self.fig.data[0]
+        self.drawn = pd.DataFrame({"Time": trace.x, **(
+            {"Open": trace.open, "High": trace.high, "Low": trace.low, "Close": trace.close}
+            if self.kind == "Candlestick" else {"Close": trace.y})})
+        self.appended = len(self.drawn)
+
+    def update(self, df: pd.DataFrame) -> go.Figure:
+        if df.empty:
+            self.fig, self.drawn = go.Figure(), None
+            return self.fig
+        last = self.drawn["Time"].iloc[-1] if self.drawn is not None and len(self.drawn) else None
+        if last is None or df["Time"].iloc[0] > last or last not in set(df["Time"].iloc[-self.budget:]):
+            self._rebuild(df)
+            return self.fig
+
+        new = df[df["Time"] >= last]
+        cols = list(self.drawn.columns)
+        self.drawn = pd.concat([self.drawn[self.drawn["Time"] < last], new[cols]], ignore_index=True)
+        # keep the window aligned with the data's start
+        self.drawn = self.drawn[self.drawn["Time"] >= df["Time"].iloc[0]]
+        if len(self.drawn) > self.budget * APPEND_HEADROOM:
+            self._rebuild(df)
+            return self.fig
+
+        trace = self.fig.data[0]
+        with self.fig.batch_update():
+            trace.x = self.drawn["Time"]
+            if self.kind == "Candlestick":
+                trace.open, trace.high = self.drawn["Open"], self.drawn["High"]
+                trace.low, trace.close = self.drawn["Low"], self.drawn["Close"]
+            else:
+                trace.y = self.drawn["Close"]
+        self.appended = len(new)
+        return self.fig
+
+
+def chart_feed(slot: str, signature, kind: str = "Candlestick", budget: int = DEFAULT_POINT_BUDGET,
+               method: str = "lttb", name: str = None) -> ChartFeed:
+    """
+    The ChartFeed for a page's chart slot, reused across reruns while
+    `signature` (symbol, timeframe, range, ...) is unchanged.
+    """
+    import streamlit as st
+
+    key = f"chart_feed:{slot}"
+    held = st.session_state.get(key)
+    if held is None or held[0] != (signature, kind, budget, method):
+        held = st.session_state[key] = ((signature, kind, budget, method), ChartFeed(kind, budget, method, name))
+    return held[1]
+
+
+if __name__ == "__main__":
+    # from the repo root: PYTHONPATH=app python -m utils.chart_data [rows]
+    import sys
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 40_320  # four weeks of 1m candles
+    rng = np.random.default_rng(0)
+    close = 50_000 * np.exp(np.cumsum(rng.normal(0, 1e-3, rows)))
+    df = pd.DataFrame({"Time": pd.date_range("2024-01-01", periods=rows, freq="min"),
+                       "Open": close, "High": close * 1.001, "Low": close * 0.999, "Close": close,
+                       "Volume": rng.uniform(0, 50, rows)})
+
+    print(f"pick_interval(4 weeks) -> {pick_interval(rows * 60_000)}")
+    for kind, method in [("Candlestick", None), ("Line", "lttb"), ("Line", "minmax")]:
+        t = time.perf_counter()
+        full = go.Figure(data=[_trace(kind, df, "full")]).to_json()
+        t_full = time.perf_counter() - t
+        t = time.perf_counter()
+        small = build_figure(df, kind, method=method or "lttb").to_json()
+        t_small = time.perf_counter() - t
+        print(f"{kind:11s} {method or '':6s}  full {len(full) / 1e6:5.2f} MB {t_full * 1e3:6.0f} ms  "
+              f"budget {len(small) / 1e6:5.2f} MB {t_small * 1e3:6.0f} ms")
+
+    # refresh: one new candle appended vs a full rebuild
+    feed = ChartFeed("Line")
+    feed.update(df.iloc[:-1])
+    t = time.perf_counter()
+    feed.update(df)
+    print(f"append refresh: {feed.appended} rows in {(time.perf_counter() - t) * 1e3:.1f} ms, "
+          f"{len(feed.drawn)} points drawn")
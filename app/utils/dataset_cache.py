@@ -0,0 +1,143 @@
+import hashlib
+import json
+import glob
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from models.features import FEATURE_SPEC_VERSION
+from models.registry import file_sha256
+from utils.ingest import conform
+from utils.metrics import cache_event
+
+DEFAULT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "cache"))
+# entries kept per source: the newest data plus the one a running job may still read
+KEEP_PER_SOURCE = 2
+
+class DatasetCache:
+    """
+    On-disk cache of schema-checked candles and feature matrices.
+
+    Entries live under `<root>/<source key>/`: `candles.parquet` plus one
+    `<name>-v<FEATURE_SPEC_VERSION>.npy` per matrix. The source key hashes
+    the content of the source files (file hashes are remembered by size and
+    mtime, so unchanged files are not re-read), so new data or a feature
+    spec bump misses and everything else is served from disk. Matrices are
+    memory-mapped read-only on a hit.
+
+    A source is the set of directories its files live in (e.g. one store
+    pair's day files). Only its `keep` newest keys are kept: older entries,
+    entries no source refers to and matrices of older feature specs are
+    deleted as new ones are made.
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT, keep: int = KEEP_PER_SOURCE):
+        self.root = root
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._hash_index_path = os.path.join(root, "hashes.json")
+        self._sources_path = os.path.join(root, "sources.json")
+
+    # ---- 🔹 Keys ----
+    def _file_hash(self, path, index):
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        hit = index.get(path)
+        if hit and hit[:2] == stamp:
+            return hit[2]
+        digest = file_sha256(path)
+        index[path] = stamp + [digest]
+        return digest
+
+    def _read_json(self, path) -> dict:
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def source_key(self, paths) -> str:
+        """Content hash of the source files (order matters)."""
+        paths = [os.path.abspath(p) for p in paths]
+        with self._lock:
+            index = self._read_json(self._hash_index_path)
+            h = hashlib.sha256()
+            for path in paths:
+                h.update(os.path.basename(path).encode())
+                h.update(self._file_hash(path, index).encode())
+            key = h.hexdigest()[:20]
+            # files that are gone (e.g. replaced partitions) need no remembered hash
+            index = {p: v for p, v in index.items() if os.path.exists(p)}
+            os.makedirs(self.root, exist_ok=True)
+            self._write_atomic(self._hash_index_path, lambda f: f.write(json.dumps(index).encode()))
+            self._remember("|".join(sorted({os.path.dirname(p) for p in paths})), key)
+        return key
+
+    def _remember(self, source, key):
+        """Make `key` the newest of `source` and delete the entries that fall out of use."""
+        sources = self._read_json(self._sources_path)
+        keys = [k for k in sources.get(source, []) if k != key] + [key]
+        sources[source] = keys[-self.keep:]
+        self._write_atomic(self._sources_path, lambda f: f.write(json.dumps(sources).encode()))
+        referenced = {k for ks in sources.values() for k in ks}
+        for name in os.listdir(self.root):
+            entry = self._entry(name)
+            if os.path.isdir(entry) and name not in referenced:
+                shutil.rmtree(entry, ignore_errors=True)
+
+    # ---- 🔹 Entries ----
+    def _entry(self, key):
+        return os.path.join(self.root, key)
+
+    def _write_atomic(self, path, write):
+        folder = os.path.dirname(path)
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def candles(self, key: str, load) -> pd.DataFrame:
+        """Candles for `key` in the canonical schema; `load()` (any candle frame) runs only on a miss."""
+        path = os.path.join(self._entry(key), "candles.parquet")
+        cache_event("dataset", os.path.exists(path))
+        if os.path.exists(path):
+            return pd.read_parquet(path)
+        df = conform(load())
+        self._write_atomic(path, lambda f: df.to_parquet(f, index=False))
+        return df
+
+    def arrays(self, key: str, names, build) -> tuple:
+        """
+        Matrices `names` for `key` at the current FEATURE_SPEC_VERSION, e.g.
+        X, y = arrays(key, ("X", "y"), fn). `build()` runs only on a miss;
+        hits are memory-mapped read-only.
+        """
+        paths = [os.path.join(self._entry(key), f"{n}-v{FEATURE_SPEC_VERSION}.npy") for n in names]
+        hit = all(os.path.exists(p) for p in paths)
+        cache_event("dataset", hit)
+        if hit:
+            return tuple(np.load(p, mmap_mode="r") for p in paths)
+        built = tuple(np.ascontiguousarray(a) for a in build())
+        for n in names:
+            # the same matrix under an older feature spec is never read again
+            for old in glob.glob(os.path.join(self._entry(key), f"{n}-v*.npy")):
+                if not old.endswith(f"-v{FEATURE_SPEC_VERSION}.npy"):
+                    try:
+                        os.remove(old)
+                    except OSError:
+                        pass
+        for path, arr in zip(paths, built):
+            self._write_atomic(path, lambda f, arr=arr: np.save(f, arr))
+        return built
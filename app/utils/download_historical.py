@@ -1,28 +1,34 @@
-import pandas as pd
-import requests
 import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from services.candle_store import CandleStore
+from services.market_data import get_client
+from utils.ingest import CANDLE_COLUMNS, conform
 
 def get_klines(symbol="BTCUSDT", interval="1m", limit=1000):
-    url = "https://api.binance.com/api/v3/klines"
-    params = {"symbol": symbol, "interval": interval, "limit": limit}
-    resp = requests.get(url, params=params)
-    resp.raise_for_status()
-    data = resp.json()
-    cols = [
-        "Open_time","Open","High","Low","Close","Volume",
-        "Close_time","Quote_asset_volume","Number_of_trades",
-        "Taker_buy_base_asset_volume","Taker_buy_quote_asset_volume","Ignore"
-    ]
-    df = pd.DataFrame(data, columns=cols)
-    df["Open_time"] = pd.to_datetime(df["Open_time"], unit="ms")
-    df[["Open","High","Low","Close","Volume"]] = df[["Open","High","Low","Close","Volume"]].astype(float)
-    return df[["Open_time","Open","High","Low","Close","Volume"]]
+    return conform(get_client().get_klines(symbol, interval, limit))
+
+def sync_history(symbol="BTCUSDT", interval="1m", days=30, store=None):
+    """
+    Fill the local candle store for the last `days`, fetching only missing ranges.
+    """
+    store = store or CandleStore()
+    fetched = store.sync(symbol, interval, days=days)
+    print(f"✅ {symbol} {interval}: fetched {fetched} new candles into {store.root}")
+    return fetched
 
-def save_csv(path="data/BTCUSDT_1m.csv", symbol="BTCUSDT", interval="1m", limit=1000):
-    df = get_klines(symbol, interval, limit)
+def save_csv(path="data/BTCUSDT_1m.csv", symbol="BTCUSDT", interval="1m", days=30, store=None):
+    """
+    Export stored candles to CSV (synced first), for tools that still want a flat file.
+    """
+    store = store or CandleStore()
+    sync_history(symbol, interval, days, store)
+    df = store.load(symbol, interval)
+    df = df[CANDLE_COLUMNS]
     os.makedirs(os.path.dirname(path), exist_ok=True)
     df.to_csv(path, index=False)
     print("✅ Saved data at", path)
 
 if __name__ == "__main__":
-    save_csv()
+    sync_history()
@@ -0,0 +1,202 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from utils.metrics import timer
+
+# Canonical candle layout used by the store, caches and models
+CANDLE_SCHEMA = pa.schema([
+    ("open_time", pa.int64()),     # ms since epoch, UTC
+    ("Open", pa.float64()),
+    ("High", pa.float64()),
+    ("Low", pa.float64()),
+    ("Close", pa.float64()),
+    ("Volume", pa.float64()),
+])
+CANDLE_COLUMNS = CANDLE_SCHEMA.names
+
+# spellings seen in CSV exports / API frames -> canonical name
+ALIASES = {
+    "open_time": "open_time", "open time": "open_time", "opentime": "open_time",
+    "time": "open_time", "timestamp": "open_time", "date": "open_time",
+    "open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume",
+}
+
+
+class CandleSchemaError(ValueError):
+    pass
+
+
+def canonical_name(name: str):
+    return ALIASES.get(str(name).strip().lower())
+
+
+# ------------------ Columns ------------------ #
+def _to_ms(col: pa.ChunkedArray) -> pa.ChunkedArray:
+    t = col.type
+    if pa.types.is_timestamp(t) or pa.types.is_date(t):
+        return col.cast(pa.timestamp("ms")).cast(pa.int64())
+    if pa.types.is_integer(t) or pa.types.is_floating(t):
+        return col.cast(pa.int64())
+    # text: ISO-like datetimes
+    return pc.strptime(pc.utf8_trim_whitespace(col), "%Y-%m-%d %H:%M:%S", "ms").cast(pa.int64())
+
+
+def _to_float(col: pa.ChunkedArray) -> pa.ChunkedArray:
+    if pa.types.is_string(col.type) or pa.types.is_large_string(col.type):
+        # "1,234.5 " -> 1234.5, unparsable -> null
+        col = pc.utf8_trim_whitespace(pc.replace_substring(col, ",", ""))
+        col = pc.if_else(pc.equal(col, ""), pa.scalar(None, pa.string()), col)
+    return col.cast(pa.float64())
+
+
+def conform_table(table: pa.Table) -> pa.Table:
+    """
+    Rename to canonical columns, cast to CANDLE_SCHEMA and drop extras.
+    Raises CandleSchemaError when a required column is missing.
+    """
+    columns = {}
+    for name in table.column_names:
+        canon = canonical_name(name)
+        if canon and canon not in columns:
+            columns[canon] = table.column(name)
+    missing = [c for c in CANDLE_COLUMNS if c not in columns]
+    if missing:
+        raise CandleSchemaError(f"candle data is missing columns {missing} (has {table.column_names})")
+    arrays = [_to_ms(columns["open_time"])]
+    for name in CANDLE_COLUMNS[1:]:
+        try:
+            arrays.append(_to_float(columns[name]))
+        except pa.ArrowInvalid as e:
+            raise CandleSchemaError(f"column {name} is not numeric: {e}") from e
+    # empty volume is "no trades"; empty prices stay null
+    arrays[-1] = pc.fill_null(arrays[-1], 0.0)
+    return pa.Table.from_arrays(arrays, schema=CANDLE_SCHEMA)
+
+
+def validate(table: pa.Table, strict: bool = False) -> pa.Table:
+    """
+    Ensure open_time is strictly increasing. Unsorted rows are sorted and
+    duplicate open times keep the last row, unless `strict`, in which case
+    either raises CandleSchemaError.
+    """
+    t = table.column("open_time").to_numpy()
+    if t.size < 2 or (np.diff(t) > 0).all():
+        return table
+    if strict:
+        raise CandleSchemaError("open_time is not strictly increasing")
+    order = np.argsort(t, kind="stable")
+    t = t[order]
+    keep = np.ones(t.size, dtype=bool)
+    keep[:-1] = t[1:] != t[:-1]
+    return table.take(pa.array(order[keep]))
+
+
+# ------------------ Readers ------------------ #
+def read_csv(path: str, use_threads: bool = True) -> pa.Table:
+    """
+    Parse a candle CSV with pyarrow's multithreaded reader. Columns are read
+    with inferred types and coerced to the schema by conform_table(), so
+    text volumes and datetime strings are handled column-wise.
+    """
+    return pacsv.read_csv(path, read_options=pacsv.ReadOptions(use_threads=use_threads))
+
+
+def read_parquet(path: str) -> pa.Table:
+    """Memory-mapped Parquet read (file or dataset directory)."""
+    return pq.read_table(path, memory_map=True)
+
+
+def load_candles(path: str, strict: bool = False, use_threads: bool = True) -> pa.Table:
+    """CSV or Parquet candles as a validated CANDLE_SCHEMA table."""
+    if path.endswith(".parquet") or os.path.isdir(path):
+        table = read_parquet(path)
+    else:
+        table = read_csv(path, use_threads=use_threads)
+    return validate(conform_table(table), strict=strict)
+
+
+def to_frame(table: pa.Table, with_time: bool = True) -> pd.DataFrame:
+    """DataFrame in canonical columns, plus a datetime Time column for charts/models."""
+    df = table.to_pandas()
+    if with_time:
+        df["Time"] = pd.to_datetime(df["open_time"], unit="ms")
+    return df
+
+
+def read_candles(path: str, strict: bool = False) -> pd.DataFrame:
+    return to_frame(load_candles(path, strict=strict))
+
+
+def conform(df: pd.DataFrame, strict: bool = False) -> pd.DataFrame:
+    """
+    Bring an in-memory candle frame (REST, stream, CSV export) to the
+    canonical schema. A datetime Time column stands in for open_time.
+    """
+    with timer("parse", "conform"):
+        if "open_time" not in df.columns and "Time" in df.columns and \
+                pd.api.types.is_datetime64_any_dtype(df["Time"]):
+            df = df.assign(open_time=df["Time"].astype("datetime64[ms]").astype("int64")).drop(columns="Time")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        return to_frame(validate(conform_table(table), strict=strict))
+
+
+# ------------------ Benchmark ------------------ #
+def _bench_pandas(path):
+    df = pd.read_csv(path)
+    df["Volume"] = df["Volume"].astype(str).str.replace(",", "", regex=False).str.strip()
+    df["Volume"] = pd.to_numeric(df["Volume"], errors="coerce").fillna(0)
+    df["Open_time"] = pd.to_datetime(df["Open_time"])
+    return len(df)
+
+
+def _bench_ingest(path):
+    return len(read_candles(path))
+
+
+def _measure(fn, path):
+    import resource
+    import time
+    t = time.perf_counter()
+    rows = fn(path)
+    elapsed = time.perf_counter() - t
+    return rows, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+if __name__ == "__main__":
+    # from the repo root: PYTHONPATH=app python -m utils.ingest [rows]
+    import multiprocessing
+    import sys
+    import tempfile
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 3_000_000
+    folder = tempfile.mkdtemp()
+    csv_path = os.path.join(folder, "candles.csv")
+    parquet_path = os.path.join(folder, "candles.parquet")
+
+    rng = np.random.default_rng(0)
+    close = 50_000 * np.exp(np.cumsum(rng.normal(0, 1e-3, rows)))
+    open_time = pd.date_range("2020-01-01", periods=rows, freq="min")
+    raw = pd.DataFrame({
+        "Open_time": open_time.strftime("%Y-%m-%d %H:%M:%S"),
+        "Open": close, "High": close * 1.001, "Low": close * 0.999, "Close": close,
+        "Volume": rng.uniform(0, 50, rows).round(5),
+    })
+    raw.to_csv(csv_path, index=False)
+    pq.write_table(conform_table(pa.Table.from_pandas(raw, preserve_index=False)), parquet_path)
+    print(f"{rows} rows, csv {os.path.getsize(csv_path) / 1e6:.0f} MB, "
+          f"parquet {os.path.getsize(parquet_path) / 1e6:.0f} MB")
+
+    # every reader in a fresh process so peak RSS is its own
+    ctx = multiprocessing.get_context("spawn")
+    for label, fn, path in [("pandas read_csv + repair", _bench_pandas, csv_path),
+                            ("pyarrow csv (threads)", _bench_ingest, csv_path),
+                            ("parquet (memory map)", _bench_ingest, parquet_path)]:
+        with ctx.Pool(1) as pool:
+            n, elapsed, rss = pool.apply(_measure, (fn, path))
+        print(f"{label:26s} {n} rows  {elapsed:6.2f}s  peak RSS {rss:7.0f} MB")
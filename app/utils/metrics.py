@@ -0,0 +1,386 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "metrics.db"))
+# APP_METRICS=0 turns recording off (timers still run the wrapped code)
+ENABLED = os.environ.get("APP_METRICS", "1") != "0"
+
+# hot-path stages, in the order a request goes through them
+STAGES = ["fetch", "parse", "features", "load", "predict", "pnl", "render", "page"]
+# Prometheus histogram buckets, seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FLUSH_PERIOD = 5.0
+# samples held in memory between flushes (the oldest are dropped beyond this)
+MAX_BUFFER = 20_000
+# samples older than this are dropped from the file
+KEEP_SECONDS = 86_400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    ts      REAL NOT NULL,            -- seconds since epoch
+    stage   TEXT NOT NULL,            -- one of STAGES
+    op      TEXT NOT NULL,            -- what was timed, e.g. "binance /api/v3/klines"
+    seconds REAL NOT NULL,
+    pid     INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_ts ON samples (ts);
+CREATE TABLE IF NOT EXISTS counters (
+    name    TEXT NOT NULL,            -- e.g. cache
+    labels  TEXT NOT NULL,            -- JSON, e.g. {"cache": "market_data", "result": "hit"}
+    value   INTEGER NOT NULL,
+    PRIMARY KEY (name, labels)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS profile_requests (
+    page      TEXT PRIMARY KEY,
+    requested REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS profiles (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    page     TEXT NOT NULL,
+    captured REAL NOT NULL,
+    seconds  REAL NOT NULL,
+    tool     TEXT NOT NULL,           -- pyinstrument / cProfile
+    report   TEXT NOT NULL
+);
+"""
+
+
+class MetricsStore:
+    """
+    Timings, counters and profiles in SQLite (WAL mode), so the pages, the
+    background workers and offline scripts all report into one file that
+    the Profiling page reads.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    # ---- 🔹 Writes ----
+    def write(self, samples, counts: dict):
+        """Append (ts, stage, op, seconds) samples and add `counts` {(name, labels_json): n} to the counters."""
+        pid = os.getpid()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT INTO samples VALUES (?, ?, ?, ?, ?)",
+                                   [(*s, pid) for s in samples])
+            self._conn.executemany(
+                "INSERT INTO counters VALUES (?, ?, ?) "
+                "ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value",
+                [(name, labels, n) for (name, labels), n in counts.items()])
+            self._conn.execute("COMMIT")
+
+    def prune(self, keep_seconds: float = KEEP_SECONDS):
+        with self._lock:
+            self._conn.execute("DELETE FROM samples WHERE ts < ?", (time.time() - keep_seconds,))
+
+    def reset(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM samples")
+            self._conn.execute("DELETE FROM counters")
+
+    # ---- 🔹 Reads ----
+    def samples(self, since: float = None):
+        """DataFrame of ts, stage, op, seconds, pid (the last `since` seconds, or all)."""
+        import pandas as pd
+
+        cutoff = 0 if since is None else time.time() - since
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM samples WHERE ts >= ?", (cutoff,)).fetchall()
+        return pd.DataFrame(rows, columns=["ts", "stage", "op", "seconds", "pid"])
+
+    def counters(self) -> list:
+        """[(name, labels dict, value)]"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM counters ORDER BY name, labels").fetchall()
+        return [(name, json.loads(labels), value) for name, labels, value in rows]
+
+    # ---- 🔹 Profiles ----
+    def request_profile(self, page: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO profile_requests VALUES (?, ?)", (page, time.time()))
+
+    def take_profile_request(self, page: str) -> bool:
+        """True (once) if a capture of `page`'s next run was requested."""
+        with self._lock:
+            return self._conn.execute("DELETE FROM profile_requests WHERE page = ?", (page,)).rowcount > 0
+
+    def pending_profiles(self) -> list:
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT page FROM profile_requests").fetchall()]
+
+    def save_profile(self, page: str, seconds: float, tool: str, report: str):
+        with self._lock:
+            self._conn.execute("INSERT INTO profiles (page, captured, seconds, tool, report) VALUES (?, ?, ?, ?, ?)",
+                               (page, time.time(), seconds, tool, report))
+            # keep the 20 newest captures
+            self._conn.execute("DELETE FROM profiles WHERE id NOT IN "
+                               "(SELECT id FROM profiles ORDER BY id DESC LIMIT 20)")
+
+    def profiles(self) -> list:
+        """[{id, page, captured, seconds, tool, report}], newest first."""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM profiles ORDER BY id DESC").fetchall()
+        return [dict(zip(["id", "page", "captured", "seconds", "tool", "report"], r)) for r in rows]
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def get_metrics_store() -> MetricsStore:
+    """Process-wide store (a forked pool worker opens its own connection)."""
+    global _store, _store_pid
+    with _store_lock:
+        if _store is None or _store_pid != os.getpid():
+            _store, _store_pid = MetricsStore(), os.getpid()
+        return _store
+
+
+# ------------------ Recording ------------------ #
+class Metrics:
+    """
+    In-process recorder: timings and counter increments are buffered in
+    memory (an append under a lock) and written to the MetricsStore by a
+    daemon thread every FLUSH_PERIOD seconds, so the hot path never waits
+    on SQLite.
+    """
+
+    def __init__(self, store: MetricsStore = None, period: float = FLUSH_PERIOD):
+        self._store = store
+        self.period = period
+        self._samples = deque(maxlen=MAX_BUFFER)
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._pid = None        # process the flush thread runs in (pools fork/spawn copies)
+        self._flushes = 0
+
+    @property
+    def store(self) -> MetricsStore:
+        return self._store or get_metrics_store()
+
+    def _ensure_flusher(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="metrics-flush", daemon=True).start()
+
+    def _run(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.period)
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # metrics are best effort: a locked or read-only file must not break the app
+                pass
+
+    def observe(self, stage: str, op: str, seconds: float):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._samples.append((time.time(), stage, op, seconds))
+            self._ensure_flusher()
+
+    def count(self, name: str, n: int = 1, **labels):
+        if not ENABLED:
+            return
+        key = (name, json.dumps(labels, sort_keys=True))
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + n
+            self._ensure_flusher()
+
+    def flush(self):
+        with self._lock:
+            samples, self._samples = list(self._samples), deque(maxlen=MAX_BUFFER)
+            counts, self._counts = self._counts, {}
+        if samples or counts:
+            self.store.write(samples, counts)
+        self._flushes += 1
+        if self._flushes % 100 == 1:
+            self.store.prune()
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+@contextmanager
+def timer(stage: str, op: str = ""):
+    """Time the block as one sample of `stage` (with `op` naming what ran), exceptions included."""
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        _metrics.observe(stage, op, time.perf_counter() - t)
+
+
+def timed(stage: str, op: str = None):
+    """Decorator form of timer(); `op` defaults to the function name."""
+    def wrap(fn):
+        name = op or fn.__name__
+
+        def inner(*args, **kwargs):
+            with timer(stage, name):
+                return fn(*args, **kwargs)
+
+        inner.__name__, inner.__doc__, inner.__wrapped__ = fn.__name__, fn.__doc__, fn
+        return inner
+    return wrap
+
+
+def cache_event(cache: str, hit: bool):
+    """Count one lookup in `cache` as a hit or a miss."""
+    _metrics.count("cache", cache=cache, result="hit" if hit else "miss")
+
+
+# ------------------ Profiling ------------------ #
+def _profiler():
+    """(name, start(), stop() -> report text): pyinstrument when installed, else cProfile."""
+    try:
+        from pyinstrument import Profiler
+
+        profiler = Profiler()
+        return "pyinstrument", profiler.start, lambda: (profiler.stop(), profiler.output_text(unicode=True))[1]
+    except ImportError:
+        import cProfile
+        import io
+        import pstats
+
+        profiler = cProfile.Profile()
+
+        def stop():
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+            return out.getvalue()
+
+        return "cProfile", profiler.enable, stop
+
+
+@contextmanager
+def page_run(page: str):
+    """
+    Time one run of a page script (stage "page"). If the Profiling page
+    asked for a capture of this page, this run is profiled and the report
+    saved with it.
+    """
+    profile = None
+    if ENABLED:
+        try:
+            if get_metrics_store().take_profile_request(page):
+                profile = _profiler()
+                profile[1]()
+        except sqlite3.Error:
+            profile = None
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t
+        _metrics.observe("page", page, seconds)
+        if profile is not None:
+            get_metrics_store().save_profile(page, seconds, profile[0], profile[2]())
+
+
+# ------------------ Reports ------------------ #
+def percentiles(samples, by=("stage",)):
+    """count, p50, p95, p99, max and total (ms) per group of a samples() frame."""
+    import pandas as pd
+
+    if samples.empty:
+        return pd.DataFrame(columns=[*by, "count", "p50_ms", "p95_ms", "p99_ms", "max_ms", "total_ms"])
+    ms = samples.assign(ms=samples["seconds"] * 1000).groupby(list(by))["ms"]
+    out = pd.DataFrame({
+        "count": ms.size(),
+        "p50_ms": ms.quantile(0.5), "p95_ms": ms.quantile(0.95), "p99_ms": ms.quantile(0.99),
+        "max_ms": ms.max(), "total_ms": ms.sum(),
+    }).reset_index()
+    if "stage" in by:
+        # hot-path order, then anything else
+        order = {s: i for i, s in enumerate(STAGES)}
+        out = out.sort_values(["stage"], key=lambda s: s.map(lambda v: order.get(v, len(order))), kind="stable")
+    return out.reset_index(drop=True)
+
+
+def _label_text(labels: dict) -> str:
+    escaped = {k: str(v).replace("\\", "\\\\").replace('"', '\\"') for k, v in labels.items()}
+    return ",".join(f'{k}="{v}"' for k, v in escaped.items())
+
+
+def prometheus_text(samples, counters) -> str:
+    """
+    Prometheus text exposition of a samples() frame and counters(): an
+    app_stage_seconds histogram per stage/op and an app_<name>_total
+    counter per counter name.
+    """
+    import numpy as np
+
+    lines = ["# HELP app_stage_seconds Time spent per hot-path stage.",
+             "# TYPE app_stage_seconds histogram"]
+    for (stage, op), group in samples.groupby(["stage", "op"]):
+        seconds = np.sort(group["seconds"].to_numpy())
+        labels = _label_text({"stage": stage, "op": op})
+        for bound in BUCKETS:
+            lines.append(f'app_stage_seconds_bucket{{{labels},le="{bound}"}} '
+                         f"{int(np.searchsorted(seconds, bound, side='right'))}")
+        lines.append(f'app_stage_seconds_bucket{{{labels},le="+Inf"}} {len(seconds)}')
+        lines.append(f"app_stage_seconds_sum{{{labels}}} {seconds.sum():.6f}")
+        lines.append(f"app_stage_seconds_count{{{labels}}} {len(seconds)}")
+    declared = set()
+    for name, labels, value in counters:
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# TYPE app_{name}_total counter")
+        lines.append(f"app_{name}_total{{{_label_text(labels)}}} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def hit_rates(counters) -> list:
+    """[(cache, hits, misses, hit rate)] from counters()."""
+    caches = {}
+    for name, labels, value in counters:
+        if name == "cache":
+            hits, misses = caches.get(labels["cache"], (0, 0))
+            caches[labels["cache"]] = (hits + value, misses) if labels["result"] == "hit" else (hits, misses + value)
+    return [(cache, h, m, h / (h + m) if h + m else 0.0) for cache, (h, m) in sorted(caches.items())]
+
+
+if __name__ == "__main__":
+    # from the repo root: PYTHONPATH=app python -m utils.metrics [--prom] [--since SECONDS]
+    import sys
+
+    from utils.metrics import get_metrics, get_metrics_store, hit_rates, percentiles, prometheus_text, timer
+
+    # recording overhead on the hot path
+    n = 100_000
+    t = time.perf_counter()
+    for _ in range(n):
+        with timer("bench", "noop"):
+            pass
+    overhead = (time.perf_counter() - t) / n * 1e6
+    get_metrics()._samples.clear()
+
+    since = float(sys.argv[sys.argv.index("--since") + 1]) if "--since" in sys.argv else None
+    store = get_metrics_store()
+    samples, counters = store.samples(since), store.counters()
+    if "--prom" in sys.argv:
+        print(prometheus_text(samples, counters), end="")
+    else:
+        print(f"timer overhead: {overhead:.2f} us per sample\n")
+        print(percentiles(samples).round(3).to_string(index=False))
+        for cache, hits, misses, rate in hit_rates(counters):
+            print(f"cache {cache:20s} hits {hits:7d}  misses {misses:7d}  hit rate {rate:6.1%}")
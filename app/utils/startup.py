@@ -0,0 +1,125 @@
+import ast
+import json
+import os
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+REPO_ROOT = os.path.dirname(APP_DIR)
+
+# cold render budget per page, seconds (fresh interpreter, exchange offline)
+RENDER_BUDGETS = {
+    "main.py": 1.0,
+    "pages/1_Home.py": 1.5,
+    "pages/2_AI_Assistant.py": 1.5,
+    "pages/3_PaperTrading.py": 1.5,
+    "pages/4_Portfolio.py": 1.5,
+    "pages/5_Strategy.py": 1.5,
+    "pages/6_AI_Model.py": 1.5,
+    "pages/7_Profiling.py": 1.5,
+}
+# modules that must not be imported just by opening a page
+HEAVY_MODULES = ["tensorflow", "sklearn", "lightgbm", "scipy.signal", "ta"]
+
+
+def _env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in [APP_DIR, env.get("PYTHONPATH")] if p)
+    return env
+
+
+# ------------------ Imports ------------------ #
+def page_imports(page: str) -> str:
+    """The module-level import statements of a page, as source."""
+    with open(os.path.join(APP_DIR, page)) as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def import_profile(page: str) -> dict:
+    """
+    Run a page's imports in a fresh interpreter with -X importtime.
+    Returns total seconds, the heaviest modules [(name, cumulative s)] and
+    which HEAVY_MODULES got loaded.
+    """
+    code = page_imports(page) + "\nimport sys\nprint(sorted(sys.modules))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_ROOT,
+                          env=_env(), capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # two leading spaces per nesting level; only record top-level imports
+        if len(name) - len(name.lstrip()) <= 1:
+            modules[name.strip()] = int(cumulative) / 1e6
+    loaded = set(ast.literal_eval(proc.stdout.strip().splitlines()[-1]))
+    return {
+        "total": sum(modules.values()),
+        "top": sorted(modules.items(), key=lambda kv: -kv[1])[:5],
+        "heavy": [m for m in HEAVY_MODULES if m in loaded],
+    }
+
+
+# ------------------ Cold render ------------------ #
+def _render(page: str) -> dict:
+    """Child process: render one page with AppTest and the exchange offline."""
+    import requests
+    from streamlit.testing.v1 import AppTest
+
+    from services.market_data import MarketDataClient, set_client
+    from services.rate_limit import RequestScheduler
+
+    class OfflineTransport:
+        # the exchange is unreachable: this measures startup, not the network
+        def get(self, url, params=None):
+            raise requests.ConnectionError(f"offline: {url}")
+
+    set_client(MarketDataClient(OfflineTransport(), scheduler=RequestScheduler(max_retries=0)))
+    at = AppTest.from_file(os.path.join(APP_DIR, page), default_timeout=60)
+    t = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - t
+    return {"seconds": elapsed, "exceptions": [str(e.value)[:200] for e in at.exception],
+            "heavy": [m for m in HEAVY_MODULES if m in sys.modules]}
+
+
+def cold_render(page: str) -> dict:
+    """Render `page` once in a fresh interpreter; returns seconds, exceptions, heavy modules."""
+    proc = subprocess.run([sys.executable, "-m", "utils.startup", "--render", page], cwd=REPO_ROOT,
+                          env=_env(), capture_output=True, text=True)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(f"render of {page} failed: {proc.stderr.strip()[-500:]}")
+
+
+def check(pages=None, budgets: dict = None) -> bool:
+    """Print the import profile and cold render time of each page; False if any is over budget or raises."""
+    budgets = {**RENDER_BUDGETS, **(budgets or {})}
+    ok = True
+    for page in pages or list(RENDER_BUDGETS):
+        imports = import_profile(page)
+        render = cold_render(page)
+        failed = render["seconds"] > budgets[page] or bool(render["exceptions"])
+        ok &= not failed
+        print(f"{'FAIL' if failed else 'ok  '} {page:26s} render {render['seconds']:5.2f}s "
+              f"(budget {budgets[page]:.1f}s)  imports {imports['total']:5.2f}s")
+        for name, seconds in imports["top"]:
+            print(f"       {seconds:6.3f}s  {name}")
+        if render["heavy"]:
+            print(f"       loaded at render: {', '.join(render['heavy'])}")
+        for e in render["exceptions"]:
+            print(f"       exception: {e}")
+    return ok
+
+
+if __name__ == "__main__":
+    # from the repo root: PYTHONPATH=app python -m utils.startup [page ...]
+    if len(sys.argv) > 2 and sys.argv[1] == "--render":
+        print(json.dumps(_render(sys.argv[2])))
+    else:
+        raise SystemExit(0 if check(sys.argv[1:] or None) else 1)
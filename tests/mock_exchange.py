@@ -0,0 +1,36 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+def serve_mock_exchange(plan):
+    """
+    Local HTTP server standing in for Binance/CoinGecko. `plan(path, hits)`
+    returns (status, headers, body dict) for the n-th hit of a path.
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    hits, lock = {}, threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = urlparse(self.path).path
+            with lock:
+                hits[path] = hits.get(path, 0) + 1
+                n = hits[path]
+            status, headers, body = plan(path, n)
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            for k, v in {**headers, "Content-Type": "application/json"}.items():
+                self.send_header(k, str(v))
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.hits = hits
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
@@ -0,0 +1,68 @@
+import os
+import shutil
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from models.export import CompiledRegressor, OnnxClassifier, export_model, load_predictor, parity  # noqa: E402
+from models.features import LGB_FEATURES  # noqa: E402
+
+needs_treelite = pytest.mark.skipif(
+    any(__import__("importlib").util.find_spec(m) is None for m in ("treelite", "tl2cgen"))
+    or not (shutil.which("gcc") or shutil.which("clang")),
+    reason="treelite/tl2cgen or a C compiler missing")
+needs_onnx = pytest.mark.skipif(
+    any(__import__("importlib").util.find_spec(m) is None for m in ("onnxruntime", "skl2onnx")),
+    reason="onnxruntime/skl2onnx missing")
+
+
+@pytest.fixture(scope="module")
+def matrix():
+    """LGB_FEATURES-shaped rows around a random-walk close, and the next close."""
+    rng = np.random.default_rng(0)
+    n = 3000
+    close = 50_000 + np.cumsum(rng.normal(0, 50, n))
+    X = np.c_[close, rng.uniform(0, 100, n), rng.normal(0, 1e-3, n), close + rng.normal(0, 100, n),
+              rng.uniform(0, 100, n)]
+    assert X.shape[1] == len(LGB_FEATURES)
+    return X, np.roll(close, -1)
+
+
+@needs_treelite
+def test_lgbm_shared_library_matches_booster(tmp_path, matrix):
+    import lightgbm as lgb
+
+    X, y = matrix
+    native = lgb.LGBMRegressor(n_estimators=50, verbose=-1).fit(X, y)
+    path = export_model(native, str(tmp_path / "lgbm.pkl"))
+    assert path is not None
+    assert parity(native, CompiledRegressor(path), X) <= 1e-9
+
+
+@needs_onnx
+def test_rf_onnx_matches_forest(tmp_path, matrix):
+    from sklearn.ensemble import RandomForestClassifier
+
+    X, y = matrix
+    native = RandomForestClassifier(50, random_state=0).fit(X, (y > X[:, 0]).astype(int))
+    path = export_model(native, str(tmp_path / "rf.pkl"))
+    assert path is not None
+    assert parity(native, OnnxClassifier(path), X) <= 1e-5
+
+
+@needs_treelite
+def test_retrained_model_reloads_its_own_library(tmp_path, matrix):
+    from models.price_predictor import fit_model
+
+    X, y = matrix
+    path = str(tmp_path / "crypto_lgb.pkl")
+    for target in (y, -y):
+        # same pickle and .so names for both fits, as app/data/train_model_script.py does
+        native = fit_model(X, target, save_path=path, params={"n_estimators": 30, "verbose": -1})
+        served = load_predictor(path)
+        assert isinstance(served, CompiledRegressor)
+        np.testing.assert_allclose(served.predict(X[:100]), native.predict(X[:100]), atol=1e-9)
@@ -0,0 +1,103 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+import models.features as features  # noqa: E402
+from models.classifier import with_rf_features  # noqa: E402
+from models.features import (LGB_FEATURES, RF_FEATURES, StreamingRFFeatures, lgb_features,  # noqa: E402
+                             rf_features, stream_lgb_features)
+from models.price_predictor import add_features  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def candles():
+    rng = np.random.default_rng(0)
+    close = 100_000 * np.exp(np.cumsum(rng.normal(0, 1e-3, 5_000)))
+    # a flat stretch: zero moves, where RSI divides by zero
+    close[2000:2030] = close[1999]
+    return close, rng.uniform(0, 10, close.size)
+
+
+@pytest.fixture(params=["scipy", "python"])
+def engine(request, monkeypatch):
+    """ewm_mean through scipy's lfilter and through the pure-Python fallback."""
+    if request.param == "scipy":
+        pytest.importorskip("scipy.signal")
+        monkeypatch.setattr(features, "_lfilter", None)
+    else:
+        monkeypatch.setattr(features, "_lfilter", False)
+    return request.param
+
+
+def reference_lgb(close, volume) -> pd.DataFrame:
+    """The LightGBM columns as the predictor first computed them: pandas + ta."""
+    from ta.momentum import RSIIndicator
+
+    df = pd.DataFrame({"Close": close, "Volume": volume})
+    df["returns"] = df["Close"].pct_change()
+    df["sma20"] = df["Close"].rolling(20).mean()
+    df["rsi14"] = RSIIndicator(df["Close"], 14).rsi()
+    return df[LGB_FEATURES]
+
+
+def reference_rf(price) -> pd.DataFrame:
+    """The RandomForest columns as the AI Model page first computed them with pandas."""
+    df = pd.DataFrame({"price": price})
+    df["SMA_10"] = df["price"].rolling(window=10).mean()
+    df["EMA_10"] = df["price"].ewm(span=10, adjust=False).mean()
+    delta = df["price"].diff()
+    avg_gain = delta.where(delta > 0, 0).rolling(14).mean()
+    avg_loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+    df["RSI"] = 100 - (100 / (1 + avg_gain / avg_loss))
+    ema12 = df["price"].ewm(span=12, adjust=False).mean()
+    ema26 = df["price"].ewm(span=26, adjust=False).mean()
+    df["MACD"] = ema12 - ema26
+    df["Signal"] = df["MACD"].ewm(span=9, adjust=False).mean()
+    return df[RF_FEATURES]
+
+
+def test_lgb_streaming_matches_batch(candles, engine):
+    close, volume = candles
+    streamed, _ = stream_lgb_features(close, volume)
+    np.testing.assert_allclose(streamed, lgb_features(close, volume), rtol=1e-9, equal_nan=True)
+
+
+def test_lgb_streaming_resumes_from_state(candles):
+    close, volume = candles
+    head, state = stream_lgb_features(close[:3000], volume[:3000])
+    tail, _ = stream_lgb_features(close[3000:], volume[3000:], state)
+    np.testing.assert_allclose(np.vstack([head, tail]), lgb_features(close, volume), rtol=1e-9, equal_nan=True)
+
+
+def test_rf_streaming_matches_batch(candles, engine):
+    close, _ = candles
+    state = StreamingRFFeatures()
+    streamed = np.array([state.update(p) for p in close])
+    np.testing.assert_allclose(streamed, rf_features(close), rtol=1e-9, equal_nan=True)
+
+
+def test_lgb_columns_match_pandas_and_ta(candles, engine):
+    pytest.importorskip("ta")
+    close, volume = candles
+    np.testing.assert_allclose(lgb_features(close, volume), reference_lgb(close, volume).to_numpy(),
+                               rtol=1e-9, equal_nan=True)
+    # the training frame of the price predictor: same columns, warm-up rows dropped
+    frame = add_features(pd.DataFrame({"Close": close, "Volume": volume}))
+    expected = reference_lgb(close, volume).assign(target=pd.Series(close).shift(-1)).dropna()
+    np.testing.assert_allclose(frame[LGB_FEATURES + ["target"]].to_numpy(), expected.to_numpy(), rtol=1e-9)
+
+
+def test_rf_columns_match_pandas(candles, engine):
+    close, _ = candles
+    np.testing.assert_allclose(rf_features(close), reference_rf(close).to_numpy(), rtol=1e-9, equal_nan=True)
+    # the classifier's input frame: warm-up rows dropped the same way
+    frame = with_rf_features(pd.DataFrame({"price": close}))
+    expected = reference_rf(close).dropna()
+    assert frame.index.equals(expected.index)
+    np.testing.assert_allclose(frame[RF_FEATURES].to_numpy(), expected.to_numpy(), rtol=1e-9)
@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from models.online import OnlineUpdater  # noqa: E402
+from models.registry import load_model  # noqa: E402
+from services.training_jobs import TrainingJobManager  # noqa: E402
+
+PARAMS = {"n_estimators": 10, "confidence": 0.55}
+
+
+class Charts:
+    """CoinGecko stand-in: an hourly history that gains `step` hours per call."""
+
+    def __init__(self, step=2):
+        rng = np.random.default_rng(0)
+        self.prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 1000)))
+        self.step = step
+        self.end = 400
+        self.calls = []
+
+    def __call__(self, coin, days):
+        self.calls.append((coin, days))
+        start = self.end - 300
+        chart = pd.DataFrame({"timestamp": pd.date_range("2025-09-01", periods=self.end, freq="h")[start:],
+                              "price": self.prices[start:self.end]})
+        self.end += self.step
+        return chart
+
+
+def wait(manager, timeout=60):
+    deadline = time.time() + timeout
+    while any(not j.done for j in manager.jobs()):
+        assert time.time() < deadline, "training did not finish"
+        time.sleep(0.05)
+
+
+def test_rf_coins_are_updated_on_the_schedule(tmp_path, monkeypatch):
+    monkeypatch.setattr("models.sweep.load_best_params", lambda kind, path=None: dict(PARAMS))
+    manager = TrainingJobManager(str(tmp_path))
+    charts = Charts()
+    updater = OnlineUpdater(pairs=[], coins=[("bitcoin", 30)], charts=charts, manager=manager)
+
+    # first run: nothing trained for this coin yet, a full fit is queued
+    assert updater.run_once()[("bitcoin", "30d")]["status"] == "updating"
+    wait(manager)
+    first = manager.jobs()[-1]
+    assert first.status == "done" and first.name == "bitcoin-30"
+
+    # the history moved on: a rolling update of that forest replaces it
+    assert updater.run_once()[("bitcoin", "30d")]["status"] == "updating"
+    wait(manager)
+    assert all(j.status == "done" for j in manager.jobs()) and len(manager.jobs()) == 2
+    (path,) = tmp_path.glob("rf-*.pkl")
+    assert load_model(str(path))["updates"] == 1
+    assert charts.calls == [("bitcoin", 30)] * 2
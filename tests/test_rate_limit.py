@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from mock_exchange import serve_mock_exchange  # noqa: E402
+from services.market_data import MarketDataClient, RateLimitError, RequestsTransport  # noqa: E402
+from services.rate_limit import BACKGROUND, UI, RequestScheduler, WeightLimiter  # noqa: E402
+
+
+def plan(path, n):
+    if path == "/api/v3/ticker/price":
+        # first hit rate limited with Retry-After, then fine
+        if n == 1:
+            return 429, {"Retry-After": 1, "X-MBX-USED-WEIGHT-1M": 100}, {"code": -1003}
+        return 200, {"X-MBX-USED-WEIGHT-1M": 40}, {"symbol": "BTCUSDT", "price": "50000.0"}
+    if path == "/coins/bitcoin/market_chart":
+        return (200, {}, {"prices": [[0, 1.0], [60_000, 2.0]]}) if n == 1 else (418, {"Retry-After": 120}, {})
+    if path == "/flaky":
+        return (503, {}, {}) if n < 3 else (200, {}, {"ok": True})
+    return 404, {}, {}
+
+
+@pytest.fixture
+def exchange():
+    server, base = serve_mock_exchange(plan)
+    scheduler = RequestScheduler(base_delay=0.05, ui_timeout=2.0)
+    client = MarketDataClient(RequestsTransport(), binance_url=base, coingecko_url=base,
+                              scheduler=scheduler, coingecko_ttl=0.0)
+    yield server, base, scheduler, client
+    server.shutdown()
+
+
+def test_429_retry_after_is_waited_out_then_retried(exchange):
+    server, base, scheduler, client = exchange
+    t = time.perf_counter()
+    assert client.get_price("BTCUSDT") == 50000.0
+    assert 0.9 < time.perf_counter() - t < 3
+    assert server.hits["/api/v3/ticker/price"] == 2
+
+
+def test_used_weight_is_synced_from_headers(exchange):
+    _, base, scheduler, client = exchange
+    client.get_price("BTCUSDT")
+    assert scheduler.status()[urlparse(base).netloc]["used"] >= 40
+
+
+def test_5xx_is_retried_with_backoff(exchange):
+    server, base, scheduler, _ = exchange
+    resp = scheduler.send(RequestsTransport().get, f"{base}/flaky")
+    assert resp.status_code == 200
+    assert server.hits["/flaky"] == 3
+
+
+def test_418_serves_the_cached_value_flagged_stale(exchange):
+    _, _, _, client = exchange
+    first = client.get_market_chart("bitcoin", 1)
+    assert not first.attrs["freshness"].stale
+    again = client.get_market_chart("bitcoin", 1)
+    assert again.attrs["freshness"].stale
+    assert again.equals(first)
+
+
+def test_banned_host_fails_fast_for_ui(exchange):
+    _, _, _, client = exchange
+    client.get_market_chart("bitcoin", 1)
+    client.get_market_chart("bitcoin", 1)    # 418: host banned for 120 s
+    t = time.perf_counter()
+    with pytest.raises(RateLimitError) as e:
+        client.get_simple_price("ethereum")
+    assert time.perf_counter() - t < 0.5
+    assert e.value.retry_after > 100
+
+
+def test_ui_request_overtakes_queued_background():
+    limiter = WeightLimiter(limit=10, window=0.5)
+    limiter.acquire(10, UI)
+    order = []
+
+    def worker(label, priority):
+        limiter.acquire(6, priority)
+        order.append(label)
+
+    threads = [threading.Thread(target=worker, args=("background", BACKGROUND))]
+    threads[0].start()
+    time.sleep(0.05)
+    threads.append(threading.Thread(target=worker, args=("ui", UI)))
+    threads[1].start()
+    for th in threads:
+        th.join()
+    assert order == ["ui", "background"]
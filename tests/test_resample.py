@@ -0,0 +1,134 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from services.candle_store import CandleStore  # noqa: E402
+from services.market_data import INTERVAL_MS  # noqa: E402
+from services.resample import (DERIVED_INTERVALS, ResampleHub, Resampler, complete_buckets,  # noqa: E402
+                               gaps, resample, verify)
+from services.stream import CandleRing  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def minutes():
+    """The recorded BTCUSDT 1m candles in app/data, as (n, 6) rows."""
+    df = pd.read_csv(os.path.join(ROOT, "app", "data", "BTCUSDT_1m.csv"))
+    open_time = pd.to_datetime(df["Open_time"]).to_numpy().astype("datetime64[ms]").astype("int64")
+    rows = np.column_stack([open_time, df[["Open", "High", "Low", "Close", "Volume"]].to_numpy(float)])
+    assert not gaps(rows)
+    return rows
+
+
+class RecordedClient:
+    """get_kline_rows over the recorded minutes, like a range request to the exchange."""
+
+    def __init__(self, rows, fail=False):
+        self.rows = rows
+        self.fail = fail
+        self.requests = 0
+
+    def get_kline_rows(self, symbol="BTCUSDT", interval="1m", limit=100, start_time=None, end_time=None):
+        self.requests += 1
+        if self.fail:
+            raise ConnectionError("offline")
+        t = self.rows[:, 0]
+        mask = (t >= (start_time or 0)) & (t <= (end_time if end_time is not None else np.inf))
+        return [[int(r[0]), *map(str, r[1:])] for r in self.rows[mask][:limit]]
+
+
+class LiveStream:
+    def __init__(self, rows):
+        self.rings = {("BTCUSDT", "1m"): CandleRing(len(rows))}
+        self.rings[("BTCUSDT", "1m")].extend(map(tuple, rows))
+
+    def add_listener(self, fn, backfill=True):
+        pass
+
+
+EXCHANGE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "exchange")
+
+
+def exchange_bars(interval):
+    """
+    The exchange's own klines over the recorded minutes, saved by
+    `PYTHONPATH=app python -m services.resample --record tests/fixtures/exchange`.
+    """
+    path = os.path.join(EXCHANGE_DIR, f"BTCUSDT_{interval}.csv")
+    if not os.path.exists(path):
+        pytest.skip(f"no recorded exchange {interval} klines in {EXCHANGE_DIR}")
+    return pd.read_csv(path)[["open_time", "Open", "High", "Low", "Close", "Volume"]].to_numpy(np.float64)
+
+
+def reference_bars(rows, interval):
+    """Independent aggregation with pandas: epoch-aligned buckets, first/max/min/last, 8-decimal volume sums."""
+    df = pd.DataFrame(rows[:, 1:], columns=["Open", "High", "Low", "Close", "Volume"],
+                      index=pd.to_datetime(rows[:, 0].astype("int64"), unit="ms"))
+    bars = df.resample(pd.Timedelta(milliseconds=INTERVAL_MS[interval]), origin="epoch").agg(
+        {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}).dropna()
+    bars["Volume"] = bars["Volume"].round(8)
+    open_time = bars.index.to_numpy().astype("datetime64[ms]").astype("int64")
+    return np.column_stack([open_time, bars.to_numpy(np.float64)])
+
+
+def seam_hub(tmp_path, minutes, client):
+    # store up to 07:xx, a 50-minute hole, then the live ring
+    cut, resume = 300, 350
+    store = CandleStore(str(tmp_path), client=client)
+    store.write("BTCUSDT", "1m", pd.DataFrame(minutes[:cut], columns=["open_time", "Open", "High", "Low",
+                                                                          "Close", "Volume"])
+                .astype({"open_time": "int64"}))
+    return ResampleHub(LiveStream(minutes[resume:]), store, size=500), (minutes[cut, 0], minutes[resume - 1, 0])
+
+
+@pytest.mark.parametrize("interval", DERIVED_INTERVALS)
+def test_batch_matches_recorded_exchange_bars(minutes, interval):
+    result = verify(minutes, exchange_bars(interval), interval)
+    # every complete bucket of the recording is compared (none for 1d: under a day is recorded)
+    assert result["compared"] == complete_buckets(minutes, interval).sum()
+    assert result["identical"] == result["compared"], result["mismatches"]
+
+
+@pytest.mark.parametrize("interval", DERIVED_INTERVALS)
+def test_batch_matches_independent_aggregation(minutes, interval):
+    result = verify(minutes, reference_bars(minutes, interval), interval)
+    # every complete bucket of the recording is compared (none for 1d: under a day is recorded)
+    assert result["compared"] == complete_buckets(minutes, interval).sum()
+    assert result["identical"] == result["compared"], result["mismatches"]
+
+
+def test_incremental_matches_batch(minutes):
+    r = Resampler(size=len(minutes))
+    for row in minutes:
+        r.update(row)
+    for interval in DERIVED_INTERVALS:
+        assert np.array_equal(r.bars(interval), resample(minutes, interval))
+
+
+def test_seam_gap_is_synced(tmp_path, minutes):
+    client = RecordedClient(minutes)
+    hub, _ = seam_hub(tmp_path, minutes, client)
+    r = hub.get("BTCUSDT")
+    assert client.requests
+    for interval in DERIVED_INTERVALS:
+        expected = resample(minutes, interval)
+        expected = expected[complete_buckets(minutes, interval) | (expected[:, 0] == expected[-1, 0])]
+        assert np.array_equal(r.bars(interval), expected), interval
+
+
+def test_seam_gap_offline_drops_partial_buckets(tmp_path, minutes):
+    hub, (first_missing, last_missing) = seam_hub(tmp_path, minutes, RecordedClient(minutes, fail=True))
+    r = hub.get("BTCUSDT")
+    for interval in DERIVED_INTERVALS:
+        step = INTERVAL_MS[interval]
+        bars = r.bars(interval)
+        # no bar over the hole, and every closed bar equals the exchange's
+        over_gap = (bars[:, 0] + step > first_missing) & (bars[:, 0] <= last_missing)
+        assert not over_gap.any(), interval
+        closed = bars[bars[:, 0] + step <= minutes[-1, 0]]
+        assert verify(minutes, closed, interval)["identical"] == len(closed), interval
@@ -0,0 +1,114 @@
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from services.stream import StreamManager  # noqa: E402
+
+MINUTE = 60_000
+
+
+class Exchange:
+    """
+    The exchange side of one 1m BTCUSDT feed: REST serves every candle up
+    to the newest one the WebSocket has pushed so far.
+    """
+
+    def __init__(self, n=60):
+        rng = np.random.default_rng(0)
+        start = int(time.time() * 1000) // MINUTE * MINUTE - (n - 1) * MINUTE
+        close = 50_000 + np.cumsum(rng.normal(0, 10, n))
+        self.rows = [(float(start + i * MINUTE), c - 1, c + 5, c - 5, c, float(i + 1)) for i, c in enumerate(close)]
+        self.pushed = -1
+        self.lock = threading.Lock()
+
+    def get_kline_rows(self, symbol="BTCUSDT", interval="1m", limit=100, start_time=None, end_time=None):
+        with self.lock:
+            rows = self.rows[:self.pushed + 1]
+        if start_time is not None:
+            rows = [r for r in rows if r[0] >= start_time]
+        else:
+            rows = rows[-limit:]
+        return [[int(r[0]), *map(str, r[1:])] for r in rows[:limit]]
+
+    def advance(self, i):
+        """Candles up to `i` closed while no connection was pushing them."""
+        with self.lock:
+            self.pushed = max(self.pushed, i)
+
+    def message(self, i):
+        self.advance(i)
+        t, o, h, l, c, v = self.rows[i]
+        return json.dumps({"stream": "btcusdt@kline_1m", "data": {"e": "kline", "s": "BTCUSDT", "k": {
+            "t": int(t), "i": "1m", "o": str(o), "h": str(h), "l": str(l), "c": str(c), "v": str(v)}}})
+
+
+class FakeSocket:
+    """Local WebSocket stand-in: plays its script, then drops the connection."""
+
+    def __init__(self, exchange, indices):
+        self.exchange = exchange
+        self.indices = list(indices)
+
+    def recv(self):
+        if not self.indices:
+            return ""
+        return self.exchange.message(self.indices.pop(0))
+
+    def close(self):
+        pass
+
+
+def run(exchange, scripts):
+    """
+    Stream through one FakeSocket per script (exchange.advance(at) first,
+    then push `indices`) until the ring holds every candle or 10 s pass.
+    """
+    scripts = list(scripts)
+    connects, seen = [], []
+
+    def connect(url):
+        connects.append(url)
+        if not scripts:
+            raise ConnectionError("exchange unreachable")
+        at, indices = scripts.pop(0)
+        exchange.advance(at)
+        return FakeSocket(exchange, indices)
+
+    stream = StreamManager(["BTCUSDT"], ["1m"], size=100, connect=connect, client=exchange,
+                           max_backoff=0.2)
+    stream.add_listener(lambda symbol, interval, row: seen.append(row[0]))
+    ring = stream.rings[("BTCUSDT", "1m")]
+    stream.start()
+    try:
+        deadline = time.time() + 10
+        while (len(ring) < len(exchange.rows) or scripts) and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        stream.stop()
+    return stream, ring, connects, seen
+
+
+def test_candles_skipped_mid_stream_are_backfilled():
+    exchange = Exchange()
+    # 20-24 never arrive over the socket; 25 shows the gap
+    stream, ring, _, seen = run(exchange, [(-1, list(range(0, 20)) + list(range(25, 60)))])
+    np.testing.assert_array_equal(ring.snapshot(), np.array(exchange.rows))
+    # listeners saw every candle, backfilled ones included
+    assert set(seen) == {r[0] for r in exchange.rows}
+
+
+def test_drop_and_reconnect_backfills_the_missed_candles():
+    exchange = Exchange()
+    # the socket drops after 39; by the reconnect the exchange has closed up
+    # to 59 and the new connection pushes no candle at all
+    stream, ring, connects, seen = run(exchange, [(-1, range(0, 40)), (59, [])])
+    assert stream.reconnects >= 1 and len(connects) >= 2
+    np.testing.assert_array_equal(ring.snapshot(), np.array(exchange.rows))
+    assert set(seen) == {r[0] for r in exchange.rows}
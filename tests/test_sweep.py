@@ -0,0 +1,74 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from models import sweep  # noqa: E402
+from models.backtest import LSTMStrategy, walk_forward  # noqa: E402
+
+THRESHOLDS = [0.0, 0.1, 0.2, 0.4]
+
+
+class WindowSlope:
+    """Stands in for the fitted LSTM: a deterministic output in [-1, 1] per scaled window."""
+
+    def predict(self, windows):
+        windows = np.asarray(windows, dtype=float)
+        return np.tanh(3 * (windows[:, -1] - windows.mean(axis=1)))
+
+
+@pytest.fixture
+def fits(monkeypatch):
+    calls = []
+
+    def fit(self, candles):
+        calls.append((self.window_size, len(candles)))
+        self.model = WindowSlope()
+        return self
+
+    monkeypatch.setattr(LSTMStrategy, "fit", fit)
+    return calls
+
+
+@pytest.fixture(scope="module")
+def candles():
+    rng = np.random.default_rng(0)
+    close = 50_000 * np.exp(np.cumsum(rng.normal(0, 1e-3, 1000)))
+    return pd.DataFrame({"Open": close, "High": close * 1.001, "Low": close * 0.999, "Close": close,
+                         "Volume": rng.uniform(0, 10, close.size)})
+
+
+def test_thresholds_are_scored_on_one_fit_per_window(tmp_path, candles, fits):
+    results = sweep.run_lstm_sweep(candles, [10, 30], THRESHOLDS, 250, 125, cache_dir=str(tmp_path))
+    assert len(results) == 2 * len(THRESHOLDS)
+    # 6 folds per window size, however many thresholds
+    assert [w for w, _ in fits] == [10] * 6 + [30] * 6
+
+    # the same numbers as a full walk-forward backtest of each trial
+    for row in results.itertuples():
+        strategy = LSTMStrategy(row.window_size, threshold=row.threshold)
+        _, stats, folds = walk_forward(candles, strategy, 250, 125)
+        assert row.folds == len(folds)
+        for key, value in stats.items():
+            assert getattr(row, key) == pytest.approx(value)
+
+
+def test_finished_trials_are_not_refit(tmp_path, candles, fits):
+    sweep.run_lstm_sweep(candles, [10], THRESHOLDS, 250, 125, cache_dir=str(tmp_path))
+    fits.clear()
+    results = sweep.run_lstm_sweep(candles, [10], THRESHOLDS[:2], 250, 125, cache_dir=str(tmp_path))
+    assert fits == [] and len(results) == 2
+
+
+def test_swept_threshold_is_what_the_pages_read(tmp_path, candles, fits):
+    path = str(tmp_path / "best_params.json")
+    assert sweep.load_best_params("lstm", path) == {"window_size": 30, "threshold": 0.2}
+    results = sweep.run_lstm_sweep(candles, [10], THRESHOLDS, 250, 125, cache_dir=str(tmp_path))
+    best = sweep.save_best_params("lstm", results, path)
+    assert sweep.load_best_params("lstm", path) == best
+    assert set(best) == {"window_size", "threshold"}
@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from models.classifier import with_rf_features  # noqa: E402
+from services.training_jobs import TrainingJobManager  # noqa: E402
+
+PARAMS = {"n_estimators": 10, "random_state": 42}
+
+
+def chart(seed, start=100.0):
+    """Hourly CoinGecko-style chart: same timestamps for every coin, different prices."""
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range("2025-09-01", periods=300, freq="h")
+    return with_rf_features(pd.DataFrame({"timestamp": timestamps,
+                                          "price": start * np.exp(np.cumsum(rng.normal(0, 0.01, 300)))}))
+
+
+def wait(manager, timeout=60):
+    deadline = time.time() + timeout
+    while any(not j.done for j in manager.jobs()):
+        assert time.time() < deadline, "training did not finish"
+        time.sleep(0.05)
+
+
+def test_coins_over_the_same_range_get_their_own_artifacts(tmp_path):
+    manager = TrainingJobManager(str(tmp_path))
+    bitcoin, ethereum = chart(0, 60_000.0), chart(1, 2_500.0)
+    assert (manager.artifact_key("rf", bitcoin, PARAMS, "bitcoin-30")
+            != manager.artifact_key("rf", ethereum, PARAMS, "ethereum-30"))
+
+    for coin, df in (("bitcoin", bitcoin), ("ethereum", ethereum)):
+        artifact, job, _ = manager.request("rf", df, PARAMS, name=f"{coin}-30")
+        # nothing trained for this coin yet: no other coin's model is served meanwhile
+        assert artifact is None and job is not None
+    wait(manager)
+    assert all(j.status == "done" for j in manager.jobs())
+
+    models = {}
+    for coin, df in (("bitcoin", bitcoin), ("ethereum", ethereum)):
+        artifact, job, stale = manager.request("rf", df, PARAMS, name=f"{coin}-30")
+        assert job is None and not stale
+        models[coin] = artifact["model"]
+    assert models["bitcoin"] is not models["ethereum"]
+    assert len(list(tmp_path.glob("rf-*.pkl"))) == 2